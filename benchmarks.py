@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the Daily Run's Hot Paths
+----------------------------------------
+Times the decision, logging, summary and chart code on synthetic data at
+several scales and records wall time and peak memory per case:
+
+* ``harmonic_mean`` / ``decision``: 250, 1,000 and 5,000 candles
+* ``summary`` / ``summary_mapped`` / ``log_read`` / ``log_append``: 1k, 100k
+  and 1M log rows in one store (``summary_mapped`` maps the store and
+  summarises the records)
+* ``log_append_partitioned``: the same appends to a store whose earlier years
+  are closed into its archive (the archive is built on first use)
+* ``smooth_curve`` / ``dashboard`` / ``dashboard_html``: the same log scales
+
+Each case is timed ``--repeat`` times (median and best are kept); peak memory
+comes from one extra run under ``tracemalloc`` so it does not distort the
+timings. Results are written as JSON, and ``--compare`` flags every case whose
+best time grew by more than ``--threshold`` against an earlier results file
+(exit code 1).
+
+Example:
+    python benchmarks.py --output bench.json
+    python benchmarks.py --compare bench.json --threshold 0.25
+    python benchmarks.py --quick
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import datetime as dt
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+import trade_bot as tb
+
+CANDLE_SCALES = (250, 1_000, 5_000)
+LOG_SCALES = (1_000, 100_000, 1_000_000)
+QUICK_CANDLE_SCALES = (250,)
+QUICK_LOG_SCALES = (1_000,)
+# Slow cases get fewer timed runs than --repeat asks for.
+SLOW_CASES = {"dashboard": 1, "smooth_curve": 3}
+# Differences below this are scheduler noise, whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def synthetic_candles(n: int, seed: int = 0, end: dt.date = None) -> pd.DataFrame:
+    """``n`` daily candles ending at ``end`` (default today) on a noisy exponential trend."""
+    rng = np.random.default_rng(seed)
+    end = end or dt.date.today()
+    close = 20_000 * np.exp(np.cumsum(rng.normal(0.0008, 0.03, n)))
+    days = np.arange(np.datetime64(end) - n + 1, np.datetime64(end) + 1)
+    ts = days.astype("datetime64[ms]").astype("int64")
+    return pd.DataFrame({"timestamp": ts, "open": close, "high": close, "low": close,
+                         "close": close, "volume": 1.0, "price": close})
+
+
+def synthetic_log(n: int, seed: int = 0, start: dt.date = dt.date(2000, 1, 1)) -> np.ndarray:
+    """``n`` consecutive daily log records (``LOG_RECORD_DTYPE``), about a fifth of them skip days."""
+    rng = np.random.default_rng(seed)
+    price = 5_000 * np.exp(np.cumsum(rng.normal(0.0003, 0.03, n)))
+    buy_usd = np.where(rng.random(n) < 0.8, np.round(rng.uniform(1.0, 20.0, n), 4), 0.0)
+    records = np.empty(n, dtype=tb.LOG_RECORD_DTYPE)
+    records["day"] = tb._day_number(start) + np.arange(n)
+    records["buy_usd"] = buy_usd
+    records["buy_btc"] = buy_usd / price
+    records["price_usd"] = price
+    return records
+
+
+def _rendered(report):
+    if report is None:  # generate_dashboard_charts reports its own errors and returns None
+        raise RuntimeError("dashboard was not rendered")
+    return report
+
+
+def _log_frame(records: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({"date": records["day"].astype("datetime64[D]").astype(str), "buy_usd": records["buy_usd"],
+                         "buy_btc": records["buy_btc"], "price_usd": records["price_usd"]}, columns=tb.LOG_COLUMNS)
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Median/min wall time over ``repeat`` runs plus peak traced memory of one more run."""
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            fn(*args)
+            times.append(time.perf_counter() - started)
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"repeat": repeat, "median_s": float(np.median(times)), "min_s": float(np.min(times)),
+            "peak_mib": round(peak / 2 ** 20, 3)}
+
+
+def _cases(workdir: str, candle_scales, log_scales, profile: str):
+    """Yield ``(name, scale, fn, setup)`` for every benchmark case."""
+    for n in candle_scales:
+        candles = synthetic_candles(n)
+        closes = candles["price"].to_numpy()
+        yield "harmonic_mean", n, lambda c=closes: tb._harmonic_mean(c), None
+        yield "decision", n, lambda c=candles: tb.get_today_investment_amount(c, tb.BASELINE_INVESTMENT), None
+
+    for n in log_scales:
+        records = synthetic_log(n)
+        frame = _log_frame(records)
+        price = float(records["price_usd"][-1])
+        store = os.path.join(workdir, f"log_{n}.dat")
+        csv_path = os.path.join(workdir, f"log_{n}.csv")
+        tb._write_log_store(store, records)
+        frame.to_csv(csv_path, index=False)
+        next_day = [int(records["day"][-1])]
+
+        def append_setup(next_day=next_day, price=price):
+            next_day[0] += 1
+            date = str(np.datetime64(next_day[0], "D"))
+            return ({"date": date, "buy_usd": 5.0, "buy_btc": 5.0 / price, "price_usd": price},)
+
+        yield "summary", n, lambda f=frame, p=price: tb.calculate_portfolio_summary(f, p), None
+        yield "summary_mapped", n, (lambda s=store, c=csv_path, p=price: tb.calculate_portfolio_summary(
+            tb.read_trade_log_records(s, c), p)), None
+        yield "log_read", n, lambda s=store, c=csv_path: tb.read_trade_log(s, c), None
+        yield "log_append", n, (lambda entry, s=store, c=csv_path: tb.upsert_trade_log(entry, s, c, partition="none")), \
+            append_setup
+        parted = os.path.join(workdir, f"log_{n}_parted.dat")
+        parted_csv = os.path.join(workdir, f"log_{n}_parted.csv")
+        parted_day = [int(records["day"][-1])]
+
+        def parted_setup(records=records, parted=parted, parted_csv=parted_csv, parted_day=parted_day, price=price):
+            if not os.path.exists(parted):
+                tb._write_log_store(parted, records)
+                tb.rotate_trade_log(parted, parted_csv, before=str(np.datetime64(parted_day[0], "D")), granularity="year")
+            return append_setup(parted_day, price)
+
+        yield "log_append_partitioned", n, (lambda entry, s=parted, c=parted_csv: tb.upsert_trade_log(
+            entry, s, c, partition="year")), parted_setup
+        dates = pd.to_datetime(frame["date"])
+        yield "smooth_curve", n, lambda d=dates, v=records["price_usd"]: tb._smooth_curve(d, v), None
+        output = os.path.join(workdir, f"dashboard_{n}.png")
+        yield "dashboard", n, (lambda f=frame, o=output: _rendered(tb.generate_dashboard_charts(
+            f, profile=profile, output=o, use_cache=False))), None
+        html_output = os.path.join(workdir, f"dashboard_{n}.html")
+        yield "dashboard_html", n, (lambda r=records, o=html_output: _rendered(tb.generate_dashboard_html(
+            r[r["buy_usd"] > 0], output=o))), None
+
+
+def run_benchmarks(repeat: int = 5, quick: bool = False, profile: str = "preview", only=None) -> dict:
+    candle_scales = QUICK_CANDLE_SCALES if quick else CANDLE_SCALES
+    log_scales = QUICK_LOG_SCALES if quick else LOG_SCALES
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dca-bench-") as workdir:
+        for name, scale, fn, setup in _cases(workdir, candle_scales, log_scales, profile):
+            if only and name not in only:
+                continue
+            key = f"{name}[{scale}]"
+            results[key] = {"case": name, "scale": scale, **measure(fn, min(repeat, SLOW_CASES.get(name, repeat)), setup)}
+            r = results[key]
+            print(f"   {key:<28}{r['median_s'] * 1000:>12.3f} ms   peak {r['peak_mib']:>9.2f} MiB")
+    return results
+
+
+def _metadata() -> dict:
+    commit = None
+    with contextlib.suppress(Exception):
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    return {"time": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare_results(current: dict, baseline: dict, threshold: float,
+                    min_seconds: float = MIN_REGRESSION_SECONDS) -> list:
+    """``(case, baseline_s, current_s, change)`` for every case slower than ``1 + threshold`` times baseline.
+
+    Best-of-N times are compared, being the least noisy, and slowdowns under
+    ``min_seconds`` are ignored.
+    """
+    regressions = []
+    for key, result in current.items():
+        before = baseline.get(key)
+        if not before or before["min_s"] <= 0:
+            continue
+        change = result["min_s"] / before["min_s"] - 1
+        if change > threshold and result["min_s"] - before["min_s"] >= min_seconds:
+            regressions.append((key, before["min_s"], result["min_s"], change))
+    return regressions
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the decision, logging and dashboard hot paths.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results JSON.")
+    parser.add_argument("--compare", help="Earlier results JSON to check for regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (slow cases use fewer).")
+    parser.add_argument("--quick", action="store_true", help="Smallest scale only.")
+    parser.add_argument("--profile", default="preview", choices=sorted(tb.RENDER_PROFILES), help="Dashboard render profile.")
+    parser.add_argument("--case", action="append", help="Only run these cases (e.g. --case decision --case log_read).")
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    print(f"Running benchmarks ({'quick' if args.quick else 'full'}, {args.repeat} repeats)...")
+    results = run_benchmarks(repeat=args.repeat, quick=args.quick, profile=args.profile, only=args.case)
+    payload = {"meta": _metadata(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare_results(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"🔴 {len(regressions)} case(s) slower than {args.compare} by more than {args.threshold:.0%}:")
+            for key, before, now, change in regressions:
+                print(f"   {key:<28}{before * 1000:>10.3f} ms -> {now * 1000:>10.3f} ms ({change:+.0%})")
+            sys.exit(1)
+        print(f"✅ No case slower than {args.compare} by more than {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local Mock OKX Exchange
+-----------------------
+An in-process stand-in for the parts of OKX the bot talks to, so a full
+``trade_bot.main()`` run needs no credentials, no network and no real money:
+
+* ``MockOKX`` implements the ccxt calls the bot makes (``load_markets``,
+  ``set_markets``, ``fetch_markets_by_type``, ``fetch_ohlcv`` and
+  ``create_market_buy_order_with_cost``) on top of a scripted daily price
+  series. The current day's candle is still open: its close moves from the
+  open towards the scripted close as the clock advances.
+* ``CandleServer`` serves ``/api/v5/market/candles`` (and ``history-candles``)
+  on localhost from the same series, for the REST fallback and hedged fetch.
+* Orders fill at the live price plus ``slippage``, partially when a fill
+  ratio below 1 is scripted. Every call can be given latency, and failures
+  can be queued per call: ``none_key`` (the ``load_markets()`` sort crash),
+  ``network``, ``timeout``, ``rate_limit``, ``invalid_order``, ``insufficient``, ``empty``
+  (no candles) and ``http500``.
+* ``AsyncMockOKX`` presents the same exchange as ``ccxt.async_support``
+  does, for ``multi_runner``.
+* ``SimClock`` replaces the wall clock through ``trade_bot.set_clock``, and
+  retry back-off advances it instead of sleeping, so ``replay`` runs a year
+  of daily bot runs in seconds.
+
+Example:
+    python mock_okx.py replay --days 365
+    python mock_okx.py replay --days 365 --fill-ratio 0.7 --fault fetch_ohlcv:network:5 --fault order:invalid_order:30
+    python mock_okx.py serve --port 8765
+    DCA_OKX_REST_BASE=http://127.0.0.1:8765 python trade_bot.py decide
+"""
+
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import datetime as dt
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import trade_bot as tb
+
+try:  # raise the real ccxt exception types when ccxt is installed, so the bot's handlers see what they expect
+    from ccxt.base.errors import (BadRequest, BadSymbol, ExchangeError, ExchangeNotAvailable, InsufficientFunds,
+                                  InvalidOrder, NetworkError, RateLimitExceeded, RequestTimeout)
+except ImportError:  # pragma: no cover - same hierarchy, minus the rest of ccxt
+    class ExchangeError(Exception):
+        pass
+
+    class BadRequest(ExchangeError):
+        pass
+
+    class BadSymbol(BadRequest):
+        pass
+
+    class InvalidOrder(ExchangeError):
+        pass
+
+    class InsufficientFunds(ExchangeError):
+        pass
+
+    class NetworkError(Exception):
+        pass
+
+    class ExchangeNotAvailable(NetworkError):
+        pass
+
+    class RequestTimeout(NetworkError):
+        pass
+
+    class RateLimitExceeded(NetworkError):
+        pass
+
+DAY_MS = 86_400_000
+REPLAY_START = dt.date(2024, 1, 1)
+REPLAY_RUN_HOUR = 2  # the workflow's cron runs at 02:00 UTC
+REST_PATHS = ("/api/v5/market/candles", "/api/v5/market/history-candles")
+REST_MAX_LIMIT = 300
+FAULT_KINDS = ("none_key", "network", "timeout", "rate_limit", "invalid_order", "insufficient", "empty", "http500")
+
+
+class SimClock:
+    """Callable UTC clock for ``trade_bot.set_clock``; ``sleep`` moves it forward without waiting."""
+
+    def __init__(self, start: dt.datetime):
+        self.now = start if start.tzinfo else start.replace(tzinfo=dt.timezone.utc)
+        self.slept = 0.0
+
+    def __call__(self) -> dt.datetime:
+        return self.now
+
+    def advance(self, **delta) -> None:
+        self.now += dt.timedelta(**delta)
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+        self.now += dt.timedelta(seconds=seconds)
+
+
+def scripted_closes(n: int, seed: int = 0, start_price: float = 40_000.0, drift: float = 0.0005,
+                    vol: float = 0.03) -> np.ndarray:
+    """``n`` daily closes on a geometric random walk."""
+    rng = np.random.default_rng(seed)
+    return start_price * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+
+
+def market_structure(symbol: str = tb.OKX_SYMBOL) -> dict:
+    base, quote = symbol.split("/")
+    inst_id = f"{base}-{quote}"
+    return {"id": inst_id, "symbol": symbol, "base": base, "quote": quote, "type": "spot", "spot": True,
+            "active": True, "precision": {"amount": 1e-8, "price": 0.1},
+            "limits": {"amount": {"min": 1e-5, "max": None}, "cost": {"min": 1.0, "max": None}},
+            "info": {"instId": inst_id, "instType": "SPOT"}}
+
+
+class MockOKX:
+    """Scripted OKX spot exchange with the ccxt methods the bot uses.
+
+    ``first_day`` is the date of ``closes[0]``; days after the last scripted
+    close repeat it. ``fills`` maps ISO dates to a fill ratio that overrides
+    ``fill_ratio`` for orders placed on that day. ``latency`` maps a call name
+    (``load_markets``, ``fetch_markets``, ``fetch_ohlcv``, ``order``,
+    ``candles_rest``) to seconds of real delay.
+    """
+
+    id = "okx"
+
+    def __init__(self, closes, first_day: dt.date, clock=None, symbol: str = tb.OKX_SYMBOL,
+                 fill_ratio: float = 1.0, fills: dict = None, slippage: float = 0.0, latency: dict = None,
+                 balance: float = float("inf")):
+        self.closes = np.asarray(closes, dtype=float)
+        self.first_day = first_day
+        self.clock = clock or (lambda: dt.datetime.now(dt.timezone.utc))
+        self.symbol = symbol
+        self.fill_ratio = fill_ratio
+        self.fills = fills or {}
+        self.slippage = slippage
+        self.latency = latency or {}
+        self.balance = balance
+        self.markets = {}
+        self.currencies = {}
+        self.orders = []
+        self.configs = []
+        self.calls = Counter()
+        self._faults = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    # --- scripting ---
+    def inject(self, call: str, *kinds) -> None:
+        """Make the next ``len(kinds)`` ``call``s fail with these fault kinds, in order."""
+        unknown = set(kinds) - set(FAULT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown fault kind(s) {sorted(unknown)}; expected {FAULT_KINDS}")
+        with self._lock:
+            self._faults[call].extend(kinds)
+
+    def _enter(self, call: str):
+        """Count the call, apply its latency and raise (or return) the next queued fault."""
+        with self._lock:
+            self.calls[call] += 1
+            fault = self._faults[call].popleft() if self._faults[call] else None
+        if self.latency.get(call):
+            time.sleep(self.latency[call])
+        if fault is None or fault == "empty":
+            return fault
+        if fault == "none_key":
+            raise TypeError("'<' not supported between instances of 'NoneType' and 'str'")
+        if fault == "network":
+            raise NetworkError(f"okx mock: connection reset during {call}")
+        if fault == "timeout":
+            raise RequestTimeout(f"okx mock: {call} timed out")
+        if fault == "rate_limit":
+            raise RateLimitExceeded(f"okx mock: too many requests during {call}")
+        if fault == "invalid_order":
+            raise InvalidOrder("okx mock: order size does not satisfy lot size")
+        if fault == "insufficient":
+            raise InsufficientFunds("okx mock: insufficient USDT balance")
+        raise ExchangeNotAvailable(f"okx mock: 500 Internal Server Error during {call}")
+
+    # --- prices ---
+    def _day_index(self, day: dt.date) -> int:
+        return (day - self.first_day).days
+
+    def _close(self, i: int) -> float:
+        return float(self.closes[min(max(i, 0), len(self.closes) - 1)])
+
+    def candles(self, now: dt.datetime = None) -> list:
+        """Every candle up to ``now`` as ``[ts, o, h, l, c, v]``; the newest is still open."""
+        now = now or self.clock()
+        today_index = self._day_index(now.date())
+        last = min(today_index, len(self.closes) - 1 + max(0, today_index - len(self.closes) + 1))
+        rows = []
+        start_ms = tb._day_number(self.first_day) * DAY_MS
+        for i in range(0, max(0, last) + 1):
+            open_ = self._close(i - 1) if i else self._close(0)
+            close = self._close(i)
+            if i == today_index:
+                elapsed = (now - dt.datetime.combine(now.date(), dt.time(), tzinfo=dt.timezone.utc)).total_seconds()
+                close = open_ + (close - open_) * elapsed / 86_400
+            rows.append([start_ms + i * DAY_MS, open_, max(open_, close), min(open_, close), close, 100.0])
+        return rows
+
+    def price(self) -> float:
+        return self.candles()[-1][4]
+
+    # --- ccxt surface ---
+    def load_markets(self, reload: bool = False, params=None) -> dict:
+        if self.markets and not reload:
+            return self.markets
+        self._enter("load_markets")
+        self.markets = {self.symbol: market_structure(self.symbol)}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None) -> dict:
+        values = markets.values() if isinstance(markets, dict) else markets
+        self.markets = {m["symbol"]: m for m in values}
+        return self.markets
+
+    def fetch_markets_by_type(self, type_: str, params=None) -> list:
+        self._enter("fetch_markets")
+        inst_id = (params or {}).get("instId")
+        market = market_structure(self.symbol)
+        return [market] if type_ == "spot" and inst_id in (None, market["id"]) else []
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = "1d", since: int = None, limit: int = None, params=None) -> list:
+        self.load_markets()  # ccxt loads markets implicitly, which is where the None-key crash surfaces
+        if self._enter("fetch_ohlcv") == "empty":
+            return []
+        if symbol not in self.markets:
+            raise BadSymbol(f"okx mock does not have market symbol {symbol}")
+        if timeframe != "1d":
+            raise BadRequest(f"okx mock only serves 1d candles, not {timeframe}")
+        rows = self.candles()
+        if since is not None:
+            rows = [r for r in rows if r[0] >= since]
+            return rows[:limit] if limit else rows
+        return rows[-limit:] if limit else rows
+
+    def create_market_buy_order_with_cost(self, symbol: str, cost: float, params=None) -> dict:
+        self.load_markets()
+        self._enter("order")
+        market = self.markets.get(symbol)
+        if market is None:
+            raise BadSymbol(f"okx mock does not have market symbol {symbol}")
+        if cost < market["limits"]["cost"]["min"]:
+            raise InvalidOrder(f"okx mock: cost {cost} below minimum {market['limits']['cost']['min']}")
+        if cost > self.balance:
+            raise InsufficientFunds(f"okx mock: cost {cost} exceeds balance {self.balance}")
+        now = self.clock()
+        ratio = float(self.fills.get(now.date().isoformat(), self.fill_ratio))
+        average = self.price() * (1 + self.slippage)
+        spent = round(cost * ratio, 8)
+        self.balance -= spent
+        order = {"id": str(len(self.orders) + 1), "clientOrderId": None, "symbol": symbol, "type": "market",
+                 "side": "buy", "timestamp": int(now.timestamp() * 1000), "datetime": now.isoformat(),
+                 "price": average, "average": average if spent else None, "cost": spent,
+                 "amount": round(cost / average, 8), "filled": round(spent / average, 8) if spent else 0.0,
+                 "remaining": round((cost - spent) / average, 8), "status": "closed" if ratio >= 1 else "canceled",
+                 "fee": {"currency": market["base"], "cost": 0.0}}
+        self.orders.append(order)
+        return order
+
+    # --- REST ---
+    def rest_candles(self, query: dict):
+        """OKX-format payload for a candles request, or ``None`` to answer HTTP 500."""
+        try:
+            fault = self._enter("candles_rest")
+        except ExchangeNotAvailable:
+            return None
+        except (NetworkError, TypeError, ExchangeError) as e:
+            return {"code": "50001", "msg": str(e), "data": []}
+        if query.get("instId") != self.symbol.replace("/", "-"):
+            return {"code": "51001", "msg": "Instrument ID does not exist", "data": []}
+        limit = min(int(query.get("limit") or 100), REST_MAX_LIMIT)
+        rows = [] if fault == "empty" else self.candles()
+        if query.get("after"):  # older than
+            rows = [r for r in rows if r[0] < int(query["after"])]
+        if query.get("before"):  # newer than
+            rows = [r for r in rows if r[0] > int(query["before"])]
+            rows = rows[:limit]
+        else:
+            rows = rows[-limit:]
+        newest = rows[-1][0] if rows else None
+        data = [[str(r[0]), *(f"{v:.8f}" for v in r[1:5]), f"{r[5]:g}", f"{r[5] * r[4]:.2f}", f"{r[5] * r[4]:.2f}",
+                 "0" if r[0] == newest and newest // DAY_MS == tb._day_number(self.clock().date()) else "1"]
+                for r in reversed(rows)]
+        return {"code": "0", "msg": "", "data": data}
+
+
+class CandleServer:
+    """Serve ``exchange.rest_candles`` on localhost in a background thread."""
+
+    def __init__(self, exchange: MockOKX, host: str = "127.0.0.1", port: int = 0):
+        exchange_ref = exchange
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path not in REST_PATHS:
+                    self.send_error(404)
+                    return
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                payload = exchange_ref.rest_candles(query)
+                if payload is None:
+                    self.send_error(500, "mock internal error")
+                    return
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self) -> "CandleServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-okx-rest", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def ccxt_namespace(exchange: MockOKX) -> SimpleNamespace:
+    """What ``trade_bot._load_ccxt()`` should return: ``okx(config)`` yields ``exchange``."""
+    def okx(config=None):
+        exchange.configs.append(dict(config or {}))
+        return exchange
+    return SimpleNamespace(okx=okx, ExchangeError=ExchangeError, BadRequest=BadRequest, BadSymbol=BadSymbol,
+                           InvalidOrder=InvalidOrder, InsufficientFunds=InsufficientFunds, NetworkError=NetworkError,
+                           ExchangeNotAvailable=ExchangeNotAvailable, RequestTimeout=RequestTimeout,
+                           RateLimitExceeded=RateLimitExceeded)
+
+
+class AsyncMockOKX:
+    """``ccxt.async_support`` view of a ``MockOKX``: the same state, with network calls as coroutines.
+
+    ``multi_runner`` builds one instance per account; they all share ``exchange``.
+    """
+
+    _ASYNC_PREFIXES = ("load_", "fetch_", "create_")
+
+    def __init__(self, exchange: MockOKX):
+        object.__setattr__(self, "_exchange", exchange)
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if not (callable(attr) and name.startswith(self._ASYNC_PREFIXES)):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._exchange, name, value)
+
+    async def close(self) -> None:
+        pass
+
+
+def async_ccxt_namespace(exchange: MockOKX) -> SimpleNamespace:
+    """``ccxt_namespace`` for ``multi_runner.MultiRunner(ccxt_module=...)``: ``okx(config)`` yields an ``AsyncMockOKX``."""
+    namespace = ccxt_namespace(exchange)
+    sync_okx = namespace.okx
+    namespace.okx = lambda config=None: AsyncMockOKX(sync_okx(config))
+    return namespace
+
+
+@contextlib.contextmanager
+def installed(exchange: MockOKX, clock=None, rest_url: str = None):
+    """Point ``trade_bot`` at ``exchange`` (and optionally a clock and REST server) for the block."""
+    saved = (tb.ccxt, tb._clock, tb.OKX_PUBLIC_CANDLES_URL, tb.OKX_HISTORY_CANDLES_URL)
+    tb.ccxt = ccxt_namespace(exchange)
+    tb.set_clock(clock)
+    if rest_url:
+        tb.OKX_PUBLIC_CANDLES_URL = rest_url + REST_PATHS[0]
+        tb.OKX_HISTORY_CANDLES_URL = rest_url + REST_PATHS[1]
+    try:
+        yield exchange
+    finally:
+        tb.ccxt, tb._clock, tb.OKX_PUBLIC_CANDLES_URL, tb.OKX_HISTORY_CANDLES_URL = saved
+
+
+def _parse_fault(spec: str) -> tuple:
+    """``"call:kind:every"`` -> ``(call, kind, every)``; ``every`` defaults to 1 (every day)."""
+    parts = spec.split(":")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"Fault must be call:kind[:every], got {spec!r}")
+    every = int(parts[2]) if len(parts) == 3 else 1
+    if parts[1] not in FAULT_KINDS or every < 1:
+        raise argparse.ArgumentTypeError(f"Bad fault {spec!r}; kinds are {', '.join(FAULT_KINDS)}")
+    return parts[0], parts[1], every
+
+
+def replay(days: int = 365, first_day: dt.date = REPLAY_START, history: int = 250, closes=None, seed: int = 0,
+           fill_ratio: float = 1.0, slippage: float = 0.0, faults=(), latency: dict = None,
+           hedge_delay: float = 0.1, charts: bool = False, workdir: str = None, verbose: bool = False) -> dict:
+    """Run ``trade_bot.main()`` once per simulated day against a fresh mock exchange.
+
+    Each run happens at 02:00 UTC on its day in ``workdir`` (a temporary
+    directory by default), so logs, caches and metrics start empty. ``faults``
+    holds ``(call, kind, every)`` tuples injected before every ``every``-th day.
+    """
+    closes = scripted_closes(history + days, seed) if closes is None else np.asarray(closes, dtype=float)
+    exchange = MockOKX(closes, first_day - dt.timedelta(days=history), fill_ratio=fill_ratio,
+                       slippage=slippage, latency=latency)
+    clock = SimClock(dt.datetime.combine(first_day, dt.time(REPLAY_RUN_HOUR), tzinfo=dt.timezone.utc))
+    exchange.clock = clock
+    saved_env = {k: os.environ.get(k) for k in ("OKX_API_KEY", "OKX_SECRET_KEY", "OKX_PASSWORD",
+                                                 "GITHUB_REPOSITORY", "GITHUB_TOKEN")}
+    saved_hedge, saved_cwd = tb.HEDGE_DELAY, os.getcwd()
+    walls, outputs = [], []
+    with contextlib.ExitStack() as stack:
+        workdir = workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="dca-replay-"))
+        server = stack.enter_context(CandleServer(exchange))
+        stack.enter_context(installed(exchange, clock, server.url))
+        os.environ.update(OKX_API_KEY="mock", OKX_SECRET_KEY="mock", OKX_PASSWORD="mock")
+        for key in ("GITHUB_REPOSITORY", "GITHUB_TOKEN"):
+            os.environ.pop(key, None)
+        tb.HEDGE_DELAY = hedge_delay
+        os.makedirs(workdir, exist_ok=True)
+        os.chdir(workdir)
+        try:
+            for i in range(days):
+                for call, kind, every in faults:
+                    if i % every == 0:
+                        exchange.inject(call, kind)
+                buffer = io.StringIO()
+                started = time.perf_counter()
+                with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(buffer):
+                    tb.main(charts=charts and i == days - 1)
+                walls.append(time.perf_counter() - started)
+                outputs.append(buffer.getvalue())
+                clock.now = dt.datetime.combine(first_day + dt.timedelta(days=i + 1), dt.time(REPLAY_RUN_HOUR),
+                                                tzinfo=dt.timezone.utc)
+            log = tb.read_trade_log()
+            with open(tb.METRICS_FILE, "r", encoding="utf-8") as fh:
+                runs = [json.loads(line) for line in fh if line.strip()]
+        finally:
+            os.chdir(saved_cwd)
+            tb.HEDGE_DELAY = saved_hedge
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    statuses = Counter(run["status"] for run in runs)
+    return {
+        "days": days,
+        "first_day": first_day.isoformat(),
+        "statuses": dict(statuses),
+        "orders": len(exchange.orders),
+        "partial_fills": sum(order["status"] != "closed" for order in exchange.orders),
+        "invested_usd": float(log["buy_usd"].sum()),
+        "btc": float(log["buy_btc"].sum()),
+        "log_rows": int(len(log)),
+        "calls": dict(exchange.calls),
+        "simulated_backoff_s": round(clock.slept, 1),
+        "wall_s": round(sum(walls), 3),
+        "per_run_ms": round(1000 * float(np.median(walls)), 2) if walls else None,
+        "failed_output": next((out for out, run in zip(outputs, runs) if run["status"] == "failed"), None),
+    }
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mock OKX exchange for offline end-to-end runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="Replay daily bot runs against the mock on a simulated clock.")
+    rp.add_argument("--days", type=int, default=365, help="Daily runs to replay.")
+    rp.add_argument("--start", default=REPLAY_START.isoformat(), help="First replayed day (YYYY-MM-DD).")
+    rp.add_argument("--ohlcv", help="CSV of candles to script prices from (default: seeded random walk).")
+    rp.add_argument("--seed", type=int, default=0, help="Seed of the scripted random walk.")
+    rp.add_argument("--fill-ratio", type=float, default=1.0, help="Share of each order that fills.")
+    rp.add_argument("--slippage", type=float, default=0.0, help="Fill price above the live price (0.001 = 0.1%%).")
+    rp.add_argument("--fault", type=_parse_fault, action="append", default=[],
+                    help="call:kind[:every], e.g. load_markets:none_key:7 or candles_rest:http500:3.")
+    rp.add_argument("--latency", action="append", default=[],
+                    help="call:seconds of real delay per call, e.g. fetch_ohlcv:0.05.")
+    rp.add_argument("--hedge-delay", type=float, default=0.1, help="Seconds before the REST hedge starts.")
+    rp.add_argument("--charts", action="store_true", help="Render the dashboard after the last day.")
+    rp.add_argument("--workdir", help="Keep the logs, caches and metrics here instead of a temp dir.")
+    rp.add_argument("--verbose", action="store_true", help="Show every run's output.")
+    sv = sub.add_parser("serve", help="Serve the candles endpoint on localhost with the wall clock.")
+    sv.add_argument("--port", type=int, default=8765)
+    sv.add_argument("--days", type=int, default=400, help="Scripted candles ending today.")
+    sv.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    if args.command == "serve":
+        first_day = dt.datetime.now(dt.timezone.utc).date() - dt.timedelta(days=args.days - 1)
+        exchange = MockOKX(scripted_closes(args.days, args.seed), first_day)
+        with CandleServer(exchange, port=args.port) as server:
+            print(f"Serving mock OKX candles at {server.url}{REST_PATHS[0]} (Ctrl+C to stop)")
+            print(f"   DCA_OKX_REST_BASE={server.url} python trade_bot.py decide")
+            with contextlib.suppress(KeyboardInterrupt):
+                threading.Event().wait()
+        return
+    closes = None
+    if args.ohlcv:
+        closes = tb.load_history_frame(args.ohlcv)["price"].to_numpy(dtype=float)
+        if len(closes) <= args.days:
+            raise SystemExit(f"{args.ohlcv} has {len(closes)} candles; need more than --days {args.days}.")
+    latency = {call: float(seconds) for call, seconds in (spec.split(":") for spec in args.latency)}
+    history = 250 if closes is None else len(closes) - args.days
+    print(f"Replaying {args.days} daily run(s) from {args.start} against the mock exchange...")
+    summary = replay(args.days, dt.date.fromisoformat(args.start), history=history, closes=closes, seed=args.seed,
+                     fill_ratio=args.fill_ratio, slippage=args.slippage, faults=args.fault, latency=latency,
+                     hedge_delay=args.hedge_delay, charts=args.charts, workdir=args.workdir, verbose=args.verbose)
+    failed_output = summary.pop("failed_output")
+    print(f"✅ {summary['days']} run(s) in {summary['wall_s']:.2f}s ({summary['per_run_ms']} ms median per run)")
+    print(json.dumps(summary, indent=2))
+    if failed_output:
+        print("First failed run's output:\n" + failed_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo Simulator for the AHR999 Smart DCA Strategy
+-------------------------------------------------------
+The dashboard compares Smart DCA with fixed-amount DCA on the one history that
+actually happened. This script generates many synthetic futures instead and
+runs both strategies on all of them:
+
+* ``bootstrap``: blocks of consecutive historical daily log-returns, drawn with
+  replacement, so volatility clustering inside a block is kept
+* ``gbm``: geometric Brownian motion with drift and volatility estimated from
+  the same history (or given with ``--mu`` / ``--sigma``)
+
+Every path continues from the last real close, with the 199 closes before it
+seeding the 200-day harmonic mean. Paths are simulated as one 2D array per
+chunk (one row per path) and the AHR999 rule runs through
+``trade_bot.simulate_strategy`` on the whole block at once; there is no Python
+loop over paths or days. Chunks can be spread over processes and each chunk
+has its own seed, so results do not depend on ``--processes``.
+
+Example:
+    python montecarlo.py --ohlcv btc_daily.csv --paths 10000 --years 5
+    python montecarlo.py --start 2018-01-01 --method gbm --processes 4 --output mc_paths.csv
+"""
+
+import time
+import math
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import trade_bot as tb
+
+METHODS = ("bootstrap", "gbm")
+REPORT_METRICS = ("final_roi", "btc_accumulated", "capital_deployed", "max_drawdown")
+STRATEGIES = ("smart", "fixed")
+PERCENTILES = (5, 25, 50, 75, 95)
+DAYS_PER_YEAR = 365
+
+
+def log_returns(historical_df: pd.DataFrame) -> tuple:
+    """``(closes, daily_log_returns)`` from the valid closes of ``historical_df``."""
+    closes = pd.to_numeric(historical_df["price"], errors="coerce").to_numpy(dtype=float)
+    closes = closes[np.isfinite(closes) & (closes > 0)]
+    if len(closes) < tb.DCA_WINDOW:
+        raise ValueError(f"Need at least {tb.DCA_WINDOW} valid closes, got {len(closes)}.")
+    return closes, np.diff(np.log(closes))
+
+
+def bootstrap_returns(returns: np.ndarray, n_paths: int, days: int, block: int, rng) -> np.ndarray:
+    """``(n_paths, days)`` log-returns built from random blocks of ``returns``."""
+    block = max(1, min(block, len(returns)))
+    n_blocks = math.ceil(days / block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :days]
+    return returns[idx]
+
+
+def gbm_returns(mu: float, sigma: float, n_paths: int, days: int, rng) -> np.ndarray:
+    """``(n_paths, days)`` daily GBM log-returns for annual drift ``mu`` and volatility ``sigma``."""
+    dt_year = 1.0 / DAYS_PER_YEAR
+    return rng.normal((mu - 0.5 * sigma ** 2) * dt_year, sigma * math.sqrt(dt_year), size=(n_paths, days))
+
+
+def path_ahr999(seed_closes: np.ndarray, prices: np.ndarray, growth: np.ndarray) -> np.ndarray:
+    """AHR999 for every simulated day of every path.
+
+    ``seed_closes`` are the ``DCA_WINDOW - 1`` real closes before the first
+    simulated day; the harmonic mean of each trailing window is taken from a
+    running sum of reciprocals along each row, as in ``_rolling_harmonic_mean``.
+    Simulated prices are always positive and finite, so no slot is excluded.
+    """
+    window = tb.DCA_WINDOW
+    n_paths, days = prices.shape
+    full = np.concatenate([np.broadcast_to(seed_closes, (n_paths, window - 1)), prices], axis=1)
+    csum = np.zeros((n_paths, full.shape[1] + 1))
+    np.cumsum(1.0 / full, axis=1, out=csum[:, 1:])
+    hi = np.arange(window, window + days)
+    dca200 = window / (csum[:, hi] - csum[:, hi - window])
+    return (prices / dca200) * (prices / growth)
+
+
+def _max_drawdown_rows(roi: np.ndarray) -> np.ndarray:
+    """``trade_bot.max_drawdown`` for every row of ``roi``."""
+    equity = 1.0 + roi
+    return np.max(1.0 - equity / np.maximum.accumulate(equity, axis=1), axis=1)
+
+
+def simulate_chunk(task: dict) -> dict:
+    """Simulate one chunk of paths and return per-path results for both strategies."""
+    rng = np.random.default_rng(task["seed"])
+    n_paths, days = task["paths"], task["days"]
+    if task["method"] == "bootstrap":
+        steps = bootstrap_returns(task["returns"], n_paths, days, task["block"], rng)
+    else:
+        steps = gbm_returns(task["mu"], task["sigma"], n_paths, days, rng)
+    prices = task["last_close"] * np.exp(np.cumsum(steps, axis=1))
+    baseline = task["baseline"]
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ahr999 = path_ahr999(task["seed_closes"], prices, task["growth"])
+    smart = tb.simulate_strategy(prices, ahr999, baseline, task["params"])
+
+    fixed_btc = np.cumsum(baseline / prices, axis=1)
+    fixed_cost = baseline * np.arange(1, days + 1)
+    fixed_roi = fixed_btc * prices / fixed_cost - 1
+
+    return {
+        "smart_final_roi": smart["roi"][:, -1],
+        "smart_btc_accumulated": smart["hold_btc_cum"][:, -1],
+        "smart_capital_deployed": smart["invest_cum"][:, -1],
+        "smart_max_drawdown": _max_drawdown_rows(smart["roi"]),
+        "smart_days_traded": smart["traded"].sum(axis=1),
+        "fixed_final_roi": fixed_roi[:, -1],
+        "fixed_btc_accumulated": fixed_btc[:, -1],
+        "fixed_capital_deployed": np.full(n_paths, fixed_cost[-1]),
+        "fixed_max_drawdown": _max_drawdown_rows(fixed_roi),
+        "final_price": prices[:, -1],
+    }
+
+
+def run_simulation(historical_df: pd.DataFrame, n_paths: int = 10_000, years: float = 5.0,
+                   method: str = "bootstrap", block: int = 30, baseline: float = None, params: dict = None,
+                   mu: float = None, sigma: float = None, seed: int = 0, chunk_size: int = 1_000,
+                   processes: int = 1) -> pd.DataFrame:
+    """One row per simulated path with both strategies' outcomes."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {METHODS}")
+    closes, returns = log_returns(historical_df)
+    days = int(round(years * DAYS_PER_YEAR))
+    last_day = tb._candle_dates(historical_df)[-1]
+    ages = (last_day + np.arange(1, days + 1) - np.datetime64(tb.GENESIS, "D")).astype("int64")
+    annual_mu = returns.mean() * DAYS_PER_YEAR + 0.5 * (returns.std() ** 2) * DAYS_PER_YEAR
+    common = {
+        "method": method,
+        "days": days,
+        "block": block,
+        "returns": returns,
+        "mu": annual_mu if mu is None else mu,
+        "sigma": returns.std() * math.sqrt(DAYS_PER_YEAR) if sigma is None else sigma,
+        "last_close": closes[-1],
+        "seed_closes": closes[-(tb.DCA_WINDOW - 1):],
+        "growth": tb.growth_estimate_array(ages),
+        "baseline": tb.BASELINE_INVESTMENT if baseline is None else baseline,
+        "params": tb.strategy_params(**(params or {})),
+    }
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [{**common, "paths": size, "seed": child} for size, child in zip(sizes, seeds)]
+
+    if processes and processes > 1 and len(tasks) > 1:
+        with Pool(min(processes, len(tasks))) as pool:
+            chunks = pool.map(simulate_chunk, tasks)
+    else:
+        chunks = [simulate_chunk(task) for task in tasks]
+    return pd.DataFrame({key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]})
+
+
+def distribution_report(results: pd.DataFrame) -> pd.DataFrame:
+    """Mean and percentiles of every metric for both strategies."""
+    rows = []
+    for metric in REPORT_METRICS:
+        for strategy in STRATEGIES:
+            values = results[f"{strategy}_{metric}"].to_numpy()
+            row = {"metric": metric, "strategy": strategy, "mean": float(np.mean(values))}
+            row.update({f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Monte Carlo comparison of Smart DCA and fixed DCA.")
+    parser.add_argument("--ohlcv", help="CSV of candles; fetched from OKX public API when omitted.")
+    parser.add_argument("--start", help="Fetch OKX deep history from this date (YYYY-MM-DD) when --ohlcv is not given.")
+    parser.add_argument("--limit", type=int, default=300, help="Candles to fetch when neither --ohlcv nor --start is given.")
+    parser.add_argument("--paths", type=int, default=10_000, help="Number of simulated price paths.")
+    parser.add_argument("--years", type=float, default=5.0, help="Length of each path in years.")
+    parser.add_argument("--method", default="bootstrap", choices=METHODS, help="Path generator.")
+    parser.add_argument("--block", type=int, default=30, help="Bootstrap block length in days.")
+    parser.add_argument("--mu", type=float, default=None, help="GBM annual drift (default: estimated from history).")
+    parser.add_argument("--sigma", type=float, default=None, help="GBM annual volatility (default: estimated from history).")
+    parser.add_argument("--baseline", type=float, default=None, help="Baseline investment (default: BASELINE_INVESTMENT).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--chunk-size", type=int, default=1_000, help="Paths simulated per array block.")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for the chunks.")
+    parser.add_argument("--output", help="Optional CSV with one row per path.")
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    historical_df = tb.load_history_frame(args.ohlcv, start=args.start, limit=args.limit)
+    print(f"Simulating {args.paths} {args.method} paths of {args.years:g} year(s) from {len(historical_df)} candles...")
+    started = time.perf_counter()
+    results = run_simulation(historical_df, n_paths=args.paths, years=args.years, method=args.method,
+                             block=args.block, baseline=args.baseline, mu=args.mu, sigma=args.sigma,
+                             seed=args.seed, chunk_size=args.chunk_size, processes=args.processes)
+    print(f"✅ Simulation finished in {time.perf_counter() - started:.2f}s")
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:,.4f}".format):
+        print(distribution_report(results).to_string(index=False))
+    beats = float(np.mean(results["smart_final_roi"] > results["fixed_final_roi"]))
+    print(f"Smart DCA ends with the higher ROI on {beats:.1%} of paths.")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"✅ Per-path results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
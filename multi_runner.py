@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-Account Runner for the AHR999 Smart DCA Strategy
+------------------------------------------------------
+Runs the daily fetch -> decide -> order -> log step for a table of
+(account, symbol, baseline) entries, one per tenant, in three phases:
+
+1. Market data: candles are fetched once per (exchange, symbol) on a public,
+   credential-less connection, and the AHR999 indicator is computed once per
+   market.
+2. Decisions: every entry's buy amount comes out of one vectorized
+   ``trade_bot.decision_arrays`` call over the whole table, with baselines,
+   per-entry strategy overrides, USD caps and minimum trades as columns.
+3. Orders: entries that trade go out through a bounded executor (at most
+   ``--max-concurrency`` orders in flight) on ``ccxt.async_support``. Each
+   exchange gets one rate limiter shared by every account on it; the
+   per-instance ccxt throttle is switched off so sub-accounts do not each
+   assume they own the whole request budget. Market metadata is loaded once
+   per exchange and handed to the other accounts' instances.
+
+Every entry keeps its own trade log store, CSV export and portfolio state under
+``logs/`` (see ``LOG_DIR``), and one consolidated report covers all entries.
+
+Example config (``accounts.json``)::
+
+    [
+      {"account": "default", "symbol": "BTC/USDT", "baseline": 5},
+      {"account": "sub1", "symbol": "BTC/USDT", "baseline": 10, "cap_usd": 25, "alpha": 2.0},
+      {"account": "sub1", "symbol": "ETH/USDT", "baseline": 3, "min_trade_usd": 2}
+    ]
+
+The same table can be a CSV with those column names (empty cells fall back to
+the defaults), which is easier for hundreds of tenants. Besides ``baseline``,
+an entry may set ``cap_usd`` (a hard daily ceiling in USD on top of the
+strategy's ``daily_cap_x``) and override any key of
+``trade_bot.strategy_params()``: ``alpha``, ``beta``, ``daily_cap_x``,
+``pause_threshold``, ``neutral_x`` and ``min_trade_usd``.
+
+Account ``default`` uses ``OKX_API_KEY`` / ``OKX_SECRET_KEY`` / ``OKX_PASSWORD``
+like the single-pair bot; any other account ``sub1`` reads the same variables
+with a ``_SUB1`` suffix.
+
+Example:
+    python multi_runner.py accounts.json --report multi_report.md
+    python multi_runner.py tenants.csv --max-concurrency 16 --dry-run
+"""
+
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import trade_bot as tb
+
+LOG_DIR = "logs"
+DEFAULT_EXCHANGE = "okx"
+CANDLE_LIMIT = 250
+MAX_CONCURRENT_ORDERS = 8
+CREDENTIAL_VARS = {"apiKey": "OKX_API_KEY", "secret": "OKX_SECRET_KEY", "password": "OKX_PASSWORD"}
+STRATEGY_KEYS = tuple(tb.strategy_params())
+
+
+def _entry_name(account: str, symbol: str) -> str:
+    return f"{account}_{symbol.replace('/', '-')}"
+
+
+def _read_config_rows(path: str) -> list:
+    """Config items from a JSON list or a CSV table; empty CSV cells are left out."""
+    if path.lower().endswith(".csv"):
+        table = pd.read_csv(path, dtype={"account": str, "symbol": str})
+        return [{k: v for k, v in row.items() if not pd.isna(v)} for row in table.to_dict("records")]
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def load_config(path: str) -> list:
+    """Read the entry table and fill in defaults, strategy overrides and per-entry file paths."""
+    entries, seen = [], set()
+    for item in _read_config_rows(path):
+        if "symbol" not in item:
+            raise ValueError(f"Config entry without a symbol: {item}")
+        account = str(item.get("account", "default"))
+        baseline = float(item.get("baseline", tb.BASELINE_INVESTMENT))
+        if baseline <= 0:
+            raise ValueError(f"Baseline must be positive for {account} {item['symbol']}: {baseline}")
+        cap_usd = float(item.get("cap_usd", math.inf))
+        if not cap_usd > 0:
+            raise ValueError(f"cap_usd must be positive for {account} {item['symbol']}: {cap_usd}")
+        name = _entry_name(account, item["symbol"])
+        if name in seen:
+            raise ValueError(f"Duplicate config entry: {account} {item['symbol']}")
+        seen.add(name)
+        log_dir = item.get("log_dir", LOG_DIR)
+        entries.append({
+            "name": name,
+            "account": account,
+            "symbol": item["symbol"],
+            "baseline": baseline,
+            "cap_usd": cap_usd,
+            "params": {key: float(item[key]) for key in STRATEGY_KEYS if key in item},
+            "exchange": item.get("exchange", DEFAULT_EXCHANGE),
+            "log_store": os.path.join(log_dir, f"{name}.dat"),
+            "log_csv": os.path.join(log_dir, f"{name}.csv"),
+            "state": os.path.join(log_dir, f"{name}_state.json"),
+        })
+    return entries
+
+
+def _market_key(entry: dict) -> tuple:
+    return entry["exchange"], entry["symbol"]
+
+
+def batch_decisions(entries: list, indicators: dict) -> dict:
+    """Every entry's buy amount in one vectorized pass.
+
+    ``indicators`` maps ``(exchange, symbol)`` to ``trade_bot.today_indicator``
+    output; entries whose market is missing get ``nan``. Baselines and strategy
+    overrides become per-entry columns fed to ``trade_bot.decision_arrays``,
+    then ``cap_usd`` is applied and ``min_trade_usd`` decides who trades, so an
+    entry without overrides gets exactly the single-pair bot's amount.
+    """
+    missing = {"price_today": np.nan, "ahr999_index": np.nan}
+    markets = [indicators.get(_market_key(entry), missing) for entry in entries]
+    ahr999 = np.array([m["ahr999_index"] for m in markets], dtype=float)
+    baseline = np.array([entry["baseline"] for entry in entries], dtype=float)
+    defaults = tb.strategy_params()
+    params = {key: np.array([entry["params"].get(key, default) for entry in entries], dtype=float)
+              for key, default in defaults.items()}
+    decision = tb.decision_arrays(ahr999, baseline, params)
+    cap_usd = np.array([entry["cap_usd"] for entry in entries], dtype=float)
+    investment = np.round(np.minimum(decision["investment_usd"], cap_usd), 4)
+    return {
+        "price": np.array([m["price_today"] for m in markets], dtype=float),
+        "ahr999": ahr999,
+        "investment_usd": investment,
+        "paused": decision["paused"],
+        "capped": decision["capped"] | (investment < decision["investment_usd"]),
+        "would_trade": np.isfinite(investment) & (investment > params["min_trade_usd"]),
+    }
+
+
+def account_credentials(account: str) -> dict:
+    suffix = "" if account == "default" else f"_{account.upper()}"
+    return {key: os.getenv(var + suffix) for key, var in CREDENTIAL_VARS.items()}
+
+
+class RateLimiter:
+    """Spaces requests to one exchange at least ``interval`` seconds apart, across all accounts."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class MultiRunner:
+    """Runs every config entry: shared market data, one vectorized decision, bounded concurrent orders."""
+
+    def __init__(self, entries: list, dry_run: bool = False, ccxt_module=None, retries: int = 3,
+                 max_concurrency: int = MAX_CONCURRENT_ORDERS):
+        self.entries = entries
+        self.dry_run = dry_run
+        self.retries = retries
+        self.max_concurrency = max(1, max_concurrency)
+        self._ccxt = ccxt_module
+        self.exchanges = {}  # (exchange id, account) -> ccxt instance
+        self.limiters = {}   # exchange id -> RateLimiter
+        self._markets = {}   # exchange id -> Task returning (markets, currencies)
+        self.indicators = {}  # (exchange id, symbol) -> today_indicator dict
+        self.market_errors = {}  # (exchange id, symbol) -> why there is no indicator
+
+    def _exchange(self, exchange_id: str, account: str = None):
+        """The ccxt instance for ``account`` on ``exchange_id``; ``account=None`` is a public, keyless one."""
+        key = (exchange_id, account)
+        if key not in self.exchanges:
+            if self._ccxt is None:
+                import ccxt.async_support as ccxt_async
+                self._ccxt = ccxt_async
+            credentials = account_credentials(account) if account is not None else {}
+            if account is not None and not all(credentials.values()):
+                if not self.dry_run:
+                    raise ValueError(f"API credentials for account '{account}' not found.")
+                credentials = {}
+            exchange = getattr(self._ccxt, exchange_id)({**credentials, "enableRateLimit": False,
+                                                         "options": {"defaultType": "spot"}})
+            self.exchanges[key] = exchange
+            if exchange_id not in self.limiters:
+                self.limiters[exchange_id] = RateLimiter(getattr(exchange, "rateLimit", 100) / 1000)
+        return self.exchanges[key]
+
+    async def _call(self, exchange_id: str, fn, *args, **kwargs):
+        """Rate-limited exchange call with the bot's usual retry-and-back-off."""
+        last_error = None
+        for attempt in range(self.retries):
+            await self.limiters[exchange_id].acquire()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:  # noqa: BLE001 - includes the None<str TypeError from load_markets()
+                last_error = e
+                print(f"⚠️ {exchange_id} {getattr(fn, '__name__', 'call')} attempt {attempt + 1}/{self.retries} failed: {e}")
+                if attempt < self.retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+        raise last_error
+
+    def _shared(self, cache: dict, key, factory):
+        if key not in cache:
+            cache[key] = asyncio.ensure_future(factory())
+        return cache[key]
+
+    def _symbols(self, exchange_id: str) -> list:
+        return sorted({entry["symbol"] for entry in self.entries if _market_key(entry)[0] == exchange_id})
+
+    async def _load_markets(self, exchange_id: str, exchange, symbols: list, refresh: bool = False) -> tuple:
+        """``(markets, currencies)`` for ``symbols`` only, as ``tb.prepare_exchange_markets`` does for the bot.
+
+        OKX answers one instrument request per symbol (from ``tb.MARKET_CACHE_FILE``
+        while it is fresh). Anything else, or a failing slim path, falls back to
+        a full ``load_markets``, reloaded on each retry past the None-key crash.
+        """
+        if exchange_id == "okx":
+            cached = None if refresh else tb.load_market_cache(symbols)
+            if cached:
+                print(f"📦 {exchange_id} market metadata for {', '.join(symbols)} served from {tb.MARKET_CACHE_FILE}.")
+                return list(cached.values()), None
+            try:
+                markets = {}
+                for symbol in symbols:
+                    found = await self._call(exchange_id, exchange.fetch_markets_by_type, *tb.slim_market_query(symbol))
+                    markets[symbol] = tb.pick_slim_market(found, symbol, exchange_id)
+                try:
+                    tb.save_market_cache(markets)
+                except OSError as e:
+                    print(f"⚠️ Could not write market cache: {e}")
+                print(f"✅ Loaded {exchange_id} market metadata for {', '.join(symbols)} only.")
+                return list(markets.values()), None
+            except Exception as e:  # noqa: BLE001 - the full load below still works
+                print(f"⚠️ Slim {exchange_id} market metadata unavailable ({e}); loading all markets.")
+        markets = await self._call(exchange_id, exchange.load_markets, True)
+        return markets, exchange.currencies
+
+    async def _ensure_markets(self, exchange_id: str, exchange):
+        """Load this exchange's configured markets once and copy them into every account's instance."""
+        markets, currencies = await self._shared(
+            self._markets, exchange_id, lambda: self._load_markets(exchange_id, exchange, self._symbols(exchange_id)))
+        if not exchange.markets:
+            exchange.set_markets(markets, currencies)
+
+    async def _fetch_network(self, exchange_id: str, exchange, symbol: str, since: int = None) -> list:
+        try:
+            data = await self._call(exchange_id, exchange.fetch_ohlcv, symbol, "1d", since=since, limit=CANDLE_LIMIT)
+            if isinstance(data, list) and data:
+                return data
+            print(f"⚠️ {exchange_id} fetch_ohlcv returned no candles for {symbol}.")
+        except Exception as e:  # noqa: BLE001
+            if exchange_id != "okx":
+                raise
+            print(f"⚠️ Falling back to OKX public candles API for {symbol}: {e}")
+        if exchange_id != "okx":
+            raise ValueError(f"No candles for {symbol} on {exchange_id}.")
+        return await asyncio.to_thread(tb._okx_public_candles, symbol, CANDLE_LIMIT, "1Dutc",
+                                       None if since is None else since - 1)
+
+    async def _fetch_candles(self, exchange_id: str, exchange, symbol: str) -> list:
+        """Cache-topped-up daily candles, mirroring ``tb.fetch_ohlcv_resilient``."""
+        cache_dir = None if exchange_id == "okx" else os.path.join(tb.OHLCV_CACHE_DIR, exchange_id)
+        cached = tb.load_cached_ohlcv(symbol, "1d", cache_dir)
+        data = None
+        if len(cached) > tb.OHLCV_CACHE_OVERLAP:
+            since = int(cached[-tb.OHLCV_CACHE_OVERLAP][0])
+            fresh = await self._fetch_network(exchange_id, exchange, symbol, since=since)
+            try:
+                data = tb.merge_candles(cached, fresh)
+            except tb.CandleCacheMismatch as e:
+                print(f"⚠️ Candle cache for {symbol} inconsistent with exchange ({e}); refetching full history.")
+            if data is not None and tb.candles_stale(data):
+                print(f"⚠️ Candle cache for {symbol} too old to top up; refetching latest candles.")
+                data = None
+        if data is None:
+            data = tb.merge_candles([], await self._fetch_network(exchange_id, exchange, symbol))
+        try:
+            tb.save_cached_ohlcv(symbol, "1d", data, cache_dir)
+        except OSError as e:
+            print(f"⚠️ Could not write candle cache for {symbol}: {e}")
+        return data[-CANDLE_LIMIT:]
+
+    async def _market_indicator(self, key: tuple) -> None:
+        """Fetch one market's candles on the public connection and compute its indicator once."""
+        exchange_id, symbol = key
+        try:
+            public = self._exchange(exchange_id)
+            # fetch_ohlcv loads markets implicitly; load them through the shared
+            # task so the accounts' instances reuse this copy instead of a second load.
+            await self._ensure_markets(exchange_id, public)
+            ohlcv = await self._fetch_candles(exchange_id, public, symbol)
+            if len(ohlcv) < tb.DCA_WINDOW:
+                raise ValueError(f"Not enough historical data. Got {len(ohlcv)}.")
+            self.indicators[key] = tb.today_indicator(tb._ohlcv_frame(ohlcv))
+        except Exception as e:  # noqa: BLE001 - a failing market only fails its own entries
+            self.market_errors[key] = str(e)
+            print(f"🔴 {exchange_id} {symbol} market data failed: {e}")
+
+    async def decide(self) -> dict:
+        """Phases 1 and 2: one fetch and indicator pass per market, then every entry's amount at once."""
+        markets = list(dict.fromkeys(_market_key(entry) for entry in self.entries))
+        await asyncio.gather(*(self._market_indicator(key) for key in markets))
+        return batch_decisions(self.entries, self.indicators)
+
+    async def _place_order(self, exchange_id: str, exchange, symbol: str, cost: float) -> dict:
+        """``tb.place_market_buy`` for the async instances, rate-limited like every other call.
+
+        A rejection (bad size, precision or symbol) placed nothing, so the
+        metadata is refreshed and the order retried once; a rate-limited
+        request is retried with back-off. Network or balance errors are not
+        retried: the order may have gone through.
+        """
+        errors = self._ccxt
+        refused = getattr(errors, "RateLimitExceeded", ())
+        refreshed, attempt = False, 0
+        while True:
+            await self.limiters[exchange_id].acquire()
+            try:
+                return await exchange.create_market_buy_order_with_cost(symbol, cost)
+            except (errors.InvalidOrder, errors.BadSymbol, errors.BadRequest) as e:
+                if refreshed:
+                    raise
+                refreshed = True
+                print(f"⚠️ {exchange_id} order rejected ({e}); refreshing market metadata and retrying once.")
+                exchange.set_markets(*await self._load_markets(exchange_id, exchange, self._symbols(exchange_id),
+                                                               refresh=True))
+            except refused as e:
+                attempt += 1
+                if attempt >= self.retries:
+                    raise
+                print(f"⚠️ {exchange_id} order rate-limited ({e}); retry {attempt}/{self.retries - 1}.")
+                await asyncio.sleep(2 ** (attempt - 1))
+
+    async def execute_entry(self, entry: dict, decision: dict, slots: asyncio.Semaphore) -> dict:
+        """Phase 3 for one entry: order (when it trades), log and state, holding one executor slot."""
+        exchange_id, symbol = _market_key(entry)
+        amount, price = decision["investment_usd"], decision["price"]
+        result = {"name": entry["name"], "account": entry["account"], "symbol": symbol, "baseline": entry["baseline"],
+                  "status": "FAILED", "investment_usd": amount, "price": price, "ahr999": decision["ahr999"],
+                  "order_id": None, "log_action": None, "summary": "", "error": None, "seconds": 0.0}
+        market_error = self.market_errors.get((exchange_id, symbol))
+        if market_error:
+            result["error"] = market_error
+            return result
+        if self.dry_run:
+            result["status"] = "DRY_RUN" if decision["would_trade"] else "SKIPPED"
+            return result
+
+        async with slots:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                # A re-run or retried workflow must not buy a second time today.
+                if tb.already_bought(tb.today(), path=entry["log_store"], csv_path=entry["log_csv"]):
+                    print(f"ℹ️ {entry['name']}: {tb.today().isoformat()} already has a buy; skipping.")
+                    result["status"] = "SKIPPED"
+                    snapshot = tb.load_portfolio_state(entry["state"])
+                    if snapshot is not None:
+                        result["summary"] = tb.calculate_portfolio_summary(snapshot["state"], price)
+                    return result
+                if decision["would_trade"]:
+                    exchange = self._exchange(exchange_id, entry["account"])
+                    await self._ensure_markets(exchange_id, exchange)
+                    order = await self._place_order(exchange_id, exchange, symbol, amount)
+                    log_entry = tb.order_log_entry(order, amount, price)
+                    result.update(status="SUCCESS", order_id=order.get("id"))
+                else:
+                    log_entry = {"date": tb.today().isoformat(), "buy_usd": 0.0, "buy_btc": 0.0, "price_usd": price}
+                    result["status"] = "SKIPPED"
+
+                os.makedirs(os.path.dirname(entry["log_store"]) or ".", exist_ok=True)
+                action, stored = tb.upsert_trade_log(log_entry, path=entry["log_store"], csv_path=entry["log_csv"])
+                state = tb.update_portfolio_state(log_entry, action, stored_entry=stored, path=entry["state"],
+                                                  log_path=entry["log_store"])
+                result["log_action"] = action
+                result["summary"] = tb.calculate_portfolio_summary(state, price)
+            except Exception as e:  # noqa: BLE001 - one failing entry must not stop the others
+                result["status"] = "FAILED"
+                result["error"] = str(e)
+                print(f"🔴 {entry['name']} failed: {e}")
+            finally:
+                result["seconds"] = round(loop.time() - started, 3)
+        return result
+
+    async def run(self) -> tuple:
+        """Decide for every entry, then execute them; return ``(results, wall_seconds)``."""
+        started = time.perf_counter()
+        try:
+            arrays = await self.decide()
+            print(f"Decided {len(self.entries)} entries on {len(self.indicators)} market(s) "
+                  f"in {time.perf_counter() - started:.2f}s; {int(arrays['would_trade'].sum())} will trade.")
+            slots = asyncio.Semaphore(self.max_concurrency)
+            results = await asyncio.gather(*(
+                self.execute_entry(entry, {key: values[i].item() for key, values in arrays.items()}, slots)
+                for i, entry in enumerate(self.entries)))
+        finally:
+            await asyncio.gather(*(exchange.close() for exchange in self.exchanges.values()), return_exceptions=True)
+        return list(results), time.perf_counter() - started
+
+
+def _fmt(value, spec: str) -> str:
+    return format(value, spec) if isinstance(value, (int, float)) and math.isfinite(value) else "N/A"
+
+
+def consolidated_report(results: list, wall_seconds: float) -> str:
+    """Markdown report: one table row per entry, then each entry's portfolio summary."""
+    lines = ["### 🤖 Multi-Account Run",
+             "| Account | Symbol | Baseline | Price | AHR999 | Investment | Status | Time |",
+             "|---|---|---:|---:|---:|---:|---|---:|"]
+    for r in results:
+        lines.append(f"| {r['account']} | {r['symbol']} | {r['baseline']:g} | {_fmt(r['price'], ',.2f')} | "
+                     f"{_fmt(r['ahr999'], '.4f')} | {_fmt(r['investment_usd'], '.4f')} | `{r['status']}` | {r['seconds']:.2f}s |")
+    serial = sum(r["seconds"] for r in results)
+    lines.append(f"\n*{len(results)} entries in `{wall_seconds:.2f}s` wall (`{serial:.2f}s` summed per entry).*")
+    for r in results:
+        if r["error"]:
+            lines.append(f"\n#### {r['account']} · {r['symbol']}\n- **Error:** `{r['error']}`")
+        elif r["summary"]:
+            lines.append(f"\n#### {r['account']} · {r['symbol']}\n" + r["summary"].split("\n", 1)[1])
+    return "\n".join(lines)
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the AHR999 DCA for several accounts and symbols concurrently.")
+    parser.add_argument("config", help="JSON list or CSV table of {account, symbol, baseline, ...} entries.")
+    parser.add_argument("--dry-run", action="store_true", help="Decide only: no orders and no log writes.")
+    parser.add_argument("--report", help="Also write the consolidated report (markdown) here.")
+    parser.add_argument("--issue", action="store_true", help="Post the consolidated report as a GitHub issue.")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENT_ORDERS,
+                        help="Orders (with their log writes) in flight at once.")
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    entries = load_config(args.config)
+    print(f"Running {len(entries)} entries{' (dry run)' if args.dry_run else ''}...")
+    results, wall_seconds = asyncio.run(MultiRunner(entries, dry_run=args.dry_run,
+                                                    max_concurrency=args.max_concurrency).run())
+    report = consolidated_report(results, wall_seconds)
+    print(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(report + "\n")
+        print(f"✅ Report written to {args.report}")
+    if args.issue:
+        failed = sum(r["status"] == "FAILED" for r in results)
+        title = (f"🔴 Multi-Account Run: {failed}/{len(results)} failed" if failed
+                 else f"✅ Multi-Account Run: {len(results)} entries")
+        tb.create_github_issue(title, report)
+    if any(r["status"] == "FAILED" for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Intraday AHR999 Daemon
+--------------------------------
+Follows a live ticker and republishes AHR999 and the implied buy amount as the
+price moves, instead of once a day from a batch of 250 candles.
+
+The daily decision takes the harmonic mean of the last 200 daily closes, the
+newest being today's still-open candle (whose close is the latest price). The
+daemon therefore keeps the 199 finished closes in a bounded deque together with
+their reciprocal sum and count. Every tick combines those running totals with
+the live price in O(1); at the UTC day boundary the finished day's last price
+is pushed in and the oldest close evicted, also O(1). Bad closes occupy a slot
+without being counted, exactly as in ``trade_bot._harmonic_mean``.
+
+Ticks come from OKX over WebSocket (``ccxt.pro``) or, for tests and dry runs,
+from a ``timestamp,price`` CSV replayed as fast as it can be read.
+
+Example:
+    python stream_daemon.py --publish-every 30
+    python stream_daemon.py --replay ticks.csv --seed-ohlcv btc_daily.csv --trigger-below 0.45
+"""
+
+import os
+import csv
+import json
+import math
+import time
+import asyncio
+import argparse
+import datetime as dt
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import trade_bot as tb
+
+LIVE_SNAPSHOT_FILE = "ahr999_live.json"
+RESYNC_EVERY_ROLLOVERS = 64
+
+
+def _is_valid(price) -> bool:
+    return price is not None and math.isfinite(price) and price > 0
+
+
+def _utc_day(ts_ms: int) -> dt.date:
+    return dt.datetime.fromtimestamp(ts_ms / 1000, tz=dt.timezone.utc).date()
+
+
+def closes_before(ohlcv: list, day: dt.date) -> list:
+    """Closes of the daily candles that finished before ``day`` (oldest first)."""
+    return [float(row[4]) for row in ohlcv if _utc_day(int(row[0])) < day]
+
+
+class IntradayAHR999:
+    """Rolling 200-day harmonic-mean state updated in O(1) per tick."""
+
+    def __init__(self, closes: list, day: dt.date, baseline: float = None, window: int = tb.DCA_WINDOW):
+        self.window = window
+        self.baseline = tb.BASELINE_INVESTMENT if baseline is None else baseline
+        self.day = day
+        self.last_price = float("nan")
+        self._closed = deque()
+        self._recip_sum = 0.0
+        self._count = 0
+        self._rollovers = 0
+        for close in closes[-(window - 1):]:
+            self._push(close)
+
+    def _push(self, close) -> None:
+        # The daily decision drops NaN closes entirely; other bad values keep their slot.
+        if close is None or (isinstance(close, float) and math.isnan(close)):
+            return
+        self._closed.append(close)
+        if _is_valid(close):
+            self._recip_sum += 1.0 / close
+            self._count += 1
+        if len(self._closed) > self.window - 1:
+            old = self._closed.popleft()
+            if _is_valid(old):
+                self._recip_sum -= 1.0 / old
+                self._count -= 1
+
+    def _resync(self) -> None:
+        """Re-add the window from scratch to shed floating-point drift (O(window), once in a while)."""
+        valid = [c for c in self._closed if _is_valid(c)]
+        self._recip_sum = math.fsum(1.0 / c for c in valid)
+        self._count = len(valid)
+
+    def rollover(self, new_day: dt.date) -> None:
+        """Close the current day at its last price and start ``new_day``."""
+        self._push(self.last_price)
+        self.day = new_day
+        self.last_price = float("nan")
+        self._rollovers += 1
+        if self._rollovers % RESYNC_EVERY_ROLLOVERS == 0:
+            self._resync()
+
+    def update(self, ts_ms: int, price: float):
+        """Apply one tick; returns the new snapshot, or ``None`` for a tick from an earlier day."""
+        day = _utc_day(ts_ms)
+        if day < self.day:
+            return None
+        if day > self.day:
+            self.rollover(day)
+        self.last_price = float(price)
+        return self.snapshot(ts_ms)
+
+    def snapshot(self, ts_ms: int = None) -> dict:
+        price = self.last_price
+        dca200 = float("nan")
+        if len(self._closed) + 1 >= self.window:
+            count = self._count + (1 if _is_valid(price) else 0)
+            recip_sum = self._recip_sum + (1.0 / price if _is_valid(price) else 0.0)
+            if count and recip_sum > 0:
+                dca200 = count / recip_sum
+        growth = tb.index_growth_estimate((self.day - tb.GENESIS).days)
+        ahr999 = (price / dca200) * (price / growth) if math.isfinite(dca200) and math.isfinite(price) else float("nan")
+        return {
+            "time": ts_ms,
+            "date": self.day.isoformat(),
+            "price": price,
+            "dca200": dca200,
+            "growth_estimate": growth,
+            "ahr999_index": ahr999,
+            "multiplier": tb.calculate_continuous_multiplier(ahr999) if math.isfinite(ahr999) else float("nan"),
+            "investment_usd": tb.investment_for_index(ahr999, self.baseline),
+        }
+
+
+class BuyTrigger:
+    """Fires at most once per UTC day, the first time AHR999 is at or below ``threshold``.
+
+    Without ``execute`` it only reports what it would buy. With it, the order
+    is placed and logged exactly like a daily run; a day that already has a
+    buy in the trade log is left alone.
+    """
+
+    def __init__(self, threshold: float, execute: bool = False):
+        self.threshold = threshold
+        self.execute = execute
+        self.fired_day = None
+        self._exchange = None
+
+    def check(self, snap: dict):
+        ahr999, amount = snap["ahr999_index"], snap["investment_usd"]
+        if snap["date"] == self.fired_day or not (math.isfinite(ahr999) and ahr999 <= self.threshold):
+            return None
+        self.fired_day = snap["date"]
+        if not (math.isfinite(amount) and amount > tb.MIN_TRADE_USD):
+            print(f"🎯 AHR999 {ahr999:.4f} <= {self.threshold} but amount {amount} is below the minimum; no buy.")
+            return None
+        if not self.execute:
+            print(f"🎯 AHR999 {ahr999:.4f} <= {self.threshold}: would buy ${amount} at {snap['price']:,.2f}.")
+            return {"status": "would_buy", **snap}
+        if tb.already_bought(snap["date"]):
+            print(f"🎯 AHR999 {ahr999:.4f} <= {self.threshold}, but {snap['date']} already has a buy; skipping.")
+            return None
+        return self._buy(snap)
+
+    def _buy(self, snap: dict) -> dict:
+        if self._exchange is None:
+            api_key, secret_key, password = (os.getenv(k) for k in ("OKX_API_KEY", "OKX_SECRET_KEY", "OKX_PASSWORD"))
+            if not all([api_key, secret_key, password]):
+                raise ValueError("API credentials not found.")
+            self._exchange = tb._load_ccxt().okx({'apiKey': api_key, 'secret': secret_key, 'password': password,
+                                                  'options': {'defaultType': 'spot'}})
+            tb.prepare_exchange_markets(self._exchange, [tb.OKX_SYMBOL])
+        amount = snap["investment_usd"]
+        order = tb.place_market_buy(self._exchange, tb.OKX_SYMBOL, amount)
+        entry = tb.order_log_entry(order, amount, snap["price"], day=snap["date"])
+        action, stored = tb.upsert_trade_log(entry)
+        tb.update_portfolio_state(entry, action, stored_entry=stored)
+        print(f"✅ Triggered buy at AHR999 {snap['ahr999_index']:.4f}: {entry}")
+        return {"status": "bought", "order_id": order.get("id"), **snap}
+
+
+async def replay_ticks(path: str, speed: float = 0.0):
+    """Yield ``(timestamp_ms, price)`` from a CSV; ``speed`` > 0 replays at that multiple of real time."""
+    previous = None
+    with open(path, "r", newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            ts, price = int(float(row["timestamp"])), float(row["price"])
+            if speed > 0 and previous is not None and ts > previous:
+                await asyncio.sleep((ts - previous) / 1000 / speed)
+            previous = ts
+            yield ts, price
+
+
+async def live_ticks(symbol: str = tb.OKX_SYMBOL, retry_seconds: float = 5.0):
+    """Yield ``(timestamp_ms, last)`` from OKX's ticker channel, reconnecting on errors."""
+    import ccxt.pro as ccxtpro
+    exchange = ccxtpro.okx({'options': {'defaultType': 'spot'}})
+    try:
+        while True:
+            try:
+                ticker = await exchange.watch_ticker(symbol)
+            except Exception as e:  # noqa: BLE001 - keep the daemon alive through disconnects
+                print(f"⚠️ Ticker stream error ({e}); reconnecting in {retry_seconds:g}s.")
+                await asyncio.sleep(retry_seconds)
+                continue
+            if ticker.get("last") is not None:
+                yield int(ticker.get("timestamp") or time.time() * 1000), float(ticker["last"])
+    finally:
+        await exchange.close()
+
+
+def publish(snap: dict, path: str = None) -> None:
+    print(f"📈 {snap['date']} price {snap['price']:,.2f}  AHR999 {snap['ahr999_index']:.4f}  "
+          f"multiplier {snap['multiplier']:.3f}  buy ${snap['investment_usd']}")
+    if path:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in snap.items()}, fh)
+        os.replace(tmp_path, path)
+
+
+async def run_daemon(ticks, state: IntradayAHR999, reseed, publish_every: float = 10.0,
+                     snapshot_path: str = LIVE_SNAPSHOT_FILE, trigger: BuyTrigger = None) -> dict:
+    """Consume ``ticks`` until they end; return tick count, per-tick cost and the last snapshot.
+
+    ``reseed(day)`` returns fresh finished closes when ticks skip a whole day
+    (the daemon was down), since those closes were never seen.
+    """
+    ticks_seen, busy_seconds, last_published, snap = 0, 0.0, None, None
+    async for ts, price in ticks:
+        started = time.perf_counter()
+        day = _utc_day(ts)
+        if (day - state.day).days > 1:
+            print(f"⚠️ No ticks between {state.day} and {day}; reseeding from candles.")
+            state = IntradayAHR999(reseed(day), day, state.baseline, state.window)
+        current = state.update(ts, price)
+        if current is None:
+            continue
+        snap = current
+        if trigger is not None:
+            trigger.check(snap)
+        busy_seconds += time.perf_counter() - started
+        ticks_seen += 1
+        if last_published is None or ts - last_published >= publish_every * 1000:
+            publish(snap, snapshot_path)
+            last_published = ts
+    if snap is not None:
+        publish(snap, snapshot_path)
+    per_tick_us = busy_seconds / ticks_seen * 1e6 if ticks_seen else 0.0
+    print(f"⏹️ Stream ended after {ticks_seen} ticks, {per_tick_us:.1f} µs per tick.")
+    return {"ticks": ticks_seen, "per_tick_us": per_tick_us, "last": snap}
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Publish intraday AHR999 from a live or replayed ticker stream.")
+    parser.add_argument("--replay", help="CSV of timestamp,price ticks to replay instead of the live stream.")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed multiple (0 = as fast as possible).")
+    parser.add_argument("--seed-ohlcv", help="Daily candles CSV to seed the window (default: OKX via the candle cache).")
+    parser.add_argument("--offline", action="store_true", help="Seed from the local candle cache only.")
+    parser.add_argument("--baseline", type=float, default=None, help="Baseline investment (default: BASELINE_INVESTMENT).")
+    parser.add_argument("--publish-every", type=float, default=10.0, help="Seconds of ticker time between publishes.")
+    parser.add_argument("--snapshot", default=LIVE_SNAPSHOT_FILE, help="JSON file holding the latest snapshot.")
+    parser.add_argument("--trigger-below", type=float, help="Buy once per day when AHR999 is at or below this value.")
+    parser.add_argument("--execute", action="store_true", help="Actually place the triggered order (default: report only).")
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    if args.seed_ohlcv:
+        frame = tb._load_ohlcv_csv(args.seed_ohlcv)
+        ohlcv = np.column_stack([tb._candle_dates(frame).astype("datetime64[ms]").astype("int64"),
+                                 np.zeros(len(frame)), np.zeros(len(frame)), np.zeros(len(frame)),
+                                 pd.to_numeric(frame["price"], errors="coerce").to_numpy(dtype=float)]).tolist()
+        load_candles = lambda: ohlcv  # noqa: E731
+    else:
+        load_candles = lambda: tb.fetch_ohlcv_resilient(None, tb.OKX_SYMBOL, "1d", limit=250,  # noqa: E731
+                                                        offline=args.offline)
+
+    ticks = replay_ticks(args.replay, args.speed) if args.replay else live_ticks()
+    trigger = BuyTrigger(args.trigger_below, execute=args.execute) if args.trigger_below is not None else None
+
+    async def run():
+        iterator = ticks.__aiter__()
+        first = await iterator.__anext__()
+        day = _utc_day(first[0])
+        state = IntradayAHR999(closes_before(load_candles(), day), day, args.baseline)
+
+        async def chained():
+            yield first
+            async for tick in iterator:
+                yield tick
+
+        return await run_daemon(chained(), state, lambda d: closes_before(load_candles(), d),
+                                publish_every=args.publish_every, snapshot_path=args.snapshot, trigger=trigger)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("⏹️ Stopped.")
+
+
+if __name__ == "__main__":
+    main()
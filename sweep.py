@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parameter Sweep for the AHR999 Smart DCA Strategy
+-------------------------------------------------
+Evaluates a grid of ALPHA / BETA / DAILY_CAP_X / PAUSE_THRESHOLD / NEUTRAL_X /
+MIN_TRADE_USD combinations over one price history on every CPU core and writes
+a ranked results table.
+
+AHR999 does not depend on any of the swept constants, so it is computed once in
+the parent. The price and AHR999 arrays are then copied into shared memory a
+single time; workers attach to them in their initializer and each task only
+carries a small batch of parameter tuples.
+
+Example:
+    python sweep.py --ohlcv btc_daily.csv --alpha 1.0:2.0:0.1 --beta 0.4:1.2:0.1 \\
+        --daily-cap-x 2,3,4 --pause-threshold 1.5:3.0:0.25
+"""
+
+import os
+import time
+import math
+import argparse
+import itertools
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+import trade_bot as tb
+
+SWEEP_PARAMS = ("alpha", "beta", "daily_cap_x", "pause_threshold", "neutral_x", "min_trade_usd")
+RESULT_COLUMNS = ["final_roi", "btc_accumulated", "max_drawdown", "capital_deployed", "final_value", "days_traded"]
+
+# Filled in each worker by ``_attach_shared``: array name -> (SharedMemory, ndarray view)
+_SHARED = {}
+_BASELINE = None
+
+
+def _parse_values(spec: str) -> list:
+    """Parse ``"1.5"``, ``"1,2,4"`` or an inclusive range ``"start:stop:step"``."""
+    spec = spec.strip()
+    if ":" in spec:
+        start, stop, step = (float(part) for part in spec.split(":"))
+        if step <= 0:
+            raise ValueError(f"Range step must be positive: {spec}")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 10) for i in range(count)]
+    return [float(part) for part in spec.split(",") if part.strip()]
+
+
+def build_grid(ranges: dict) -> list:
+    """Cartesian product of per-parameter values, defaulting to the live constants."""
+    defaults = tb.strategy_params()
+    axes = [ranges.get(name) or [defaults[name]] for name in SWEEP_PARAMS]
+    return list(itertools.product(*axes))
+
+
+def _share_array(values: np.ndarray):
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+    return shm
+
+
+def _attach_shared(spec: dict, baseline: float):
+    """Pool initializer: map the parent's shared arrays once per worker."""
+    global _BASELINE
+    _BASELINE = baseline
+    for name, (shm_name, length) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED[name] = (shm, np.ndarray((length,), dtype=np.float64, buffer=shm.buf))
+
+
+def evaluate(price: np.ndarray, ahr999: np.ndarray, baseline: float, combo: tuple) -> dict:
+    params = dict(zip(SWEEP_PARAMS, combo))
+    sim = tb.simulate_strategy(price, ahr999, baseline, params)
+    invested = float(sim["invest_cum"][-1]) if len(price) else 0.0
+    return {
+        **params,
+        "final_roi": float(sim["roi"][-1]) if len(price) else 0.0,
+        "btc_accumulated": float(sim["hold_btc_cum"][-1]) if len(price) else 0.0,
+        "max_drawdown": tb.max_drawdown(sim["roi"]),
+        "capital_deployed": invested,
+        "final_value": float(sim["value_usd"][-1]) if len(price) else 0.0,
+        "days_traded": int(sim["traded"].sum()),
+    }
+
+
+def _evaluate_batch(batch: list) -> list:
+    price = _SHARED["price"][1]
+    ahr999 = _SHARED["ahr999"][1]
+    return [evaluate(price, ahr999, _BASELINE, combo) for combo in batch]
+
+
+def run_sweep(historical_df: pd.DataFrame, grid: list, baseline: float = None,
+              processes: int = None, rank_by: str = "final_roi") -> pd.DataFrame:
+    """Evaluate every parameter tuple in ``grid`` and return results ranked by ``rank_by``."""
+    baseline = tb.BASELINE_INVESTMENT if baseline is None else baseline
+    history = tb.ahr999_history(historical_df)
+    arrays = {"price": history["price"].to_numpy(), "ahr999": history["ahr999"].to_numpy()}
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1:
+        rows = [evaluate(arrays["price"], arrays["ahr999"], baseline, combo) for combo in grid]
+    else:
+        blocks = {name: _share_array(values) for name, values in arrays.items()}
+        spec = {name: (shm.name, len(arrays[name])) for name, shm in blocks.items()}
+        batch_size = max(1, math.ceil(len(grid) / (processes * 8)))
+        batches = [grid[i:i + batch_size] for i in range(0, len(grid), batch_size)]
+        try:
+            with Pool(processes, initializer=_attach_shared, initargs=(spec, baseline)) as pool:
+                rows = [row for chunk in pool.imap_unordered(_evaluate_batch, batches) for row in chunk]
+        finally:
+            for shm in blocks.values():
+                shm.close()
+                shm.unlink()
+
+    results = pd.DataFrame(rows, columns=list(SWEEP_PARAMS) + RESULT_COLUMNS)
+    ascending = rank_by == "max_drawdown"
+    results = results.sort_values(rank_by, ascending=ascending, kind="stable").reset_index(drop=True)
+    results.insert(0, "rank", np.arange(1, len(results) + 1))
+    return results
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Sweep AHR999 strategy constants over a price history.")
+    parser.add_argument("--ohlcv", help="CSV of candles; fetched from OKX public API when omitted.")
+    parser.add_argument("--start", help="Fetch OKX deep history from this date (YYYY-MM-DD) when --ohlcv is not given.")
+    parser.add_argument("--limit", type=int, default=300, help="Candles to fetch when neither --ohlcv nor --start is given.")
+    parser.add_argument("--baseline", type=float, default=None, help="Baseline investment (default: BASELINE_INVESTMENT).")
+    for name in SWEEP_PARAMS:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                            help=f"Values for {name.upper()}: single, comma list or start:stop:step.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--rank-by", default="final_roi", choices=RESULT_COLUMNS, help="Ranking metric.")
+    parser.add_argument("--top", type=int, default=10, help="Rows to print.")
+    parser.add_argument("--output", default="sweep_results.csv", help="Where to write the full ranked table.")
+    return parser
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    historical_df = tb.load_history_frame(args.ohlcv, start=args.start, limit=args.limit)
+
+    ranges = {name: _parse_values(getattr(args, name)) for name in SWEEP_PARAMS if getattr(args, name)}
+    grid = build_grid(ranges)
+    print(f"Sweeping {len(grid)} parameter combinations over {len(historical_df)} candles...")
+    started = time.perf_counter()
+    results = run_sweep(historical_df, grid, baseline=args.baseline, processes=args.processes, rank_by=args.rank_by)
+    print(f"✅ Sweep finished in {time.perf_counter() - started:.2f}s")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(results.head(args.top).to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"✅ Ranked results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
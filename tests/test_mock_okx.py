@@ -0,0 +1,91 @@
+import datetime as dt
+import json
+import time
+
+import pytest
+
+import mock_okx
+import stream_daemon
+import trade_bot as tb
+
+RUN_DAY = dt.date(2024, 6, 1)
+
+
+@pytest.fixture
+def okx(tmp_path, monkeypatch):
+    """A scripted exchange and simulated clock at 02:00 UTC on ``RUN_DAY``, run in ``tmp_path``."""
+    monkeypatch.chdir(tmp_path)
+    for key in ("OKX_API_KEY", "OKX_SECRET_KEY", "OKX_PASSWORD"):
+        monkeypatch.setenv(key, "mock")
+    for key in ("GITHUB_REPOSITORY", "GITHUB_TOKEN"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr(tb, "HEDGE_DELAY", None)
+    clock = mock_okx.SimClock(dt.datetime.combine(RUN_DAY, dt.time(2), tzinfo=dt.timezone.utc))
+    exchange = mock_okx.MockOKX(mock_okx.scripted_closes(400), RUN_DAY - dt.timedelta(days=300), clock=clock)
+    with mock_okx.installed(exchange, clock):
+        yield exchange
+
+
+def _seed_buy(day: dt.date) -> tuple:
+    entry = {"date": day.isoformat(), "buy_usd": 12.5, "buy_btc": 0.0003, "price_usd": 41_000.0}
+    tb.upsert_trade_log(entry)
+    return tuple(tb.read_trade_log_records()[-1].tolist())
+
+
+def test_main_buys_once_per_day(okx):
+    tb.main(charts=False)
+    assert len(okx.orders) == 1
+    assert tb.already_bought(RUN_DAY)
+    tb.main(charts=False)
+    assert len(okx.orders) == 1
+
+
+def test_cron_and_stream_trigger_skip_a_day_already_bought(okx):
+    row = _seed_buy(RUN_DAY)
+    assert tb.already_bought(RUN_DAY) and not tb.already_bought(RUN_DAY + dt.timedelta(days=1))
+
+    tb.main(charts=False)
+
+    trigger = stream_daemon.BuyTrigger(threshold=10.0, execute=True)
+    snap = {"date": RUN_DAY.isoformat(), "ahr999_index": 0.3, "investment_usd": 20.0, "price": 41_000.0}
+    assert trigger.check(snap) is None
+    assert trigger._exchange is None
+    assert okx.orders == []
+    assert tuple(tb.read_trade_log_records()[-1].tolist()) == row
+
+
+def _tree(root):
+    return {p.relative_to(root): p.stat().st_mtime_ns for p in root.rglob("*") if p.is_file()}
+
+
+def test_offline_run_writes_nothing(okx, tmp_path):
+    tb.main(charts=False)  # fills the candle cache, the log and the metrics
+    (tmp_path / tb.LOG_STORE_FILE).unlink()  # as after a checkout that only has the CSV
+    before = _tree(tmp_path)
+
+    tb.main(offline=True)
+
+    assert _tree(tmp_path) == before
+    assert len(okx.orders) == 1
+
+
+def test_metrics_are_stamped_with_the_simulated_run_time(okx):
+    tb.main(charts=False)
+    with open(tb.METRICS_FILE, encoding="utf-8") as fh:
+        record = json.loads(fh.readlines()[-1])
+    assert record["time"].startswith(f"{RUN_DAY.isoformat()}T02:00")
+    assert 0 <= record["duration"] < 60
+
+
+def test_history_paging_backs_off_on_the_simulated_clock(okx):
+    okx.inject("candles_rest", "http500", "http500")
+    with mock_okx.CandleServer(okx) as server:
+        started = time.perf_counter()
+        rows = tb.load_okx_history(tb.OKX_SYMBOL, okx.first_day, max_workers=1, page_limit=100,
+                                   url=server.url + mock_okx.REST_PATHS[1])
+        elapsed = time.perf_counter() - started
+
+    assert len(rows) == (RUN_DAY - okx.first_day).days + 1  # through today's open candle
+    assert tb.find_candle_gaps(rows, mock_okx.DAY_MS) == []
+    assert okx.clock.slept == 1.5  # 0.5s then 1s of back-off, simulated
+    assert elapsed < 1.0
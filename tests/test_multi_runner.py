@@ -0,0 +1,80 @@
+import asyncio
+import datetime as dt
+
+import pytest
+
+import mock_okx
+import multi_runner
+import trade_bot as tb
+
+RUN_DAY = dt.date(2024, 6, 1)
+
+
+@pytest.fixture
+def okx(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for var in multi_runner.CREDENTIAL_VARS.values():
+        monkeypatch.setenv(var + "_ALICE", "mock")
+        monkeypatch.setenv(var + "_BOB", "mock")
+    clock = mock_okx.SimClock(dt.datetime.combine(RUN_DAY, dt.time(2), tzinfo=dt.timezone.utc))
+    exchange = mock_okx.MockOKX(mock_okx.scripted_closes(400, drift=-0.002), RUN_DAY - dt.timedelta(days=300),
+                                clock=clock)
+    with mock_okx.installed(exchange, clock):
+        yield exchange
+
+
+def _run(entries, exchange) -> list:
+    runner = multi_runner.MultiRunner(entries, ccxt_module=mock_okx.async_ccxt_namespace(exchange), retries=2)
+    results, _ = asyncio.run(runner.run())
+    return results
+
+
+def _entries(tmp_path, accounts=("alice", "bob")) -> list:
+    config = tmp_path / "tenants.csv"
+    config.write_text("account,symbol,baseline\n" + "".join(f"{a},BTC/USDT,10\n" for a in accounts))
+    return multi_runner.load_config(str(config))
+
+
+def test_rerun_does_not_buy_twice(okx, tmp_path):
+    entries = _entries(tmp_path)
+    first = _run(entries, okx)
+    assert [r["status"] for r in first] == ["SUCCESS", "SUCCESS"]
+    rows = [tuple(tb.read_trade_log_records(e["log_store"])[-1].tolist()) for e in entries]
+
+    second = _run(entries, okx)
+
+    assert [r["status"] for r in second] == ["SKIPPED", "SKIPPED"]
+    assert len(okx.orders) == 2
+    assert [tuple(tb.read_trade_log_records(e["log_store"])[-1].tolist()) for e in entries] == rows
+
+
+@pytest.mark.parametrize("fault, status, orders, order_calls", [
+    ("invalid_order", "SUCCESS", 1, 2),  # rejected: fresh metadata, one retry
+    ("rate_limit", "SUCCESS", 1, 2),     # refused: retried after back-off
+    ("network", "FAILED", 0, 1),         # may have gone through: never resent
+])
+def test_order_retries_only_when_nothing_was_placed(okx, tmp_path, fault, status, orders, order_calls):
+    okx.inject("order", fault)
+
+    [result] = _run(_entries(tmp_path, accounts=("alice",)), okx)
+
+    assert result["status"] == status
+    assert len(okx.orders) == orders
+    assert okx.calls["order"] == order_calls
+
+
+def test_markets_loaded_for_configured_symbols_only(okx, tmp_path):
+    entries = _entries(tmp_path)
+    _run(entries, okx)
+    assert okx.calls["load_markets"] == 0
+    assert okx.calls["fetch_markets"] == 1  # one instrument request, shared by both accounts
+
+    _run(entries, okx)
+    assert okx.calls["fetch_markets"] == 1  # served from the market cache
+
+
+def test_full_market_load_when_slim_metadata_fails(okx, tmp_path):
+    okx.inject("fetch_markets", "http500", "http500")
+    [result] = _run(_entries(tmp_path, accounts=("alice",)), okx)
+    assert result["status"] == "SUCCESS"
+    assert okx.calls["load_markets"] == 1
@@ -0,0 +1,83 @@
+import datetime as dt
+import threading
+
+import numpy as np
+
+import mock_okx
+import stream_daemon
+import trade_bot as tb
+
+DAY_MS = 86_400_000
+
+
+def test_replay_with_faults_keeps_a_consistent_state(tmp_path, monkeypatch):
+    days = 8
+    result = mock_okx.replay(days=days, faults=[("fetch_ohlcv", "network", 3), ("order", "invalid_order", 4)],
+                             hedge_delay=None, workdir=str(tmp_path))
+
+    assert result["statuses"] == {"success": days}
+    assert result["orders"] == result["log_rows"] == days
+    assert result["calls"]["order"] == days + 2  # one retried order per injected rejection
+    assert result["simulated_backoff_s"] > 0
+
+    monkeypatch.chdir(tmp_path)
+    assert tb.verify_portfolio_state() == []
+    last_day = dt.date.fromisoformat(result["first_day"]) + dt.timedelta(days=days - 1)
+    assert tb.already_bought(last_day)
+    assert not tb.already_bought(last_day + dt.timedelta(days=1))
+
+
+def test_intraday_rollover_matches_the_daily_harmonic_mean():
+    window = tb.DCA_WINDOW
+    closes = list(mock_okx.scripted_closes(window + 30, seed=3))
+    closes[window + 5] = 0.0  # a bad close keeps its slot but not its weight
+    first = dt.date(2024, 1, 1)
+    state = stream_daemon.IntradayAHR999(closes[:window - 1], first)
+
+    for i, close in enumerate(closes[window - 1:]):
+        day_ms = (np.datetime64(first, "D") + i).astype("datetime64[ms]").astype("int64")
+        state.update(int(day_ms) + 3_600_000, close * 1.01)
+        snap = state.update(int(day_ms) + DAY_MS - 1, close)
+        assert snap["date"] == (first + dt.timedelta(days=i)).isoformat()
+        assert np.isclose(snap["dca200"], tb._harmonic_mean(np.asarray(closes[i:i + window])), rtol=1e-12)
+
+
+class _BlockingSession:
+    """Holds the first request until released and records every request."""
+
+    def __init__(self):
+        self.requests = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def request(self, method, url, json=None, timeout=None):
+        self.requests.append((method, json["body"]))
+        self.entered.set()
+        self.release.wait(5)
+        return _Response()
+
+    def close(self):
+        pass
+
+
+class _Response:
+    status_code = 201
+    text = ""
+    headers = {}
+
+    @staticmethod
+    def json():
+        return {"number": 7}
+
+
+def test_notifier_coalesces_messages_queued_behind_a_slow_request():
+    session = _BlockingSession()
+    notifier = tb.GitHubNotifier("owner/repo", "token", api_url="http://mock", session=session)
+    notifier.publish("run", "first")
+    assert session.entered.wait(5)
+    for body in ("second", "third", "fourth"):
+        notifier.publish("run", body)
+    session.release.set()
+    assert notifier.close(deadline=5)
+
+    assert session.requests == [("POST", "first"), ("PATCH", "fourth")]
@@ -0,0 +1,33 @@
+import numpy as np
+
+import trade_bot as tb
+
+
+def test_bad_ticks_neither_buy_nor_zero_the_portfolio():
+    price = np.array([100.0, 90.0, 0.0, 80.0, np.nan, -5.0, 85.0, 110.0])
+    sim = tb.simulate_strategy(price, np.full(len(price), 0.5), 10.0)
+
+    bad = ~(np.isfinite(price) & (price > 0))
+    assert not sim["traded"][bad].any()
+    assert (sim["buy_btc"][bad] == 0).all()
+    # Holdings stay marked at the last valid close (80) through the bad run.
+    assert np.allclose(sim["value_usd"][4:6], sim["hold_btc_cum"][4:6] * 80.0)
+    assert (sim["roi"] > -1).all()
+    assert 0.0 <= tb.max_drawdown(sim["roi"]) <= 1.0
+
+
+def test_bad_ticks_per_path():
+    rng = np.random.default_rng(0)
+    price = 40_000 * np.exp(np.cumsum(rng.normal(0, 0.05, (20, 400)), axis=1))
+    price[:, ::37] = 0.0
+    price[::3, 5] = -1.0
+    price[:, 0] = np.nan
+    sim = tb.simulate_strategy(price, rng.random(price.shape) * 2, 5.0)
+    for roi in sim["roi"]:
+        assert 0.0 <= tb.max_drawdown(roi) <= 1.0
+
+
+def test_clean_history_drawdown_in_range():
+    price = np.linspace(100.0, 10.0, 300)
+    sim = tb.simulate_strategy(price, np.full(300, 0.4), 5.0)
+    assert 0.0 <= tb.max_drawdown(sim["roi"]) <= 1.0
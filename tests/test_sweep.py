@@ -0,0 +1,17 @@
+import benchmarks
+import sweep
+
+
+def test_rank_by_drawdown_survives_bad_ticks():
+    candles = benchmarks.synthetic_candles(700)
+    for column in ("open", "high", "low", "close", "price"):
+        candles.loc[candles.index[400], column] = 0.0
+        candles.loc[candles.index[500], column] = -3.0
+    grid = sweep.build_grid({"alpha": [1.0, 2.0, 3.0], "daily_cap_x": [2.0, 4.0]})
+
+    results = sweep.run_sweep(candles, grid, processes=1, rank_by="max_drawdown")
+
+    assert len(results) == len(grid)
+    assert results["max_drawdown"].between(0.0, 1.0).all()
+    assert results["max_drawdown"].is_monotonic_increasing
+    assert list(results["rank"]) == list(range(1, len(grid) + 1))
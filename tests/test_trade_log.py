@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import trade_bot as tb
+
+
+def _upsert(date, usd, btc, price, partition="none"):
+    entry = {"date": date, "buy_usd": usd, "buy_btc": btc, "price_usd": price}
+    action, stored = tb.upsert_trade_log(entry, partition=partition)
+    tb.update_portfolio_state(entry, action, stored_entry=stored)
+    return action
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_same_day_upsert_replaces_the_row():
+    assert _upsert("2024-03-01", 10.0, 0.0002, 50_000.0) == "appended"
+    assert _upsert("2024-03-02", 10.0, 0.0002, 50_000.0) == "appended"
+    assert _upsert("2024-03-02", 20.0, 0.0005, 40_000.0) == "replaced"
+
+    records = tb.read_trade_log_records()
+    assert len(records) == 2
+    assert tuple(records[-1].tolist())[1:] == (20.0, 0.0005, 40_000.0)
+    assert tb.verify_portfolio_state() == []
+
+
+def test_same_day_upsert_replaces_a_closed_partition_row():
+    _upsert("2024-01-15", 10.0, 0.0002, 50_000.0, partition="month")
+    _upsert("2024-02-01", 10.0, 0.0002, 50_000.0, partition="month")
+    assert tb.load_log_manifest()["partitions"]
+
+    assert _upsert("2024-01-15", 30.0, 0.0006, 50_000.0, partition="month") == "replaced"
+
+    records = tb.read_trade_log_records()
+    assert [tuple(r.tolist())[1] for r in records] == [30.0, 10.0]
+    assert tb.verify_log_partitions() == []
+    assert tb.verify_portfolio_state() == []
+
+
+@pytest.mark.skipif("DCA_LOG_PARTITION" in os.environ, reason="tests the default partitioning")
+def test_default_keeps_the_full_history_in_the_csv():
+    assert tb.LOG_PARTITION == "none"
+    for date in ("2023-12-31", "2024-01-15", "2024-02-01"):
+        entry = {"date": date, "buy_usd": 10.0, "buy_btc": 0.0002, "price_usd": 50_000.0}
+        tb.upsert_trade_log(entry)
+
+    assert list(tb.pd.read_csv(tb.LOG_FILE)["date"]) == ["2023-12-31", "2024-01-15", "2024-02-01"]
+    assert not tb.load_log_manifest()["partitions"]
@@ -11,16 +11,33 @@ This final version generates a full dashboard of charts:
 """
 
 import os
+import sys
 import math
 import time
+import argparse
+import contextlib
+import io
+import html
+import json
+import atexit
+import hashlib
+import threading
+import shutil
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
 import requests
 import pandas as pd
 import numpy as np
-import ccxt
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from scipy.interpolate import make_interp_spline
+
+# matplotlib, scipy and ccxt dominate cold-start time but only the chart and
+# order paths need them, so they are imported on first use (see
+# ``_load_plotting`` / ``_load_ccxt``). ``python trade_bot.py startup-report``
+# shows what each import costs.
+plt = None
+mdates = None
+make_interp_spline = None
+ccxt = None
 
 # ==============================================================================
 # SECTION 1: FINAL STRATEGY PARAMETERS
@@ -46,6 +63,7 @@ DAILY_CAP_X = 4.0
 PAUSE_THRESHOLD = 2.0
 NEUTRAL_X = 1.0
 MIN_TRADE_USD = 1.0
+DCA_WINDOW = 200
 LOG_FILE = "trade_log.csv"
 LOG_COLUMNS = ['date', 'buy_usd', 'buy_btc', 'price_usd']
 DEFAULT_CHART_THEME = "professional"
@@ -171,21 +189,353 @@ def _resolve_chart_theme(theme_key):
 # ==============================================================================
 # SECTION 2: HELPERS (Now includes multiple chart functions)
 # ==============================================================================
+def _load_plotting():
+    """Import matplotlib and scipy the first time a chart is drawn."""
+    global plt, mdates, make_interp_spline
+    if plt is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as pyplot
+        import matplotlib.dates as mpl_dates
+        from scipy.interpolate import make_interp_spline as interp_spline
+        plt, mdates, make_interp_spline = pyplot, mpl_dates, interp_spline
+
+
+def _load_ccxt():
+    """Import ccxt (which loads every exchange class) only when an order path needs it."""
+    global ccxt
+    if ccxt is None:
+        import ccxt as ccxt_module
+        ccxt = ccxt_module
+    return ccxt
+
+
+# --- Clock ---
+# "What day is it?" goes through ``today`` / ``utc_now`` so a simulated clock
+# (see ``mock_okx.py``) can stand in for the wall clock when many daily runs
+# are replayed in one process.
+_clock = None
+
+
+def set_clock(clock) -> None:
+    """Use ``clock()`` (an aware UTC datetime) as the current time; ``None`` restores the wall clock."""
+    global _clock
+    _clock = clock
+
+
+def utc_now() -> dt.datetime:
+    return _clock() if _clock is not None else dt.datetime.now(dt.timezone.utc)
+
+
+def today() -> dt.date:
+    return _clock().date() if _clock is not None else dt.date.today()
+
+
+def sleep(seconds: float, cancel: threading.Event = None) -> bool:
+    """Retry back-off; a simulated clock with a ``sleep`` method advances itself instead of waiting.
+
+    Returns ``True`` when ``cancel`` was set before the back-off ended.
+    """
+    if _clock is not None and hasattr(_clock, "sleep"):
+        _clock.sleep(seconds)
+        return cancel is not None and cancel.is_set()
+    if cancel is not None:
+        return cancel.wait(seconds)
+    time.sleep(seconds)
+    return False
+
+
+# --- Run metrics ---
+# Every run records how long each phase took (credentials, candle fetch per
+# source, indicators, market metadata, order, log I/O, charts, notifications)
+# and counts retries and fallbacks. ``METRICS`` is the current run's recorder;
+# the fetch, order and notification helpers report into it wherever they are
+# called from. ``main`` appends one JSON line per run to ``METRICS_FILE`` and
+# rewrites ``PROMETHEUS_FILE`` in the node_exporter textfile format.
+METRICS_DIR = os.getenv("DCA_METRICS_DIR", "metrics")
+METRICS_FILE = os.path.join(METRICS_DIR, "run_metrics.jsonl")
+PROMETHEUS_FILE = os.path.join(METRICS_DIR, "dca_bot.prom")
+METRICS_PREFIX = "dca_bot"
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _label_text(key: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class RunMetrics:
+    """Phase timings and event counters for one bot run.
+
+    Spans and counters may be recorded from worker threads (the hedged candle
+    fetch, the notifier), so updates go through a lock.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = utc_now().timestamp()  # the run's (possibly simulated) time
+        self._clock_started = time.perf_counter()  # durations stay on the real clock
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def span(self, phase: str, **labels):
+        """Add the wall time of the ``with`` block to ``phase`` (per label set)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - started, **labels)
+
+    def add_time(self, phase: str, seconds: float, **labels) -> None:
+        key = (phase, _label_key(labels))
+        with self._lock:
+            total, calls = self.spans.get(key, (0.0, 0))
+            self.spans[key] = (total + seconds, calls + 1)
+
+    def count(self, event: str, value: int = 1, **labels) -> None:
+        key = (event, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def phase_seconds(self) -> dict:
+        """Seconds per span, keyed ``phase`` or ``phase{label=value,...}``.
+
+        Labelled spans (e.g. one per candle source) nest inside their
+        unlabelled phase and may overlap each other, so they are not summed.
+        """
+        with self._lock:
+            spans = list(self.spans.items())
+        return {phase + ("{" + _label_text(labels) + "}" if labels else ""): seconds
+                for (phase, labels), (seconds, _) in spans}
+
+    def to_record(self, status: str = None, **extra) -> dict:
+        with self._lock:
+            counters = list(self.counters.items())
+        return {
+            "time": dt.datetime.fromtimestamp(self.started, dt.timezone.utc).isoformat(timespec="seconds"),
+            "status": status,
+            "duration": round(time.perf_counter() - self._clock_started, 3),
+            **extra,
+            "phases": {name: round(seconds, 4) for name, seconds in self.phase_seconds().items()},
+            "counters": {event + ("{" + _label_text(labels) + "}" if labels else ""): value
+                         for (event, labels), value in counters},
+        }
+
+    def markdown_table(self) -> str:
+        """Compact per-phase timing table (plus counters) for the issue body."""
+        with self._lock:
+            spans = list(self.spans.items())
+            counters = list(self.counters.items())
+        if not spans:
+            return ""
+        lines = ["### ⏱️ Timings", "| Phase | Seconds | Calls |", "|---|---:|---:|"]
+        for (phase, labels), (seconds, calls) in spans:
+            name = f"{phase} ({_label_text(labels)})" if labels else phase
+            lines.append(f"| {name} | {seconds:.2f} | {calls} |")
+        if counters:
+            lines.append("\n**Counters:** " + ", ".join(
+                f"`{event}{' (' + _label_text(labels) + ')' if labels else ''}` {value}"
+                for (event, labels), value in counters))
+        return "\n".join(lines)
+
+    def to_prometheus(self, status: str = None) -> str:
+        def sample(name, labels, value):
+            label_str = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+            return f"{METRICS_PREFIX}_{name}{{{label_str}}} {value}" if label_str else f"{METRICS_PREFIX}_{name} {value}"
+
+        with self._lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        lines = [f"# HELP {METRICS_PREFIX}_last_run_timestamp_seconds Start time of the last bot run.",
+                 f"# TYPE {METRICS_PREFIX}_last_run_timestamp_seconds gauge",
+                 sample("last_run_timestamp_seconds", (), round(self.started, 3)),
+                 f"# HELP {METRICS_PREFIX}_last_run_duration_seconds Wall time of the last bot run.",
+                 f"# TYPE {METRICS_PREFIX}_last_run_duration_seconds gauge",
+                 sample("last_run_duration_seconds", (), round(time.perf_counter() - self._clock_started, 4))]
+        if status is not None:
+            lines += [f"# HELP {METRICS_PREFIX}_last_run_success 1 if the last run did not fail.",
+                      f"# TYPE {METRICS_PREFIX}_last_run_success gauge",
+                      sample("last_run_success", (), 0 if status == "failed" else 1)]
+        lines += [f"# HELP {METRICS_PREFIX}_phase_seconds Seconds spent per phase in the last run.",
+                  f"# TYPE {METRICS_PREFIX}_phase_seconds gauge"]
+        lines += [sample("phase_seconds", (("phase", phase),) + labels, round(seconds, 4))
+                  for (phase, labels), (seconds, _) in spans]
+        lines += [f"# HELP {METRICS_PREFIX}_events Retries and fallbacks counted in the last run.",
+                  f"# TYPE {METRICS_PREFIX}_events gauge"]
+        lines += [sample("events", (("event", event),) + labels, value) for (event, labels), value in counters]
+        return "\n".join(lines) + "\n"
+
+    def export(self, status: str = None, jsonl_path: str = None, prom_path: str = None, **extra) -> None:
+        """Append the run to ``METRICS_FILE`` and rewrite ``PROMETHEUS_FILE``; never raises."""
+        jsonl_path = jsonl_path or METRICS_FILE
+        prom_path = prom_path or PROMETHEUS_FILE
+        try:
+            os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+            with open(jsonl_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(self.to_record(status, **extra), ensure_ascii=False) + "\n")
+            os.makedirs(os.path.dirname(prom_path) or ".", exist_ok=True)
+            tmp_path = prom_path + ".tmp"  # the textfile collector must never see a partial file
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(self.to_prometheus(status))
+            os.replace(tmp_path, prom_path)
+        except OSError as e:
+            print(f"⚠️ Could not write run metrics: {e}")
+
+
+METRICS = RunMetrics()
+
+
+# --- GitHub run notifications ---
+# Each run is reported as a single issue: opened when the run starts and edited
+# in place with the outcome when it finishes. Requests go out from a background
+# thread over one pooled session, so the trading path never waits on GitHub.
+# Only the newest message is kept, which coalesces a start and a finish that
+# are both still pending into one request. ``close`` flushes with a deadline.
+GITHUB_API_URL = "https://api.github.com"
+NOTIFY_MAX_ATTEMPTS = 4
+NOTIFY_BACKOFF_SECONDS = 1.0
+NOTIFY_MAX_BACKOFF_SECONDS = 8.0
+NOTIFY_FLUSH_SECONDS = 20.0
+_NOTIFY_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class GitHubNotifier:
+    """Background publisher for the run's GitHub issue.
+
+    ``api_url`` (or ``GITHUB_API_URL``, which Actions sets) can point at a
+    local mock server. Without a repository slug and token it does nothing.
+    """
+
+    def __init__(self, repo_slug: str = None, token: str = None, api_url: str = None, session=None,
+                 max_attempts: int = NOTIFY_MAX_ATTEMPTS, backoff: float = NOTIFY_BACKOFF_SECONDS,
+                 max_backoff: float = NOTIFY_MAX_BACKOFF_SECONDS):
+        self.repo_slug = repo_slug or os.getenv("GITHUB_REPOSITORY")
+        self.token = token or os.getenv("GITHUB_TOKEN")
+        self.api_url = (api_url or os.getenv("GITHUB_API_URL") or GITHUB_API_URL).rstrip("/")
+        self.enabled = bool(self.repo_slug and self.token)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.issue_number = None
+        self._session = session
+        self._own_session = session is None
+        self._pending = None
+        self._closing = False
+        self._deadline = None
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def publish(self, title: str, body: str) -> None:
+        """Queue ``title``/``body`` as the issue's new content and return immediately."""
+        if not self.enabled:
+            return
+        with self._cond:
+            self._pending = (title, body)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="github-notifier", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify_all()
+
+    def close(self, deadline: float = NOTIFY_FLUSH_SECONDS) -> bool:
+        """Wait up to ``deadline`` seconds for pending messages; ``True`` when all were handled."""
+        with self._cond:
+            if self._thread is None:
+                return True
+            first_close = not self._closing
+            self._closing = True
+            if self._deadline is None:
+                self._deadline = time.monotonic() + deadline
+            self._cond.notify_all()
+        self._thread.join(max(0.0, self._deadline - time.monotonic()))
+        if self._thread.is_alive():
+            if first_close:
+                print("⚠️ GitHub notification not delivered before the flush deadline.")
+            return False
+        if self._own_session and self._session is not None:
+            self._session.close()
+            self._session = None
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closing:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                message, self._pending = self._pending, None
+            self._deliver(*message)
+
+    def _get_session(self):
+        if self._session is None:
+            session = requests.Session()
+            session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.headers.update({"Authorization": f"token {self.token}", "Accept": "application/vnd.github.v3+json"})
+            self._session = session
+        return self._session
+
+    def _remaining(self):
+        return None if self._deadline is None else self._deadline - time.monotonic()
+
+    def _deliver(self, title: str, body: str) -> bool:
+        with METRICS.span("notify", action="create" if self.issue_number is None else "update"):
+            return self._send(title, body)
+
+    def _send(self, title: str, body: str) -> bool:
+        if self.issue_number is None:
+            method, url, verb = "POST", f"{self.api_url}/repos/{self.repo_slug}/issues", "create"
+        else:
+            method, url, verb = "PATCH", f"{self.api_url}/repos/{self.repo_slug}/issues/{self.issue_number}", "update"
+        error = None
+        for attempt in range(self.max_attempts):
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                break
+            retry_after = None
+            try:
+                response = self._get_session().request(method, url, json={"title": title, "body": body},
+                                                       timeout=10 if remaining is None else max(0.1, min(10, remaining)))
+                if response.status_code in (200, 201):
+                    if self.issue_number is None:
+                        self.issue_number = response.json().get("number")
+                    return True
+                error = f"{response.status_code} {response.text[:200]}"
+                rate_limited = response.status_code == 403 and "rate limit" in response.text.lower()
+                if response.status_code not in _NOTIFY_RETRY_STATUS and not rate_limited:
+                    print(f"Failed to {verb} GitHub issue: {error}")
+                    return False
+                retry_after = response.headers.get("Retry-After")
+            except requests.RequestException as e:
+                error = e
+            if attempt < self.max_attempts - 1:
+                METRICS.count("retry", op="notify")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+                remaining = self._remaining()
+                time.sleep(min(delay, self.max_backoff, max(0.0, remaining) if remaining is not None else delay))
+        print(f"Failed to {verb} GitHub issue after {self.max_attempts} attempt(s): {error}")
+        return False
+
+
 def create_github_issue(title: str, body: str):
-    repo_slug=os.getenv("GITHUB_REPOSITORY"); token=os.getenv("GITHUB_TOKEN")
-    if not repo_slug or not token: return
-    url=f"https://api.github.com/repos/{repo_slug}/issues"
-    headers={"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
-    try:
-        response=requests.post(url, headers=headers, json={"title": title, "body": body}, timeout=10)
-        if response.status_code != 201: print(f"Failed to create GitHub issue: {response.status_code} {response.text}")
-    except Exception as e: print(f"Error creating GitHub issue: {e}")
+    """Post one standalone issue and wait (bounded) for it to go out."""
+    notifier = GitHubNotifier()
+    notifier.publish(title, body)
+    notifier.close()
 
 # --- NEW: Charting Sub-functions ---
 def _smooth_curve(x, y, num_points=500):
     """使用样条插值创建平滑曲线"""
     if len(x) < 4:  # 样条插值至少需要4个点
         return x, y
+    _load_plotting()
     try:
         # 将日期转换为数值以便插值
         x_num = mdates.date2num(x)
@@ -201,15 +551,128 @@ def _smooth_curve(x, y, num_points=500):
     except Exception:
         return x, y
 
-def _plot_roi_curve(ax, df, palette):
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points that keep the series' shape.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket. A 2D ``y`` (one series per
+    row, sharing ``x``) is reduced in the same pass and gives one row of
+    indices per series.
+    """
+    n = len(x)
+    y = np.asarray(y, dtype=float)
+    rows = np.atleast_2d(y)
+    if threshold >= n or threshold < 3:
+        keep = np.broadcast_to(np.arange(n), (len(rows), n))
+        return keep[0] if y.ndim == 1 else keep
+    x = np.asarray(x, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty((len(rows), threshold), dtype=int)
+    keep[:, 0], keep[:, -1] = 0, n - 1
+    prev = np.zeros(len(rows), dtype=int)
+    row_ids = np.arange(len(rows))
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = rows[:, nxt_lo:nxt_hi].mean(axis=1)
+        x_prev, y_prev = x[prev][:, None], rows[row_ids, prev][:, None]
+        area = np.abs((x_prev - avg_x) * (rows[:, lo:hi] - y_prev) - (x_prev - x[lo:hi]) * (avg_y[:, None] - y_prev))
+        prev = lo + np.argmax(area, axis=1)
+        keep[:, i + 1] = prev
+    return keep[0] if y.ndim == 1 else keep
+
+
+# Scatter markers per series; beyond this the panel shows an LTTB subset.
+MAX_PANEL_POINTS = 400
+# Columns the panels draw, each smoothed and downsampled once per render.
+DASHBOARD_SERIES = ("roi_pct", "value_usd", "invest_cum", "buy_usd", "hold_btc_cum",
+                    "price_usd", "avg_cost", "regular_roi_pct")
+
+
+def _dashboard_columns(log) -> dict:
+    """Invested rows of ``log`` (records or a ``LOG_COLUMNS`` frame) as the column arrays the panels plot.
+
+    The panels only ever index columns, so a dict of NumPy arrays stands in
+    for a DataFrame: no object-typed dates, no copies beyond the filter.
+    """
+    cols = log_columns(log)
+    keep = (cols['price_usd'] > 0) & (cols['buy_usd'] > 0)
+    df = {name: values[keep] for name, values in cols.items()}
+    df['date'] = df.pop('day').astype('datetime64[D]')
+    df['invest_cum'] = np.cumsum(df['buy_usd'])
+    df['hold_btc_cum'] = np.cumsum(df['buy_btc'])
+    df['value_usd'] = df['hold_btc_cum'] * df['price_usd']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = df['value_usd'] / df['invest_cum'] - 1
+    df['roi'] = np.where(np.isnan(roi), 0.0, roi)
+    return df
+
+
+def _prepare_dashboard_frame(df: dict) -> dict:
+    """Add the derived columns the panels plot (``df`` already has the cumulative ones)."""
+    baseline = float(np.median(df['buy_usd']))
+    df['roi_pct'] = df['roi'] * 100
+    df['avg_cost'] = df['invest_cum'] / df['hold_btc_cum']
+    df['regular_dca_cost'] = baseline * np.arange(1, len(df['buy_usd']) + 1)
+    df['regular_dca_btc'] = np.cumsum(baseline / df['price_usd'])
+    df['regular_dca_value'] = df['regular_dca_btc'] * df['price_usd']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        regular_roi = df['regular_dca_value'] / df['regular_dca_cost'] - 1
+    df['regular_roi'] = np.where(np.isnan(regular_roi), 0.0, regular_roi)
+    df['regular_roi_pct'] = df['regular_roi'] * 100
+    return df
+
+
+def prepare_dashboard_series(df: dict, columns=DASHBOARD_SERIES, num_points: int = 500,
+                             max_points: int = MAX_PANEL_POINTS) -> dict:
+    """Smooth and downsample every plotted column once for the whole render.
+
+    Returns ``{column: (x_smooth, y_smooth, x_points, y_points)}``. All columns
+    share one date axis, so ``date2num``/``num2date`` run once and a single
+    spline is fitted to every finite column together; a column holding a NaN
+    or inf (say ``avg_cost`` before the first fill) is drawn raw on its own.
+    Scatter points are reduced with LTTB to at most ``max_points`` per column.
+    """
+    _load_plotting()
+    dates = np.asarray(df['date'])
+    n = len(dates)
+    values = np.column_stack([np.asarray(df[c], dtype=float) for c in columns]) if n else np.empty((0, len(columns)))
+    x_num = mdates.date2num(dates)
+    finite = np.isfinite(values).all(axis=0)
+    smooth = None
+    if n >= 4 and finite.any():
+        try:
+            spl = make_interp_spline(x_num, values[:, finite], k=min(3, n - 1))
+            x_smooth_num = np.linspace(x_num.min(), x_num.max(), num_points)
+            smooth = (mdates.num2date(x_smooth_num), spl(x_smooth_num))
+        except Exception:
+            smooth = None  # e.g. duplicate dates: draw the raw series like _smooth_curve does
+
+    series = {}
+    smooth_column = np.cumsum(finite) - 1  # column j's index among the fitted ones
+    for j, column in enumerate(columns):
+        y = values[:, j]
+        idx = lttb_indices(x_num, np.nan_to_num(y), max_points)
+        points = (dates[idx], y[idx])
+        if smooth is not None and finite[j]:
+            series[column] = (smooth[0], smooth[1][:, smooth_column[j]]) + points
+        else:
+            series[column] = (dates, y) + points
+    return series
+
+
+def _plot_roi_curve(ax, df, palette, series):
     # 平滑ROI曲线
-    x_smooth, y_smooth = _smooth_curve(df['date'], df['roi'] * 100)
+    x_smooth, y_smooth, x_pts, y_pts = series['roi_pct']
     
     # 绘制平滑曲线，增加渐变效果
     ax.plot(x_smooth, y_smooth, label="Portfolio ROI", color=palette['roi'], linewidth=2.8, alpha=0.9)
     
-    # 添加所有原始数据点作为标记
-    ax.scatter(df['date'], df['roi'] * 100, 
+    # 添加数据点标记（长历史时为LTTB降采样后的点）
+    ax.scatter(x_pts, y_pts, 
                color=palette['roi'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 填充正负区域
@@ -225,15 +688,15 @@ def _plot_roi_curve(ax, df, palette):
     ax.set_ylabel("ROI (%)", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'{y:.0f}%'))
 
-def _plot_equity_curve(ax, df, palette):
+def _plot_equity_curve(ax, df, palette, series):
     # 平滑权益曲线
-    x_smooth, y_smooth = _smooth_curve(df['date'], df['value_usd'])
+    x_smooth, y_smooth, x_pts, y_pts = series['value_usd']
     
     # 绘制平滑曲线
     ax.plot(x_smooth, y_smooth, label="Portfolio Value", color=palette['value'], linewidth=2.8, alpha=0.9)
     
-    # 添加所有数据点标记
-    ax.scatter(df['date'], df['value_usd'], 
+    # 添加数据点标记
+    ax.scatter(x_pts, y_pts, 
                color=palette['value'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 添加渐变填充效果
@@ -246,19 +709,19 @@ def _plot_equity_curve(ax, df, palette):
     ax.set_ylabel("Portfolio Value (USD)", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'${y:,.0f}'))
 
-def _plot_value_vs_cost(ax, df, palette):
+def _plot_value_vs_cost(ax, df, palette, series):
     # 平滑价值曲线和成本曲线
-    x_smooth, y_value_smooth = _smooth_curve(df['date'], df['value_usd'])
-    _, y_cost_smooth = _smooth_curve(df['date'], df['invest_cum'])
+    x_smooth, y_value_smooth, x_value_pts, y_value_pts = series['value_usd']
+    _, y_cost_smooth, x_cost_pts, y_cost_pts = series['invest_cum']
     
     # 绘制平滑曲线
     ax.plot(x_smooth, y_value_smooth, label="Portfolio Value", color=palette['value'], linewidth=2.8, alpha=0.9)
     ax.plot(x_smooth, y_cost_smooth, label="Cumulative Cost", color=palette['cost'], linewidth=2.8, alpha=0.9, linestyle='-')
     
-    # 添加所有数据点标记
-    ax.scatter(df['date'], df['value_usd'], 
+    # 添加数据点标记
+    ax.scatter(x_value_pts, y_value_pts, 
                color=palette['value'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
-    ax.scatter(df['date'], df['invest_cum'], 
+    ax.scatter(x_cost_pts, y_cost_pts, 
                color=palette['cost'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 填充盈亏区域（使用平滑数据）
@@ -277,17 +740,17 @@ def _plot_value_vs_cost(ax, df, palette):
     ax.set_ylabel("Amount (USD)", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'${y:,.0f}'))
 
-def _plot_daily_investment(ax, df, palette):
-    baseline = df['buy_usd'].median()
+def _plot_daily_investment(ax, df, palette, series):
+    baseline = np.median(df['buy_usd'])
 
     # 平滑投资额曲线
-    x_smooth, y_smooth = _smooth_curve(df['date'], df['buy_usd'])
+    x_smooth, y_smooth, x_pts, y_pts = series['buy_usd']
     
     # 绘制投资额曲线
     ax.plot(x_smooth, y_smooth, label="Daily Investment", color=palette['cost'], linewidth=2.8, alpha=0.9)
     
-    # 添加所有数据点
-    ax.scatter(df['date'], df['buy_usd'], 
+    # 添加数据点
+    ax.scatter(x_pts, y_pts, 
                color=palette['cost'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 添加基准线
@@ -305,15 +768,15 @@ def _plot_daily_investment(ax, df, palette):
     ax.set_ylabel("Investment (USD)", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'${y:.2f}'))
 
-def _plot_btc_accumulation(ax, df, palette):
+def _plot_btc_accumulation(ax, df, palette, series):
     # 平滑BTC累计曲线
-    x_smooth, y_smooth = _smooth_curve(df['date'], df['hold_btc_cum'])
+    x_smooth, y_smooth, x_pts, y_pts = series['hold_btc_cum']
     
     # 绘制BTC累计曲线
     ax.plot(x_smooth, y_smooth, label="BTC Holdings", color=palette['roi'], linewidth=2.8, alpha=0.9)
     
-    # 添加所有数据点
-    ax.scatter(df['date'], df['hold_btc_cum'], 
+    # 添加数据点
+    ax.scatter(x_pts, y_pts, 
                color=palette['roi'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 添加渐变填充
@@ -326,22 +789,19 @@ def _plot_btc_accumulation(ax, df, palette):
     ax.set_ylabel("BTC Amount", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'{y:.6f}'))
 
-def _plot_avg_cost_vs_price(ax, df, palette):
-    # 计算平均成本
-    df['avg_cost'] = df['invest_cum'] / df['hold_btc_cum']
-    
-    # 平滑曲线
-    x_smooth, y_price_smooth = _smooth_curve(df['date'], df['price_usd'])
-    _, y_cost_smooth = _smooth_curve(df['date'], df['avg_cost'])
+def _plot_avg_cost_vs_price(ax, df, palette, series):
+    # 平滑曲线（平均成本列由 _prepare_dashboard_frame 计算）
+    x_smooth, y_price_smooth, x_price_pts, y_price_pts = series['price_usd']
+    _, y_cost_smooth, x_cost_pts, y_cost_pts = series['avg_cost']
     
     # 绘制价格和平均成本
     ax.plot(x_smooth, y_price_smooth, label="BTC Price", color=palette['value'], linewidth=2.8, alpha=0.9)
     ax.plot(x_smooth, y_cost_smooth, label="Average Cost", color=palette['cost'], linewidth=2.8, alpha=0.9)
     
-    # 添加所有数据点
-    ax.scatter(df['date'], df['price_usd'], 
+    # 添加数据点
+    ax.scatter(x_price_pts, y_price_pts, 
                color=palette['value'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
-    ax.scatter(df['date'], df['avg_cost'], 
+    ax.scatter(x_cost_pts, y_cost_pts, 
                color=palette['cost'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 填充盈亏区域
@@ -356,26 +816,19 @@ def _plot_avg_cost_vs_price(ax, df, palette):
     ax.set_ylabel("Price (USD)", fontsize=14)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'${y:,.0f}'))
 
-def _plot_strategy_comparison(ax, df, palette):
-    # 计算普通定投（固定金额）
-    baseline = df['buy_usd'].median()
-    df['regular_dca_cost'] = baseline * np.arange(1, len(df) + 1)
-    df['regular_dca_btc'] = (baseline / df['price_usd']).cumsum()
-    df['regular_dca_value'] = df['regular_dca_btc'] * df['price_usd']
-    df['regular_roi'] = (df['regular_dca_value'] / df['regular_dca_cost'] - 1).fillna(0)
-    
-    # 平滑曲线
-    x_smooth, y_smart_smooth = _smooth_curve(df['date'], df['roi'] * 100)
-    _, y_regular_smooth = _smooth_curve(df['date'], df['regular_roi'] * 100)
+def _plot_strategy_comparison(ax, df, palette, series):
+    # 普通定投（固定金额）的ROI由 _prepare_dashboard_frame 计算
+    x_smooth, y_smart_smooth, x_smart_pts, y_smart_pts = series['roi_pct']
+    _, y_regular_smooth, x_regular_pts, y_regular_pts = series['regular_roi_pct']
     
     # 绘制两种策略的ROI
     ax.plot(x_smooth, y_smart_smooth, label="Smart DCA (AHR999)", color=palette['roi'], linewidth=2.8, alpha=0.9)
     ax.plot(x_smooth, y_regular_smooth, label="Regular DCA (Fixed)", color=palette['cost'], linewidth=2.8, alpha=0.9, linestyle='--')
     
-    # 添加所有数据点
-    ax.scatter(df['date'], df['roi'] * 100, 
+    # 添加数据点
+    ax.scatter(x_smart_pts, y_smart_pts, 
                color=palette['roi'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
-    ax.scatter(df['date'], df['regular_roi'] * 100, 
+    ax.scatter(x_regular_pts, y_regular_pts, 
                color=palette['cost'], s=40, alpha=0.6, zorder=5, edgecolors='white', linewidths=0.5)
     
     # 填充优势区域
@@ -399,7 +852,7 @@ def _finalize_axis(ax, legend_face, fontsize=10, ncol=1):
     plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
 
 
-def _style_axes(ax, theme_config: dict):
+def _style_axes(ax, theme_config: dict, minor_ticks: bool = True):
     axes_face = theme_config.get("axes_facecolor")
     if axes_face:
         ax.set_facecolor(axes_face)
@@ -412,8 +865,9 @@ def _style_axes(ax, theme_config: dict):
     
     # 增强网格效果
     ax.grid(True, which='major', linestyle='-', linewidth=0.8, alpha=0.3)
-    ax.grid(True, which='minor', linestyle=':', linewidth=0.5, alpha=0.2)
-    ax.minorticks_on()
+    if minor_ticks:
+        ax.grid(True, which='minor', linestyle=':', linewidth=0.5, alpha=0.2)
+        ax.minorticks_on()
     
     # 设置刻度样式
     ax.tick_params(axis='both', which='major', labelsize=11, length=6, width=1.2)
@@ -425,24 +879,259 @@ def _style_axes(ax, theme_config: dict):
             alpha=0.15, ha='center', va='center', rotation=30, zorder=0)
 
 
-def generate_dashboard_charts(log_df: pd.DataFrame, theme_key=None):
+# --- Render pipeline: profiles, panel layout and per-panel workers ---
+# Each profile fixes the canvas size and dpi; ``print`` reproduces the original
+# 24x30in @ 300dpi output, ``standard`` is what the daily run commits.
+RENDER_PROFILES = {
+    "preview": {"figsize": (16, 20), "dpi": 60, "minor_ticks": False},
+    "standard": {"figsize": (24, 30), "dpi": 100, "minor_ticks": True},
+    "print": {"figsize": (24, 30), "dpi": 300, "minor_ticks": True},
+}
+DEFAULT_RENDER_PROFILE = "standard"
+DASHBOARD_OUTPUT = "dashboard_comprehensive.png"
+# Rendered dashboards are kept per theme under their content fingerprint; each
+# theme directory is trimmed (least recently used first) to these bounds.
+DASHBOARD_CACHE_DIR = os.getenv("DCA_DASHBOARD_CACHE_DIR", os.path.join(".cache", "dashboards"))
+DASHBOARD_CACHE_MAX_BYTES = int(os.getenv("DCA_DASHBOARD_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DASHBOARD_CACHE_MAX_ENTRIES = 16
+# Bump whenever panel drawing changes so stale cached images are not reused.
+DASHBOARD_RENDER_VERSION = 1
+
+# (name, plot function, row, column, column span, legend kwargs) on a 4x2 grid
+DASHBOARD_PANELS = [
+    ("roi", _plot_roi_curve, 0, 0, 1, {}),
+    ("equity", _plot_equity_curve, 0, 1, 1, {}),
+    ("value_vs_cost", _plot_value_vs_cost, 1, 0, 1, {}),
+    ("daily_investment", _plot_daily_investment, 1, 1, 1, {}),
+    ("btc_accumulation", _plot_btc_accumulation, 2, 0, 1, {}),
+    ("avg_cost_vs_price", _plot_avg_cost_vs_price, 2, 1, 1, {}),
+    ("strategy_comparison", _plot_strategy_comparison, 3, 0, 2, {"fontsize": 11, "ncol": 2}),
+]
+# Panel area in figure fractions (left, bottom, right, top) and the space, in
+# inches, each panel keeps around its axes for title, tick labels and y label.
+_PANEL_AREA = (0.02, 0.02, 0.98, 0.905)
+_PANEL_MARGINS_IN = {"left": 1.5, "right": 0.3, "bottom": 1.1, "top": 0.8}
+
+
+def _resolve_render_profile(profile_key):
+    key = (profile_key or DEFAULT_RENDER_PROFILE).lower().strip()
+    if key not in RENDER_PROFILES:
+        print(f"⚠️ Unknown render profile '{profile_key}', falling back to '{DEFAULT_RENDER_PROFILE}'.")
+        key = DEFAULT_RENDER_PROFILE
+    return key, RENDER_PROFILES[key]
+
+
+def _panel_cells(figsize: tuple, dpi: int) -> list:
+    """Pixel box ``(x0, y0, width, height)`` (origin bottom-left) for every panel."""
+    fig_w, fig_h = figsize[0] * dpi, figsize[1] * dpi
+    left, bottom, right, top = _PANEL_AREA
+    col_w = (right - left) / 2 * fig_w
+    row_h = (top - bottom) / 4 * fig_h
+    cells = []
+    for _, _, row, col, span, _ in DASHBOARD_PANELS:
+        x0 = int(round(left * fig_w + col * col_w))
+        y0 = int(round(top * fig_h - (row + 1) * row_h))
+        cells.append((x0, y0, int(round(col_w * span)), int(round(row_h))))
+    return cells
+
+
+def _render_panel(job: dict) -> tuple:
+    """Draw one dashboard panel on its own canvas and return ``(name, rgba, seconds)``.
+
+    Runs in a worker process; everything it needs travels in ``job``.
+    """
+    _load_plotting()
+    started = time.perf_counter()
+    theme_config = job["theme_config"]
+    dpi = job["dpi"]
+    width_px, height_px = job["size_px"]
+    width_in, height_in = width_px / dpi, height_px / dpi
+    m = _PANEL_MARGINS_IN
+    axes_rect = [m["left"] / width_in, m["bottom"] / height_in,
+                 1 - (m["left"] + m["right"]) / width_in, 1 - (m["bottom"] + m["top"]) / height_in]
+    with plt.rc_context(theme_config.get("rc", {})):
+        with plt.style.context(theme_config.get("style", "seaborn-v0_8-darkgrid")):
+            fig = plt.figure(figsize=(width_in, height_in), dpi=dpi)
+            fig.patch.set_facecolor(theme_config.get("figure_facecolor", "white"))
+            ax = fig.add_axes(axes_rect)
+            _style_axes(ax, theme_config, minor_ticks=job["minor_ticks"])
+            job["plot_fn"](ax, job["df"], theme_config["palette"], job["series"])
+            _finalize_axis(ax, job["legend_face"], **job["finalize_kwargs"])
+            fig.canvas.draw()
+            pixels = np.asarray(fig.canvas.buffer_rgba()).copy()
+            plt.close(fig)
+    return job["name"], pixels, time.perf_counter() - started
+
+
+def _render_workers(workers: int = None) -> int:
+    if workers is None:
+        workers = int(os.getenv("DCA_RENDER_WORKERS", "0") or 0) or min(len(DASHBOARD_PANELS), os.cpu_count() or 1)
+    return workers
+
+
+def start_panel_pool(workers: int = None):
+    """Start the panel render processes now; ``None`` when rendering in-process.
+
+    fork is the cheapest start, but forking while other threads run (the
+    GitHub notifier, a losing candle hedge) can copy a lock one of them holds
+    into the child and deadlock it. A fork pool launches every worker on its
+    first task, so ``main`` calls this before any thread exists and the
+    workers import matplotlib while the run fetches candles. Once threads are
+    running the pool uses forkserver (or spawn) instead, which is safe but
+    pays a fresh interpreter per worker.
+    """
+    workers = _render_workers(workers)
+    if workers <= 1:
+        return None
+    try:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        methods = multiprocessing.get_all_start_methods()
+        if threading.active_count() == 1 and "fork" in methods:
+            method = "fork"
+        else:
+            method = "forkserver" if "forkserver" in methods else "spawn"
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        for _ in range(workers):
+            pool.submit(_load_plotting)
+        return pool
+    except Exception as e:  # noqa: BLE001 - a broken pool must not cost us the chart
+        print(f"⚠️ Could not start panel render processes ({e}); rendering serially.")
+        return None
+
+
+def _render_panels(jobs: list, workers: int, pool=None) -> list:
+    """Render panel jobs on ``pool`` (or a pool of ``workers`` started here), falling back to in-process rendering."""
+    own_pool = pool is None
+    if own_pool:
+        pool = start_panel_pool(workers)
+    if pool is not None:
+        try:
+            return list(pool.map(_render_panel, jobs))
+        except Exception as e:  # noqa: BLE001 - a broken pool must not cost us the chart
+            print(f"⚠️ Parallel panel rendering failed ({e}); rendering serially.")
+        finally:
+            if own_pool:
+                pool.shutdown()
+    return [_render_panel(job) for job in jobs]
+
+
+def dashboard_fingerprint(df: dict, header: dict, theme_key: str, theme_config: dict,
+                          profile_key: str, render_profile: dict) -> str:
+    """SHA-256 over everything that ends up in the dashboard image.
+
+    ``df`` holds the invested rows the panels draw and ``header`` the numbers
+    shown in the stats strip, so a skip day (nothing bought) fingerprints the
+    same as the day before.
+    """
+    digest = hashlib.sha256()
+    params = {"version": DASHBOARD_RENDER_VERSION, "theme": theme_key, "theme_config": theme_config,
+              "profile": profile_key, "render_profile": render_profile, "header": header,
+              "panels": [(name, row, col, span, kwargs) for name, _, row, col, span, kwargs in DASHBOARD_PANELS],
+              "max_panel_points": MAX_PANEL_POINTS}
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    digest.update("\n".join(np.datetime_as_string(np.asarray(df['date'], dtype='datetime64[D]'))).encode("ascii"))
+    for column in ('buy_usd', 'buy_btc', 'price_usd'):
+        digest.update(np.ascontiguousarray(df[column], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _dashboard_cache_path(theme_key: str, fingerprint: str, cache_dir: str = None) -> str:
+    return os.path.join(cache_dir or DASHBOARD_CACHE_DIR, theme_key, f"{fingerprint}.png")
+
+
+def _evict_dashboard_cache(theme_dir: str, max_bytes: int = None, max_entries: int = None) -> int:
+    """Drop the least recently used images until the theme directory fits its bounds."""
+    max_bytes = DASHBOARD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_entries = DASHBOARD_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    try:
+        entries = [e for e in os.scandir(theme_dir) if e.is_file() and e.name.endswith(".png")]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    kept_bytes, removed = 0, 0
+    for index, entry in enumerate(entries):
+        size = entry.stat().st_size
+        if index < max_entries and kept_bytes + size <= max_bytes:
+            kept_bytes += size
+            continue
+        with contextlib.suppress(OSError):
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def _store_dashboard_cache(output: str, cached_path: str):
+    os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+    tmp_path = f"{cached_path}.tmp"
+    shutil.copyfile(output, tmp_path)
+    os.replace(tmp_path, cached_path)
+    removed = _evict_dashboard_cache(os.path.dirname(cached_path))
+    if removed:
+        print(f"🧹 Dashboard cache: evicted {removed} old image(s) from {os.path.dirname(cached_path)}")
+
+
+def _restore_dashboard_cache(cached_path: str, output: str):
+    """Copy a cached image to ``output`` unless it is already byte-identical."""
+    os.utime(cached_path)  # mark as recently used for eviction
+    if os.path.exists(output):
+        import filecmp
+        if filecmp.cmp(cached_path, output, shallow=False):
+            return
+    shutil.copyfile(cached_path, output)
+
+
+def _dashboard_header_stats(header: dict, df: dict) -> dict:
+    """Numbers in the dashboard's stats strip, including the fixed-amount DCA comparison."""
+    total_invested = header['total_invested']
+    total_btc = header['total_btc']
+    current_price = header['current_price']
+    current_value = total_btc * current_price
+    avg_cost = total_invested / total_btc if total_btc > 0 else 0.0
+    total_profit = current_value - total_invested
+    roi_pct = (total_profit / total_invested) * 100 if total_invested > 0 else 0.0
+
+    # 计算普通定投对比
+    baseline = float(np.median(df['buy_usd']))
+    regular_invested = baseline * header['invest_days']
+    regular_btc = baseline * header['sum_inv_price']
+    regular_value = regular_btc * current_price
+    regular_profit = regular_value - regular_invested
+    regular_roi = (regular_profit / regular_invested) * 100
+
+    # 策略优势
+    return {"total_invested": total_invested, "total_btc": total_btc, "invest_days": header['invest_days'],
+            "current_price": current_price, "current_value": current_value, "avg_cost": avg_cost,
+            "total_profit": total_profit, "roi_pct": roi_pct, "regular_roi": regular_roi,
+            "strategy_advantage": roi_pct - regular_roi, "profit_advantage": total_profit - regular_profit}
+
+
+def generate_dashboard_charts(log_df, theme_key=None, state: dict = None,
+                              profile: str = None, workers: int = None, output: str = DASHBOARD_OUTPUT,
+                              use_cache: bool = True, pool=None):
+    """Render the dashboard and return a timing report (``None`` when nothing was drawn).
+
+    ``log_df`` is the trade log as records (``read_trade_log_records``) or as
+    a ``LOG_COLUMNS`` frame. The seven panels are drawn concurrently in worker
+    processes at the pixel size of their grid cell, then composited under the
+    stats header. When an image with the same fingerprint is already cached
+    for the theme it is reused and nothing is drawn. ``pool`` is a
+    ``start_panel_pool`` started earlier; without one a pool is started here.
+    """
     if log_df is None or len(log_df) == 0:
         print("⚠️ No data to generate charts.")
         return
     
     try:
-        df = log_df.dropna(subset=['date', 'price_usd'])
-        df = df[(df['price_usd'] > 0) & (df['buy_usd'] > 0)].reset_index(drop=True).copy()
+        render_started = time.perf_counter()
+        _load_plotting()
+        df = _dashboard_columns(log_df)
 
-        if df.empty:
+        if not len(df['date']):
             print("⚠️ No investment data yet. Charts will be generated after first trade.")
             return
 
-        df['date'] = pd.to_datetime(df['date'])
-        df['invest_cum'] = df['buy_usd'].cumsum()
-        df['hold_btc_cum'] = df['buy_btc'].cumsum()
-        df['value_usd'] = df['hold_btc_cum'] * df['price_usd']
-        df['roi'] = (df['value_usd'] / df['invest_cum'] - 1).fillna(0)
+        df = _prepare_dashboard_frame(df)
 
         theme_key, theme_config = _resolve_chart_theme(theme_key)
         palette = theme_config['palette']
@@ -450,48 +1139,67 @@ def generate_dashboard_charts(log_df: pd.DataFrame, theme_key=None):
         legend_face = theme_config.get("legend_facecolor", figure_face)
         rc_override = theme_config.get("rc", {})
 
+        profile_key, render_profile = _resolve_render_profile(profile or os.getenv("DCA_RENDER_PROFILE"))
+        figsize, dpi = render_profile["figsize"], render_profile["dpi"]
+
+        # 关键统计数据取自组合状态快照（未传入时从日志重建）；价格取最后一次买入日，
+        # 这样跳过日不会改变图片
+        if state is None:
+            state = portfolio_state_from_log(log_df)
+        header = {key: state[key] for key in ('total_invested', 'total_btc', 'invest_days', 'sum_inv_price')}
+        header['current_price'] = float(df['price_usd'][-1])
+
+        cached_path = None
+        if use_cache:
+            fingerprint = dashboard_fingerprint(df, header, theme_key, theme_config, profile_key, render_profile)
+            cached_path = _dashboard_cache_path(theme_key, fingerprint)
+            if os.path.exists(cached_path):
+                _restore_dashboard_cache(cached_path, output)
+                print(f"📦 Dashboard cache hit ({theme_key}, {profile_key}, {fingerprint[:12]}): {output} is up to date")
+                return {"output": output, "theme": theme_key, "profile": profile_key, "cache": "hit",
+                        "fingerprint": fingerprint, "total": round(time.perf_counter() - render_started, 3)}
+            print(f"📦 Dashboard cache miss ({theme_key}, {profile_key}, {fingerprint[:12]}): rendering")
+        workers = _render_workers(workers)
+        cells = _panel_cells(figsize, dpi)
+        smoothing_started = time.perf_counter()
+        series = prepare_dashboard_series(df)
+        smoothing_seconds = time.perf_counter() - smoothing_started
+        jobs = [{"name": name, "plot_fn": plot_fn, "finalize_kwargs": finalize_kwargs, "df": df, "series": series,
+                 "theme_config": theme_config, "legend_face": legend_face, "dpi": dpi,
+                 "size_px": (cell[2], cell[3]), "minor_ticks": render_profile["minor_ticks"]}
+                for (name, plot_fn, _, _, _, finalize_kwargs), cell in zip(DASHBOARD_PANELS, cells)]
+        panels_started = time.perf_counter()
+        rendered = _render_panels(jobs, workers, pool)
+        panels_wall = time.perf_counter() - panels_started
+
         style_context = plt.style.context(theme_config.get("style", "seaborn-v0_8-darkgrid"))
         with plt.rc_context(rc_override):
             with style_context:
                 # 创建综合仪表盘 - 4行2列布局，顶部留出空间给统计信息
-                fig = plt.figure(figsize=(24, 30), dpi=150)
+                fig = plt.figure(figsize=figsize, dpi=dpi)
                 fig.patch.set_facecolor(figure_face)
                 
                 # 添加总标题
                 fig.suptitle('DCA Investment Dashboard - AHR999 Strategy', fontsize=28, fontweight='bold', y=0.988)
                 
-                # 计算关键统计数据
-                total_invested = df['invest_cum'].iloc[-1]
-                total_btc = df['hold_btc_cum'].iloc[-1]
-                current_value = df['value_usd'].iloc[-1]
-                avg_cost = total_invested / total_btc if total_btc > 0 else 0.0
-                current_price = df['price_usd'].iloc[-1]
-                total_profit = current_value - total_invested
-                roi_pct = (total_profit / total_invested) * 100 if total_invested > 0 else 0.0
-                
-                # 计算普通定投对比
-                baseline = df['buy_usd'].median()
-                regular_invested = baseline * len(df)
-                regular_btc = (baseline / df['price_usd']).sum()
-                regular_value = regular_btc * current_price
-                regular_profit = regular_value - regular_invested
-                regular_roi = (regular_profit / regular_invested) * 100
-                
-                # 策略优势
-                strategy_advantage = roi_pct - regular_roi
-                profit_advantage = total_profit - regular_profit
+                stats = _dashboard_header_stats(header, df)
+                total_invested, total_btc = stats['total_invested'], stats['total_btc']
+                current_price, current_value = stats['current_price'], stats['current_value']
+                avg_cost, total_profit, roi_pct = stats['avg_cost'], stats['total_profit'], stats['roi_pct']
+                regular_roi = stats['regular_roi']
+                strategy_advantage, profit_advantage = stats['strategy_advantage'], stats['profit_advantage']
                 
                 # 添加统计信息面板 - 居中显示，带双横线
                 stats_y = 0.965
                 
                 # 上横线
-                fig.text(0.5, stats_y + 0.002, '─' * 220, ha='center', fontsize=8, color='gray', alpha=0.5)
+                fig.add_artist(plt.Line2D([0.03, 0.97], [stats_y + 0.004] * 2, color='gray', alpha=0.5, linewidth=1))
                 
                 # 第一行统计数据 - 居中对齐布局
                 col1_x = 0.12
                 fig.text(col1_x, stats_y - 0.012, 'Investment:', fontsize=13, fontweight='bold', color=palette['roi'], ha='center')
                 fig.text(col1_x, stats_y - 0.025, f'${total_invested:,.2f}', fontsize=11, ha='center')
-                fig.text(col1_x, stats_y - 0.036, f'{len(df)} days', fontsize=10, alpha=0.8, ha='center')
+                fig.text(col1_x, stats_y - 0.036, f"{header['invest_days']} days", fontsize=10, alpha=0.8, ha='center')
                 
                 col2_x = 0.28
                 fig.text(col2_x, stats_y - 0.012, 'Holdings:', fontsize=13, fontweight='bold', color=palette['roi'], ha='center')
@@ -517,40 +1225,293 @@ def generate_dashboard_charts(log_df: pd.DataFrame, theme_key=None):
                         fontweight='bold', color=adv_color, ha='center')
                 
                 # 下横线
-                fig.text(0.5, stats_y - 0.045, '─' * 220, ha='center', fontsize=8, color='gray', alpha=0.5)
+                fig.add_artist(plt.Line2D([0.03, 0.97], [stats_y - 0.043] * 2, color='gray', alpha=0.5, linewidth=1))
                 
-                # 创建子图 - 图表进一步下移
-                gs = fig.add_gridspec(4, 2, hspace=0.35, wspace=0.25, top=0.88, bottom=0.02, left=0.06, right=0.94)
-                
-                panels = [
-                    (gs[0, 0], _plot_roi_curve, {}),
-                    (gs[0, 1], _plot_equity_curve, {}),
-                    (gs[1, 0], _plot_value_vs_cost, {}),
-                    (gs[1, 1], _plot_daily_investment, {}),
-                    (gs[2, 0], _plot_btc_accumulation, {}),
-                    (gs[2, 1], _plot_avg_cost_vs_price, {}),
-                    (gs[3, :], _plot_strategy_comparison, {"fontsize": 11, "ncol": 2}),
-                ]
-                for spec, plot_fn, finalize_kwargs in panels:
-                    ax = fig.add_subplot(spec)
-                    _style_axes(ax, theme_config)
-                    plot_fn(ax, df, palette)
-                    _finalize_axis(ax, legend_face, **finalize_kwargs)
+                # 贴上各子图（由工作进程按单元格像素尺寸渲染）
+                for (name, pixels, _), (x0, y0, _, _) in zip(rendered, cells):
+                    fig.figimage(pixels, xo=x0, yo=y0, origin='upper', zorder=2)
                 
                 # 保存综合仪表盘
-                output_dashboard = "dashboard_comprehensive.png"
-                plt.savefig(output_dashboard, dpi=300, bbox_inches='tight', facecolor=fig.get_facecolor())
+                compose_started = time.perf_counter()
+                fig.savefig(output, dpi=dpi, facecolor=fig.get_facecolor())
                 plt.close(fig)
-                print(f"✅ Comprehensive Dashboard generated ({theme_key}): {output_dashboard}")
+                compose_seconds = time.perf_counter() - compose_started
+
+        if cached_path:
+            try:
+                _store_dashboard_cache(output, cached_path)
+            except OSError as e:
+                print(f"⚠️ Could not cache dashboard image: {e}")
+
+        report = {
+            "output": output,
+            "theme": theme_key,
+            "profile": profile_key,
+            "cache": "miss" if cached_path else "off",
+            "workers": workers,
+            "panels": {name: round(seconds, 3) for name, _, seconds in rendered},
+            "smoothing": round(smoothing_seconds, 3),
+            "panels_wall": round(panels_wall, 3),
+            "compose": round(compose_seconds, 3),
+            "total": round(time.perf_counter() - render_started, 3),
+        }
+        print(f"✅ Comprehensive Dashboard generated ({theme_key}, {profile_key} {dpi}dpi): {output}")
+        print(f"⏱️ Render: {report['total']:.2f}s total, smoothing {report['smoothing']:.2f}s, panels {report['panels_wall']:.2f}s wall on "
+              f"{workers} worker(s), save {report['compose']:.2f}s")
+        for name, seconds in report["panels"].items():
+            print(f"   {name:<22}{seconds:>7.2f}s")
+        return report
 
     except Exception as e:
         print(f"Could not generate dashboard charts: {e}")
 
 
-def calculate_portfolio_summary(log_df: pd.DataFrame, current_price: float) -> str:
-    if log_df is None or log_df.empty: return "### 📊 Portfolio Summary\n- No trading history found yet."
+# --- HTML dashboard ---
+# ``generate_dashboard_html`` writes the same seven panels and stats strip as a
+# single self-contained HTML page that draws them client-side as SVG, with a
+# hover read-out. Only the union of each plotted column's LTTB points (at most
+# ``HTML_POINTS_PER_SERIES`` per column) is embedded, quantised to
+# ``HTML_SERIES_DIGITS`` significant digits and delta-encoded, so the file stays
+# at tens of KB whatever the length of the log, and nothing is rasterised.
+DASHBOARD_HTML_OUTPUT = "dashboard.html"
+DASHBOARD_FORMAT = os.getenv("DCA_DASHBOARD_FORMAT", "png").lower().strip()
+HTML_POINTS_PER_SERIES = 120
+HTML_SERIES_DIGITS = 6
+
+# Client-side counterpart of the ``_plot_*`` functions: lines are
+# (column, palette key, label, dashed); fills shade between column ``a`` and
+# column or constant ``b`` with the ``pos`` / ``neg`` colour; ``hline`` is a
+# dashed reference line. ``fmt`` picks the axis/tooltip number format.
+HTML_PANELS = {
+    "roi": {"title": "1. Return on Investment (ROI)", "ylabel": "ROI (%)", "fmt": "pct", "hline": 0.0,
+            "lines": [("roi_pct", "roi", "Portfolio ROI", False)],
+            "fills": [{"a": "roi_pct", "b": 0.0, "pos": "positive_fill", "neg": "negative_fill", "alpha": 0.15}]},
+    "equity": {"title": "2. Portfolio Equity Curve", "ylabel": "Portfolio Value (USD)", "fmt": "usd",
+               "lines": [("value_usd", "value", "Portfolio Value", False)],
+               "fills": [{"a": "value_usd", "b": 0.0, "pos": "value", "neg": "value", "alpha": 0.1}]},
+    "value_vs_cost": {"title": "3. Portfolio Value vs. Cumulative Cost", "ylabel": "Amount (USD)", "fmt": "usd",
+                      "lines": [("value_usd", "value", "Portfolio Value", False),
+                                ("invest_cum", "cost", "Cumulative Cost", False)],
+                      "fills": [{"a": "value_usd", "b": "invest_cum", "pos": "positive_fill", "neg": "negative_fill",
+                                 "alpha": 0.25}]},
+    "daily_investment": {"title": "4. Daily Investment Amount", "ylabel": "Investment (USD)", "fmt": "usd2",
+                         "lines": [("buy_usd", "cost", "Daily Investment", False)], "fills": []},
+    "btc_accumulation": {"title": "5. BTC Accumulation Over Time", "ylabel": "BTC Amount", "fmt": "btc",
+                         "lines": [("hold_btc_cum", "roi", "BTC Holdings", False)],
+                         "fills": [{"a": "hold_btc_cum", "b": 0.0, "pos": "roi", "neg": "roi", "alpha": 0.15}]},
+    "avg_cost_vs_price": {"title": "6. BTC Price vs. Average Cost", "ylabel": "Price (USD)", "fmt": "usd",
+                          "lines": [("price_usd", "value", "BTC Price", False), ("avg_cost", "cost", "Average Cost", False)],
+                          "fills": [{"a": "price_usd", "b": "avg_cost", "pos": "positive_fill", "neg": "negative_fill",
+                                     "alpha": 0.2}]},
+    "strategy_comparison": {"title": "7. Strategy Comparison: Smart vs Regular DCA", "ylabel": "ROI (%)", "fmt": "pct",
+                            "hline": 0.0,
+                            "lines": [("roi_pct", "roi", "Smart DCA (AHR999)", False),
+                                      ("regular_roi_pct", "cost", "Regular DCA (Fixed)", True)],
+                            "fills": [{"a": "roi_pct", "b": "regular_roi_pct", "pos": "positive_fill",
+                                       "neg": "negative_fill", "alpha": 0.15}]},
+}
+
+_HTML_DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>DCA Investment Dashboard - AHR999 Strategy</title>
+<style>
+body{margin:0;padding:24px;background:@FIGURE@;color:@TEXT@;font-family:"DejaVu Sans",-apple-system,"Segoe UI",Roboto,sans-serif}
+h1{text-align:center;margin:0 0 12px;font-size:26px;color:@TITLE@}
+.stats{display:flex;justify-content:space-around;flex-wrap:wrap;border-top:1px solid #8884;border-bottom:1px solid #8884;padding:8px 0;margin-bottom:18px}
+.stat{text-align:center;min-width:150px;margin:4px}.stat b{display:block;font-size:15px}.stat span{display:block;font-size:13px}.stat small{opacity:.8}
+.grid{display:grid;grid-template-columns:1fr 1fr;gap:18px}
+.panel{background:@AXES@;border:1px solid @EDGE@;border-radius:6px;padding:10px 12px;position:relative}
+.panel.wide{grid-column:1/3}.panel h2{font-size:16px;margin:0 0 4px;color:@TITLE@}
+.legend{font-size:12px;margin-bottom:4px}.legend i{display:inline-block;width:14px;height:3px;margin:0 4px 3px 10px;vertical-align:middle}
+svg{width:100%;height:auto;display:block;font-size:11px}svg text{fill:@TICK@}
+.tip{position:absolute;pointer-events:none;background:@AXES@;border:1px solid @EDGE@;border-radius:4px;padding:4px 6px;font-size:12px;display:none;white-space:nowrap;box-shadow:0 1px 4px #0003}
+footer{text-align:center;font-size:11px;opacity:.6;margin-top:14px}
+@media (max-width:900px){.grid{grid-template-columns:1fr}.panel.wide{grid-column:auto}}
+</style></head><body>
+<h1>DCA Investment Dashboard - AHR999 Strategy</h1>
+@STATS@
+<div class="grid" id="panels"></div>
+<footer>@FOOTER@</footer>
+<script>
+(function(){
+var D=@DATA@,NS="http://www.w3.org/2000/svg",MS=864e5,C=D.colors,P=D.palette;
+function dec(e){var p=e.d.split(","),k=Math.pow(10,e.decimals),a=0,o=new Array(p.length);for(var i=0;i<p.length;i++){a+=+p[i];o[i]=a/k;}return o;}
+var X=dec(D.days),S={},n=X.length;for(var c in D.series)S[c]=dec(D.series[c]);
+function day(d){return new Date(d*MS).toISOString().slice(0,10);}
+function money(v,dp){return(v<0?"-$":"$")+Math.abs(v).toLocaleString("en-US",{minimumFractionDigits:dp,maximumFractionDigits:dp});}
+var F={pct:function(v,t){return v.toFixed(t?2:0)+"%";},usd:function(v,t){return money(v,t?2:0);},usd2:function(v){return money(v,2);},btc:function(v){return v.toFixed(6);}};
+function el(t,a,p){var e=document.createElementNS(NS,t);for(var k in a)e.setAttribute(k,a[k]);if(p)p.appendChild(e);return e;}
+function ticks(lo,hi,m){var s=Math.pow(10,Math.floor(Math.log10((hi-lo)/m))),r=(hi-lo)/m/s,t=[];s*=r>5?10:r>2?5:r>1?2:1;for(var v=Math.ceil(lo/s)*s;v<=hi+s*1e-9;v+=s)t.push(v);return t;}
+function months(a,b){var d0=new Date(a*MS),d1=new Date(b*MS),m0=d0.getUTCFullYear()*12+d0.getUTCMonth()+1,m1=d1.getUTCFullYear()*12+d1.getUTCMonth(),st=[1,2,3,6,12,24,60,120,240,600,1200,2400,6000,12000],s=1,t=[];
+for(var i=0;i<st.length&&(s=st[i])&&(m1-m0+1)/s>8;i++);for(var m=Math.ceil(m0/s)*s;m<=m1;m+=s)t.push([Date.UTC(Math.floor(m/12),m%12,1)/MS,Math.floor(m/12)+"-"+("0"+(m%12+1)).slice(-2)]);
+return t.length>1?t:[[a,day(a)],[b,day(b)]];}
+function near(d){var lo=0,hi=n-1;while(hi-lo>1){var mid=(lo+hi)>>1;if(X[mid]<d)lo=mid;else hi=mid;}return d-X[lo]<X[hi]-d?lo:hi;}
+function panel(Q,grid){
+var W=Q.wide?1240:610,H=300,L=78,R=14,T=10,B=30,pw=W-L-R,ph=H-T-B,box=document.createElement("div");
+box.className="panel"+(Q.wide?" wide":"");box.innerHTML="<h2></h2><div class=legend></div>";box.firstChild.textContent=Q.title;grid.appendChild(box);
+var leg=box.lastChild;Q.lines.forEach(function(l){leg.insertAdjacentHTML("beforeend","<i style='background:"+P[l[1]]+"'></i>");leg.appendChild(document.createTextNode(l[2]));});
+if(Q.hline_label){leg.insertAdjacentHTML("beforeend","<i style='background:grey'></i>");leg.appendChild(document.createTextNode(Q.hline_label));}
+var lo=Infinity,hi=-Infinity;function span(v){if(isFinite(v)){if(v<lo)lo=v;if(v>hi)hi=v;}}
+Q.lines.forEach(function(l){S[l[0]].forEach(span);});Q.fills.forEach(function(f){if(typeof f.b==="number")span(f.b);});if(Q.hline!=null)span(Q.hline);
+if(!(hi>lo)){lo-=1;hi+=1;}var pad=(hi-lo)*.05;lo-=pad;hi+=pad;
+var x0=X[0],x1=X[n-1]>x0?X[n-1]:x0+1,sx=function(d){return L+(d-x0)/(x1-x0)*pw;},sy=function(v){return T+(hi-v)/(hi-lo)*ph;};
+var svg=el("svg",{viewBox:"0 0 "+W+" "+H},box);
+ticks(lo,hi,5).forEach(function(v){el("line",{x1:L,x2:L+pw,y1:sy(v),y2:sy(v),stroke:C.grid},svg);el("text",{x:L-6,y:sy(v)+4,"text-anchor":"end"},svg).textContent=F[Q.fmt](v);});
+months(x0,X[n-1]).forEach(function(t){el("line",{x1:sx(t[0]),x2:sx(t[0]),y1:T,y2:T+ph,stroke:C.grid},svg);el("text",{x:sx(t[0]),y:T+ph+16,"text-anchor":"middle"},svg).textContent=t[1];});
+el("text",{x:14,y:T+ph/2,"text-anchor":"middle",transform:"rotate(-90 14 "+(T+ph/2)+")"},svg).textContent=Q.ylabel;
+el("text",{x:L+pw/2,y:T+ph/2,"text-anchor":"middle","font-size":20,opacity:.15,transform:"rotate(-30 "+(L+pw/2)+" "+(T+ph/2)+")"},svg).textContent="Github @xunyoyo";
+Q.fills.forEach(function(f){var a=S[f.a],b=typeof f.b==="number"?null:S[f.b],run=[],sg=null;
+function bv(i){return b?b[i]:f.b;}
+function flush(){if(run.length>1){var p=run.map(function(r){return r[0]+","+r[1];});for(var k=run.length-1;k>=0;k--)p.push(run[k][0]+","+run[k][2]);el("polygon",{points:p.join(" "),fill:P[sg?f.pos:f.neg],"fill-opacity":f.alpha},svg);}}
+for(var i=0;i<n;i++){var dd=a[i]-bv(i),s=dd>=0;if(sg!==null&&s!==sg){var d0=a[i-1]-bv(i-1),t=d0/(d0-dd),cx=sx(X[i-1]+t*(X[i]-X[i-1])),cy=sy(a[i-1]+t*(a[i]-a[i-1]));run.push([cx,cy,cy]);flush();run=[[cx,cy,cy]];}
+sg=s;run.push([sx(X[i]),sy(a[i]),sy(bv(i))]);}flush();});
+if(Q.hline!=null)el("line",{x1:L,x2:L+pw,y1:sy(Q.hline),y2:sy(Q.hline),stroke:"grey","stroke-dasharray":"6 4","stroke-opacity":.6},svg);
+Q.lines.forEach(function(l){var y=S[l[0]],d="";for(var i=0;i<n;i++)d+=(i?"L":"M")+sx(X[i]).toFixed(1)+" "+sy(y[i]).toFixed(1);
+var a={d:d,fill:"none",stroke:P[l[1]],"stroke-width":2.2,"stroke-linejoin":"round"};if(l[3])a["stroke-dasharray"]="8 5";el("path",a,svg);});
+el("rect",{x:L,y:T,width:pw,height:ph,fill:"none",stroke:C.edge},svg);
+var cross=el("line",{y1:T,y2:T+ph,stroke:C.tick,"stroke-opacity":.4,visibility:"hidden"},svg),dots=Q.lines.map(function(l){return el("circle",{r:4,fill:P[l[1]],stroke:"white",visibility:"hidden"},svg);}),tip=document.createElement("div");
+tip.className="tip";box.appendChild(tip);
+svg.addEventListener("mousemove",function(ev){var r=svg.getBoundingClientRect(),px=(ev.clientX-r.left)*W/r.width,i=near(x0+(px-L)/pw*(x1-x0)),x=sx(X[i]),h="<b>"+day(X[i])+"</b>";
+cross.setAttribute("x1",x);cross.setAttribute("x2",x);cross.setAttribute("visibility","visible");
+Q.lines.forEach(function(l,k){dots[k].setAttribute("cx",x);dots[k].setAttribute("cy",sy(S[l[0]][i]));dots[k].setAttribute("visibility","visible");h+="<br>"+l[2]+": "+F[Q.fmt](S[l[0]][i],1);});
+tip.innerHTML=h;tip.style.display="block";var bx=box.getBoundingClientRect();tip.style.left=Math.min(ev.clientX-bx.left+14,bx.width-tip.offsetWidth-6)+"px";tip.style.top=(ev.clientY-bx.top+14)+"px";});
+svg.addEventListener("mouseleave",function(){tip.style.display="none";cross.setAttribute("visibility","hidden");dots.forEach(function(d){d.setAttribute("visibility","hidden");});});}
+var grid=document.getElementById("panels");D.panels.forEach(function(Q){panel(Q,grid);});
+})();
+</script></body></html>
+"""
+
+
+def _delta_encode(values, digits: int = None) -> dict:
+    """``{"decimals": k, "d": "v0,d1,d2,..."}`` where the running sum of ``d`` divided by ``10**k`` gives ``values``.
+
+    ``k`` keeps ``digits`` significant digits of the largest magnitude; ``digits=None``
+    keeps integers as they are. Non-finite values are written as 0.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    values = np.where(finite, values, 0.0)
+    peak = float(np.max(np.abs(values))) if len(values) else 0.0
+    decimals = 0
+    if digits is not None and peak > 0:
+        decimals = int(np.clip(digits - 1 - math.floor(math.log10(peak)), -300, 12))
+    ints = np.round(values * 10.0 ** decimals).astype(np.int64)
+    return {"decimals": decimals, "d": ",".join(map(str, np.diff(ints, prepend=0).tolist()))}
+
+
+def _html_point_indices(days: np.ndarray, df: dict, points: int) -> np.ndarray:
+    """Union of every plotted column's LTTB points, so all series share one x axis."""
+    columns = np.nan_to_num(np.vstack([np.asarray(df[column], dtype=float) for column in DASHBOARD_SERIES]))
+    return np.unique(lttb_indices(days.astype(float), columns, points))
+
+
+def _html_stats_strip(stats: dict, palette: dict) -> str:
+    """The PNG's stats header as HTML, with the same numbers and formats."""
+    profit_color = palette['value'] if stats['total_profit'] >= 0 else palette['negative_fill']
+    adv_color = palette['value'] if stats['strategy_advantage'] >= 0 else palette['negative_fill']
+    cells = [
+        ('Investment:', palette['roi'], f"${stats['total_invested']:,.2f}", f"{stats['invest_days']} days", None),
+        ('Holdings:', palette['roi'], f"{stats['total_btc']:.6f} BTC", f"${stats['current_value']:,.2f}", None),
+        ('Performance:', profit_color, f"{stats['roi_pct']:+.2f}% ROI", f"${stats['total_profit']:+,.2f}", profit_color),
+        ('Price:', palette['cost'], f"${stats['current_price']:,.0f}", f"Avg: ${stats['avg_cost']:,.0f}", None),
+        ('vs Regular DCA:', palette['roi'], f"{stats['roi_pct']:.2f}% vs {stats['regular_roi']:.2f}%",
+         f"{stats['strategy_advantage']:+.2f}% ({stats['profit_advantage']:+,.0f})", adv_color),
+    ]
+    parts = []
+    for label, color, value, detail, detail_color in cells:
+        style = f' style="color:{detail_color}"' if detail_color else ''
+        parts.append(f'<div class="stat"><b style="color:{color}">{html.escape(label)}</b>'
+                     f'<span>{html.escape(value)}</span><small{style}>{html.escape(detail)}</small></div>')
+    return '<div class="stats">' + "".join(parts) + '</div>'
+
+
+def generate_dashboard_html(log_df, theme_key=None, state: dict = None, output: str = DASHBOARD_HTML_OUTPUT,
+                            points: int = HTML_POINTS_PER_SERIES):
+    """Write the dashboard as one self-contained HTML/SVG page and return a short report.
+
+    Takes the same inputs as ``generate_dashboard_charts`` and, like it,
+    returns ``None`` when there is nothing to draw. No plotting library is
+    loaded; the browser draws the panels from the embedded series.
+    """
+    if log_df is None or len(log_df) == 0:
+        print("⚠️ No data to generate charts.")
+        return
+
+    try:
+        started = time.perf_counter()
+        df = _dashboard_columns(log_df)
+        if not len(df['date']):
+            print("⚠️ No investment data yet. Charts will be generated after first trade.")
+            return
+        df = _prepare_dashboard_frame(df)
+
+        theme_key, theme_config = _resolve_chart_theme(theme_key)
+        palette, rc = theme_config['palette'], theme_config.get("rc", {})
+        if state is None:
+            state = portfolio_state_from_log(log_df)
+        header = {key: state[key] for key in ('total_invested', 'total_btc', 'invest_days', 'sum_inv_price')}
+        header['current_price'] = float(df['price_usd'][-1])
+        stats = _dashboard_header_stats(header, df)
+
+        days = df['date'].astype('int64')
+        keep = _html_point_indices(days, df, points)
+        baseline = float(np.median(df['buy_usd']))
+        spans = {name: span for name, _, _, _, span, _ in DASHBOARD_PANELS}
+        panels = []
+        for name, spec in HTML_PANELS.items():
+            panel = {**spec, "wide": spans.get(name, 1) > 1}
+            if name == "daily_investment":  # baseline reference, as in _plot_daily_investment
+                panel.update(hline=baseline, hline_label=f"Baseline (${baseline:.2f})",
+                             fills=[{"a": "buy_usd", "b": baseline, "pos": "cost", "neg": "negative_fill", "alpha": 0.15}])
+            panels.append(panel)
+        payload = {
+            "days": _delta_encode(days[keep]),
+            "series": {column: _delta_encode(np.asarray(df[column])[keep], HTML_SERIES_DIGITS) for column in DASHBOARD_SERIES},
+            "panels": panels,
+            "palette": palette,
+            "colors": {"grid": rc.get("grid.color", "#E5E7EB"), "edge": rc.get("axes.edgecolor", "#CBD5F5"),
+                       "tick": rc.get("xtick.color", "#334155")},
+        }
+        figure_face = theme_config.get("figure_facecolor", "white")
+        footer = (f"{len(days)} invested day(s) from {df['date'][0]} to {df['date'][-1]}, {len(keep)} points shown · "
+                  f"theme {theme_key} · generated {utc_now().strftime('%Y-%m-%d %H:%M')} UTC")
+        replacements = {
+            "@FIGURE@": figure_face,
+            "@AXES@": theme_config.get("axes_facecolor", figure_face),
+            "@TEXT@": rc.get("axes.labelcolor", "#1E293B"),
+            "@TITLE@": rc.get("axes.titlecolor", rc.get("axes.labelcolor", "#1E293B")),
+            "@TICK@": rc.get("xtick.color", "#334155"),
+            "@EDGE@": rc.get("axes.edgecolor", "#CBD5F5"),
+            "@STATS@": _html_stats_strip(stats, palette),
+            "@FOOTER@": html.escape(footer),
+            "@DATA@": json.dumps(payload, separators=(",", ":")).replace("</", "<\\/"),
+        }
+        page = _HTML_DASHBOARD_TEMPLATE
+        for token, value in replacements.items():
+            page = page.replace(token, value)
+        encoded = page.encode("utf-8")
+        tmp_path = output + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(encoded)
+        os.replace(tmp_path, output)
+
+        report = {"output": output, "theme": theme_key, "format": "html", "rows": int(len(days)),
+                  "points": int(len(keep)), "bytes": len(encoded), "total": round(time.perf_counter() - started, 4)}
+        print(f"✅ HTML dashboard generated ({theme_key}, {report['points']} of {report['rows']} points, "
+              f"{report['bytes'] / 1024:.1f} KB) in {report['total'] * 1000:.0f} ms: {output}")
+        return report
+
+    except Exception as e:
+        print(f"Could not generate HTML dashboard: {e}")
+
+
+def calculate_portfolio_summary(log_df, current_price: float) -> str:
+    """Markdown summary from a portfolio state dict, or from log records / a log frame (rebuilt on the fly)."""
+    if log_df is None or (not isinstance(log_df, dict) and len(log_df) == 0): return "### 📊 Portfolio Summary\n- No trading history found yet."
     try:
-        total_invested_usd=log_df['buy_usd'].sum(); total_holdings_btc=log_df['buy_btc'].sum()
+        state=log_df if isinstance(log_df, dict) else portfolio_state_from_log(log_df)
+        total_invested_usd=state['total_invested']; total_holdings_btc=state['total_btc']
         if total_invested_usd <= 0 or total_holdings_btc <= 0: return "### 📊 Portfolio Summary\n- No valid investment recorded."
         current_value_usd=total_holdings_btc*current_price; average_buy_price=total_invested_usd/total_holdings_btc
         profit_loss_usd=current_value_usd-total_invested_usd; roi_percentage=(profit_loss_usd/total_invested_usd)*100
@@ -558,7 +1519,8 @@ def calculate_portfolio_summary(log_df: pd.DataFrame, current_price: float) -> s
         return (f"### 📊 Portfolio Summary\n"+f"- **Total Invested:** `${total_invested_usd:,.2f}`\n"
                 +f"- **Total Holdings:** `{total_holdings_btc:.8f}` BTC\n"+f"- **Current Value:** `${current_value_usd:,.2f}`\n"
                 +f"- **Avg. Buy Price:** `${average_buy_price:,.2f}`\n"+f"- **Total P/L:** {pl_emoji} `{pl_sign}${profit_loss_usd:,.2f}`\n"
-                +f"- **ROI:** `{pl_sign}{roi_percentage:.2f}%`")
+                +f"- **ROI:** `{pl_sign}{roi_percentage:.2f}%`\n"
+                +f"- **Drawdown:** `{state['drawdown'] * 100:.2f}%` (max `{state['max_drawdown'] * 100:.2f}%`, {state['days']} days)")
     except Exception as e: return f"### 📊 Portfolio Summary\n- Error calculating summary: {e}"
 
 # ==============================================================================
@@ -572,22 +1534,13 @@ def calculate_portfolio_summary(log_df: pd.DataFrame, current_price: float) -> s
 # whole run before any price is even read. We can't fix ccxt internals or the
 # exchange feed, so we (1) retry, and (2) fall back to OKX's public candles REST
 # endpoint, which needs no market metadata at all.
-OKX_PUBLIC_CANDLES_URL = "https://www.okx.com/api/v5/market/candles"
+# ``DCA_OKX_REST_BASE`` points the public endpoints elsewhere, e.g. at ``mock_okx.py``.
+OKX_REST_BASE = os.getenv("DCA_OKX_REST_BASE", "https://www.okx.com").rstrip("/")
+OKX_PUBLIC_CANDLES_URL = f"{OKX_REST_BASE}/api/v5/market/candles"
 
 
-def _okx_public_candles(symbol: str, limit: int = 250, bar: str = "1Dutc") -> list:
-    """Fetch OHLCV candles directly from OKX's public REST API.
-
-    Returns rows as ``[ts, open, high, low, close, volume]`` sorted oldest-first,
-    matching the contract of ``ccxt.fetch_ohlcv`` so the rest of the pipeline is
-    unchanged. Rows that cannot be parsed into numbers are skipped rather than
-    poisoning the dataset.
-    """
-    inst_id = symbol.replace("/", "-")
-    params = {"instId": inst_id, "bar": bar, "limit": str(limit)}
-    response = requests.get(OKX_PUBLIC_CANDLES_URL, params=params, timeout=20)
-    response.raise_for_status()
-    payload = response.json()
+def _parse_okx_candles(payload: dict) -> list:
+    """Turn an OKX candles response into ``[ts, o, h, l, c, v]`` rows, oldest-first."""
     if str(payload.get("code")) != "0":
         raise ValueError(f"OKX candles API error: code={payload.get('code')} msg={payload.get('msg')}")
     raw = payload.get("data") or []
@@ -607,129 +1560,2035 @@ def _okx_public_candles(symbol: str, limit: int = 250, bar: str = "1Dutc") -> li
     return rows
 
 
-def fetch_ohlcv_resilient(exchange, symbol: str, timeframe: str = "1d", limit: int = 250, retries: int = 3) -> list:
-    """Fetch OHLCV via ccxt, retrying then falling back to OKX's public REST API.
+def _okx_public_candles(symbol: str, limit: int = 250, bar: str = "1Dutc", before: int = None) -> list:
+    """Fetch OHLCV candles directly from OKX's public REST API.
 
-    Any ccxt failure — including the ``None``-vs-``str`` ``TypeError`` raised by
-    ``load_markets()`` when the exchange feed has a malformed entry — triggers a
-    short retry loop and, ultimately, a direct public-API fetch so a transient
-    metadata glitch never blocks the daily price read.
+    Returns rows as ``[ts, open, high, low, close, volume]`` sorted oldest-first,
+    matching the contract of ``ccxt.fetch_ohlcv`` so the rest of the pipeline is
+    unchanged. Rows that cannot be parsed into numbers are skipped rather than
+    poisoning the dataset. ``before`` (ms) limits the result to candles newer
+    than that timestamp, which is how the cache tops itself up.
     """
-    last_error = None
+    inst_id = symbol.replace("/", "-")
+    params = {"instId": inst_id, "bar": bar, "limit": str(limit)}
+    if before is not None:
+        params["before"] = str(int(before))
+    response = requests.get(OKX_PUBLIC_CANDLES_URL, params=params, timeout=20)
+    response.raise_for_status()
+    return _parse_okx_candles(response.json())
+
+
+# Hedged fetch: instead of waiting out every ccxt retry before trying REST, the
+# REST request is started ``HEDGE_DELAY`` seconds after ccxt (0 = both at once;
+# ``DCA_HEDGE_DELAY=off`` restores the strictly sequential fallback). The first
+# response that passes ``_ohlcv_problem`` wins and the other source is told to
+# stop. A ccxt request already on the wire cannot be interrupted, so the ccxt
+# side races on its own public instance and the caller's (keyed) instance is
+# never shared with a thread that may still be running. Each fetch appends the winner and per-source latency to
+# ``FETCH_STATS_FILE``; ``python trade_bot.py fetch-stats`` summarises it.
+_hedge_env = os.getenv("DCA_HEDGE_DELAY", "2.0").strip().lower()
+HEDGE_DELAY = None if _hedge_env in ("", "off", "none") else float(_hedge_env)
+FETCH_STATS_FILE = os.path.join(os.getenv("DCA_CACHE_DIR", ".cache"), "fetch_latency.jsonl")
+
+
+class FetchCancelled(Exception):
+    """Raised inside a hedged source once the other source has already won."""
+
+
+def _ohlcv_problem(data, min_rows: int):
+    """Why ``data`` is not a usable candle list, or ``None`` if it is."""
+    if not isinstance(data, list):
+        return f"unexpected payload type {type(data)}"
+    if len(data) < min_rows:
+        return f"{len(data)} rows"
+    if any(not (hasattr(row, "__len__") and len(row) >= 6) for row in data):
+        return "malformed rows"
+    return None
+
+
+def _fetch_ohlcv_ccxt(exchange, symbol: str, timeframe: str, limit: int, retries: int,
+                      since: int = None, min_rows: int = 200, cancel: threading.Event = None) -> list:
+    """ccxt ``fetch_ohlcv`` with retries; raises the last error when every attempt failed."""
+    last_error = ValueError("no ccxt attempts made")
     for attempt in range(retries):
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled("ccxt fetch cancelled")
         try:
-            data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            if isinstance(data, list) and len(data) >= 200:
+            data = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            problem = _ohlcv_problem(data, min_rows)
+            if problem is None:
                 return data
-            last_error = ValueError(
-                f"fetch_ohlcv returned {len(data) if isinstance(data, list) else type(data)} rows"
-            )
+            last_error = ValueError(f"fetch_ohlcv returned {problem}")
             print(f"⚠️ ccxt fetch_ohlcv attempt {attempt + 1}/{retries} returned insufficient data: {last_error}")
         except Exception as e:  # noqa: BLE001 - includes the None<str TypeError from load_markets()
             last_error = e
             print(f"⚠️ ccxt fetch_ohlcv attempt {attempt + 1}/{retries} failed: {e}")
         if attempt < retries - 1:
-            time.sleep(2 ** attempt)
-    print(f"⚠️ Falling back to OKX public candles API after ccxt failures (last error: {last_error}).")
-    bar = "1Dutc" if timeframe == "1d" else timeframe
-    return _okx_public_candles(symbol, limit=limit, bar=bar)
+            METRICS.count("retry", op="fetch_ohlcv")
+            if sleep(2 ** attempt, cancel):
+                raise FetchCancelled("ccxt fetch cancelled")
+    raise last_error
 
 
-def ensure_markets_loaded(exchange, retries: int = 3) -> None:
-    """Load ccxt markets with retries, forcing a fresh reload after the first try.
+def _record_fetch_stats(record: dict, path: str = None) -> None:
+    path = path or FETCH_STATS_FILE
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not record fetch latency: {e}")
 
-    Order placement requires ccxt market metadata. Because the ``None``-key sort
-    failure in ``load_markets()`` is driven by transient exchange data, reloading
-    a moment later usually succeeds; we surface the error only if it persists.
+
+def _hedge_exchange(exchange):
+    """A keyless instance of ``exchange``'s class for the ccxt side of the race.
+
+    A losing ccxt fetch is abandoned on its worker thread, and a sync ccxt
+    instance is not thread-safe, so it must not be the one the caller goes on
+    to place orders with. Market metadata already loaded on ``exchange`` is
+    shared so the public instance does not download the market list.
     """
-    last_error = None
-    for attempt in range(retries):
-        try:
-            exchange.load_markets(reload=(attempt > 0))
-            return
-        except Exception as e:  # noqa: BLE001
-            last_error = e
-            print(f"⚠️ load_markets attempt {attempt + 1}/{retries} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
-    raise last_error
+    public = getattr(_load_ccxt(), exchange.id)({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
+    if public is not exchange and getattr(exchange, "markets", None):
+        public.set_markets(list(exchange.markets.values()))
+    return public
 
 
-# ==============================================================================
-# SECTION 3: CORE LOGIC
-# ==============================================================================
-def index_growth_estimate(age_days: int) -> float:
-    age_days=max(1, age_days); return 10**(5.84*math.log10(age_days)-17.01)
-def calculate_continuous_multiplier(x: float) -> float:
-    if not math.isfinite(x) or x <= 0: return 1.0
-    if x < NEUTRAL_X: return 1.0 + ALPHA * math.log(NEUTRAL_X/x)
-    else: return max(0.0, 1.0 - BETA * math.log1p(x-NEUTRAL_X))
-def _harmonic_mean(values: np.ndarray) -> float:
-    """Return the harmonic mean of positive, finite values.
+def _fetch_ohlcv_hedged(exchange, symbol: str, timeframe: str, limit: int, retries: int,
+                        since: int = None, min_rows: int = 200, hedge_delay: float = 0.0) -> list:
+    """Race ccxt against OKX public REST, the latter starting ``hedge_delay`` seconds later.
 
-    The original implementation used ``200/(1/x).sum()`` which worked for
-    strictly-positive data but collapsed to zero or ``nan`` when a zero or
-    invalid value slipped into the window. That behaviour propagated downstream
-    and broke the AHR999 index calculation. We explicitly ignore non-positive or
-    non-finite entries so a single bad tick does not poison the rolling mean.
+    The ccxt side runs on its own public instance (see ``_hedge_exchange``).
     """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    exchange = _hedge_exchange(exchange)
+    bar = "1Dutc" if timeframe == "1d" else timeframe
+    cancel = threading.Event()
+    started = time.perf_counter()
+    timings = {}
 
-    arr=np.asarray(values, dtype=float)
-    mask=np.isfinite(arr) & (arr>0)
-    if not mask.any():
-        return np.nan
-    reciprocal_sum=np.sum(1.0/arr[mask])
-    if reciprocal_sum==0:
-        return np.nan
-    return mask.sum()/reciprocal_sum
+    def timed(source, fetch):
+        source_started = time.perf_counter()
+        timings[source] = {"started": round(source_started - started, 3)}
+        try:
+            data = fetch()
+            problem = _ohlcv_problem(data, min_rows)
+            if problem is not None:
+                raise ValueError(f"{source} returned {problem}")
+            return data
+        finally:
+            timings[source]["seconds"] = round(time.perf_counter() - source_started, 3)
 
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ohlcv-hedge")
+    futures = {pool.submit(timed, "ccxt", lambda: _fetch_ohlcv_ccxt(exchange, symbol, timeframe, limit, retries,
+                                                                    since, min_rows, cancel)): "ccxt"}
+    winner, result, errors = None, None, {}
+    try:
+        pending = set(futures)
+        wait(pending, timeout=max(0.0, hedge_delay))
+        while winner is None:
+            for future in [f for f in pending if f.done()]:
+                pending.discard(future)
+                try:
+                    result, winner = future.result(), futures[future]
+                    break
+                except Exception as e:  # noqa: BLE001
+                    errors[futures[future]] = str(e)
+            if winner is not None:
+                break
+            if "rest" not in futures.values():
+                METRICS.count("fallback", kind="hedge_rest")
+                print(f"⚠️ Hedging to OKX public candles API after {time.perf_counter() - started:.2f}s.")
+                rest = pool.submit(timed, "rest", lambda: _okx_public_candles(
+                    symbol, limit=limit, bar=bar, before=None if since is None else since - 1))
+                futures[rest] = "rest"
+                pending.add(rest)
+            if not pending:
+                raise ValueError(f"Both candle sources failed: {errors}")
+            wait(pending, return_when=FIRST_COMPLETED)
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        wall = time.perf_counter() - started
+        latency = {}
+        for source in ("ccxt", "rest"):
+            info = dict(timings.get(source, {}))
+            if source == winner:
+                info["status"] = "won"
+            elif source in errors:
+                info["status"] = "failed"
+            elif info:
+                info["status"] = "cancelled"
+                info.setdefault("seconds", round(wall - info["started"], 3))  # lower bound, still running
+            else:
+                info["status"] = "not_started"
+            latency[source] = info
+            if "seconds" in info:
+                METRICS.add_time("candle_fetch", info["seconds"], source=source)
+        _record_fetch_stats({"time": utc_now().isoformat(timespec="seconds"),
+                             "symbol": symbol, "timeframe": timeframe, "hedge_delay": hedge_delay,
+                             "winner": winner, "wall": round(wall, 3), "latency": latency, "errors": errors})
+    print(f"📡 Candles from {winner} in {wall:.2f}s (hedge delay {hedge_delay:g}s).")
+    return result
 
-def get_today_investment_amount(historical_df: pd.DataFrame, baseline: float) -> dict:
-    if "price" not in historical_df.columns:
-        print("⚠️ historical_df missing 'price' column.")
-        return {"investment_usd": np.nan, "price_today": np.nan, "ahr999_index": np.nan}
 
-    prices=pd.to_numeric(historical_df["price"], errors="coerce")
-    valid_prices=prices.dropna()
-    if valid_prices.empty:
-        print("⚠️ No valid numeric price data after coercion.")
-        return {"investment_usd": np.nan, "price_today": np.nan, "ahr999_index": np.nan}
+def _fetch_ohlcv_network(exchange, symbol: str, timeframe: str, limit: int, retries: int,
+                         since: int = None, min_rows: int = 200, hedge_delay: float = None) -> list:
+    bar = "1Dutc" if timeframe == "1d" else timeframe
+    if exchange is None:
+        # Decision-only and offline callers pass no exchange: go straight to REST.
+        with METRICS.span("candle_fetch", source="rest"):
+            return _okx_public_candles(symbol, limit=limit, bar=bar, before=None if since is None else since - 1)
+    if hedge_delay is not None:
+        return _fetch_ohlcv_hedged(exchange, symbol, timeframe, limit, retries, since, min_rows, hedge_delay)
+    try:
+        with METRICS.span("candle_fetch", source="ccxt"):
+            return _fetch_ohlcv_ccxt(exchange, symbol, timeframe, limit, retries, since, min_rows)
+    except Exception as e:  # noqa: BLE001
+        print(f"⚠️ Falling back to OKX public candles API after ccxt failures (last error: {e}).")
+    METRICS.count("fallback", kind="rest_candles")
+    with METRICS.span("candle_fetch", source="rest"):
+        return _okx_public_candles(symbol, limit=limit, bar=bar, before=None if since is None else since - 1)
+
+
+def fetch_latency_summary(path: str = None) -> dict:
+    """Win counts and latency percentiles per source from ``FETCH_STATS_FILE``."""
+    records = []
+    with contextlib.suppress(FileNotFoundError):
+        with open(path or FETCH_STATS_FILE, "r", encoding="utf-8") as fh:
+            records = [json.loads(line) for line in fh if line.strip()]
+    summary = {"fetches": len(records)}
+    for source in ("ccxt", "rest"):
+        finished = [r["latency"][source]["seconds"] for r in records
+                    if r["latency"].get(source, {}).get("status") in ("won", "failed")]
+        summary[source] = {
+            "wins": sum(r["winner"] == source for r in records),
+            "finished": len(finished),
+            "p50": float(np.percentile(finished, 50)) if finished else None,
+            "p90": float(np.percentile(finished, 90)) if finished else None,
+        }
+    return summary
+
+
+# ------------------------------------------------------------------------------
+# Local candle cache
+# ------------------------------------------------------------------------------
+# Yesterday's run already downloaded all but the newest candle, so the daily run
+# keeps an ``.npz`` per (symbol, timeframe) with one array per column and only
+# asks the exchange for candles from the last cached ones onwards. The newest
+# cached candle may have been in progress when stored, so it is allowed to
+# change; the ones before it must match what the exchange returns now, otherwise
+# the cache is considered stale and rebuilt from a full fetch.
+OHLCV_CACHE_DIR = os.getenv("DCA_CACHE_DIR", ".cache")
+OHLCV_CACHE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+OHLCV_CACHE_OVERLAP = 2
+
+
+class CandleCacheMismatch(ValueError):
+    """Raised when freshly fetched candles disagree with the cached history."""
+
+
+def _ohlcv_cache_path(symbol: str, timeframe: str, cache_dir: str = None) -> str:
+    name = f"ohlcv_{symbol.replace('/', '-')}_{timeframe}.npz"
+    return os.path.join(cache_dir or OHLCV_CACHE_DIR, name)
+
+
+def load_cached_ohlcv(symbol: str, timeframe: str = "1d", cache_dir: str = None) -> list:
+    """Return cached candles as ``[ts, o, h, l, c, v]`` rows, or ``[]`` if there is no cache."""
+    path = _ohlcv_cache_path(symbol, timeframe, cache_dir)
+    try:
+        with np.load(path) as archive:
+            ts = archive["timestamp"].astype("int64")
+            values = np.column_stack([archive[c].astype(float) for c in OHLCV_CACHE_COLUMNS[1:]])
+    except FileNotFoundError:
+        return []
+    except Exception as e:  # noqa: BLE001 - a corrupt cache must never block a run
+        print(f"⚠️ Ignoring unreadable candle cache {path}: {e}")
+        return []
+    return [[int(t), *row] for t, row in zip(ts.tolist(), values.tolist())]
+
+
+def save_cached_ohlcv(symbol: str, timeframe: str, rows: list, cache_dir: str = None) -> str:
+    path = _ohlcv_cache_path(symbol, timeframe, cache_dir)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arr = np.asarray(rows, dtype=float).reshape(-1, 6)
+    columns = {"timestamp": arr[:, 0].astype("int64")}
+    columns.update({name: arr[:, i] for i, name in enumerate(OHLCV_CACHE_COLUMNS[1:], start=1)})
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        np.savez(fh, **columns)
+    os.replace(tmp_path, path)
+    return path
+
+
+def candles_stale(rows: list, timeframe: str = "1d", now: dt.datetime = None) -> bool:
+    """True when the newest candle is older than the previous bar, i.e. the newest bars are missing.
+
+    A top-up from a cache that is more than ``limit`` bars old returns the
+    ``limit`` candles *after* ``since`` and never reaches the present.
+    """
+    if not rows:
+        return True
+    bar_ms = bar_duration_ms("1Dutc" if timeframe == "1d" else timeframe)
+    now_ms = int((now or utc_now()).timestamp() * 1000)
+    return int(rows[-1][0]) < now_ms - 2 * bar_ms
+
+
+def merge_candles(cached: list, fresh: list, rtol: float = 1e-9) -> list:
+    """Splice ``fresh`` candles onto ``cached`` after checking their overlap.
+
+    ``fresh`` must start inside the cached range (otherwise there would be a
+    hole) and every overlapping candle except the newest cached one must agree
+    on OHLC. Fresh values win where both exist.
+    """
+    if not cached:
+        return sorted(fresh, key=lambda r: r[0])
+    if not fresh:
+        return cached
+    fresh = sorted(fresh, key=lambda r: r[0])
+    cached_by_ts = {int(r[0]): r for r in cached}
+    last_cached_ts = int(cached[-1][0])
+    if int(fresh[0][0]) > last_cached_ts:
+        raise CandleCacheMismatch(f"fresh candles start at {fresh[0][0]}, after the cached tail {last_cached_ts}")
+    for row in fresh:
+        ts = int(row[0])
+        old = cached_by_ts.get(ts)
+        if old is None or ts == last_cached_ts:
+            continue
+        if not np.allclose(old[1:5], row[1:5], rtol=rtol, atol=0.0):
+            raise CandleCacheMismatch(f"candle {ts} changed: cached {old[1:5]} vs fresh {row[1:5]}")
+    first_fresh_ts = int(fresh[0][0])
+    return [r for r in cached if int(r[0]) < first_fresh_ts] + [[int(r[0]), *map(float, r[1:6])] for r in fresh]
+
+
+def fetch_ohlcv_resilient(exchange, symbol: str, timeframe: str = "1d", limit: int = 250, retries: int = 3,
+                          use_cache: bool = True, offline: bool = False, cache_dir: str = None,
+                          hedge_delay: float = HEDGE_DELAY) -> list:
+    """Fetch OHLCV via ccxt, retrying then falling back to OKX's public REST API.
+
+    Any ccxt failure — including the ``None``-vs-``str`` ``TypeError`` raised by
+    ``load_markets()`` when the exchange feed has a malformed entry — triggers a
+    short retry loop and, ultimately, a direct public-API fetch so a transient
+    metadata glitch never blocks the daily price read.
+
+    With ``use_cache`` only candles newer than the local cache are downloaded;
+    ``offline`` serves the cache without touching the network at all.
+    ``hedge_delay`` races the REST endpoint against ccxt instead (``None``
+    keeps the sequential fallback).
+    """
+    cached = load_cached_ohlcv(symbol, timeframe, cache_dir) if (use_cache or offline) else []
+    if offline:
+        if not cached:
+            raise ValueError(f"Offline mode: no cached candles for {symbol} {timeframe}.")
+        print(f"📦 Offline mode: serving {min(limit, len(cached))} cached candles for {symbol}.")
+        METRICS.count("candle_cache", result="offline")
+        return cached[-limit:]
+
+    data = None
+    if cached and len(cached) > OHLCV_CACHE_OVERLAP:
+        since = int(cached[-OHLCV_CACHE_OVERLAP][0])
+        fresh = _fetch_ohlcv_network(exchange, symbol, timeframe, limit, retries, since=since, min_rows=1,
+                                     hedge_delay=hedge_delay)
+        try:
+            data = merge_candles(cached, fresh)
+            print(f"📦 Candle cache hit: {len(cached)} cached, {len(fresh)} fetched since {since}.")
+            METRICS.count("candle_cache", result="hit")
+        except CandleCacheMismatch as e:
+            print(f"⚠️ Candle cache inconsistent with exchange ({e}); refetching full history.")
+            METRICS.count("candle_cache", result="mismatch")
+        if data is not None and candles_stale(data, timeframe):
+            print(f"⚠️ Candle cache too old to top up (newest candle {int(data[-1][0])}); refetching latest candles.")
+            METRICS.count("candle_cache", result="stale")
+            data = None
+    if data is None:
+        if use_cache and not cached:
+            METRICS.count("candle_cache", result="miss")
+        data = _fetch_ohlcv_network(exchange, symbol, timeframe, limit, retries, hedge_delay=hedge_delay)
+        if use_cache:
+            data = merge_candles([], data)
+    if use_cache and data:
+        try:
+            save_cached_ohlcv(symbol, timeframe, data, cache_dir)
+        except OSError as e:
+            print(f"⚠️ Could not write candle cache: {e}")
+    return data[-limit:] if use_cache else data
+
+
+# ------------------------------------------------------------------------------
+# Deep history
+# ------------------------------------------------------------------------------
+# ``/market/candles`` only reaches back a few hundred bars. OKX serves older data
+# from ``/market/history-candles`` in pages of at most 100 bars, addressed by an
+# ``after`` cursor ("bars strictly older than this timestamp"). Because bars are
+# evenly spaced, every page cursor between the start and end date is known up
+# front, so pages are fetched concurrently and stitched back together.
+OKX_HISTORY_CANDLES_URL = f"{OKX_REST_BASE}/api/v5/market/history-candles"
+OKX_HISTORY_PAGE_LIMIT = 100
+_BAR_UNIT_MS = {"m": 60_000, "H": 3_600_000, "D": 86_400_000, "W": 604_800_000}
+
+
+def bar_duration_ms(bar: str) -> int:
+    """Length of an OKX bar such as ``1Dutc``, ``4H`` or ``15m`` in milliseconds."""
+    core = bar[:-3] if bar.endswith("utc") else bar
+    unit = core[-1]
+    if unit not in _BAR_UNIT_MS or not core[:-1].isdigit():
+        raise ValueError(f"Unsupported bar: {bar}")
+    return int(core[:-1]) * _BAR_UNIT_MS[unit]
+
+
+def _to_epoch_ms(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = dt.date.fromisoformat(value)
+    if isinstance(value, dt.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt.timezone.utc)
+        return int(value.timestamp() * 1000)
+    if isinstance(value, dt.date):
+        return int(dt.datetime(value.year, value.month, value.day, tzinfo=dt.timezone.utc).timestamp() * 1000)
+    raise TypeError(f"Cannot convert {value!r} to a timestamp")
+
+
+def find_candle_gaps(rows: list, bar_ms: int) -> list:
+    """Return ``(last_ts_before_gap, first_ts_after_gap)`` for every missing stretch of bars."""
+    if len(rows) < 2:
+        return []
+    ts = np.asarray([r[0] for r in rows], dtype="int64")
+    holes = np.nonzero(np.diff(ts) > bar_ms)[0]
+    return [(int(ts[i]), int(ts[i + 1])) for i in holes]
+
+
+def _fetch_history_page(session, url: str, inst_id: str, bar: str, after: int, limit: int, retries: int = 3) -> list:
+    params = {"instId": inst_id, "bar": bar, "after": str(after), "limit": str(limit)}
+    last_error = None
+    for attempt in range(retries):
+        try:
+            response = session.get(url, params=params, timeout=20)
+            response.raise_for_status()
+            return _parse_okx_candles(response.json())
+        except Exception as e:  # noqa: BLE001
+            last_error = e
+            if attempt < retries - 1:
+                sleep(0.5 * 2 ** attempt)
+    raise RuntimeError(f"history page after={after} failed: {last_error}")
+
+
+def load_okx_history(symbol: str, start, end=None, bar: str = "1Dutc", max_workers: int = 4,
+                     page_limit: int = OKX_HISTORY_PAGE_LIMIT, url: str = None, session=None) -> list:
+    """Download every candle from ``start`` (inclusive) to ``end`` (exclusive, default now).
+
+    Pages are requested ``max_workers`` at a time, merged, de-duplicated on
+    timestamp and returned oldest-first as ``[ts, o, h, l, c, v]`` rows. Holes
+    in the result are reported rather than silently interpolated.
+    """
+    bar_ms = bar_duration_ms(bar)
+    start_ms = _to_epoch_ms(start)
+    end_ms = _to_epoch_ms(end) if end is not None else int(utc_now().timestamp() * 1000) + bar_ms
+    if end_ms <= start_ms:
+        return []
+    page_span = page_limit * bar_ms
+    cursors = list(range(end_ms, start_ms, -page_span))
+    inst_id = symbol.replace("/", "-")
+    url = url or OKX_HISTORY_CANDLES_URL
+    own_session = session is None
+    session = session or requests.Session()
+
+    by_ts = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pages = pool.map(lambda after: _fetch_history_page(session, url, inst_id, bar, after, page_limit), cursors)
+            for rows in pages:
+                for row in rows:
+                    if start_ms <= row[0] < end_ms:
+                        by_ts[row[0]] = row
+    finally:
+        if own_session:
+            session.close()
+
+    rows = [by_ts[ts] for ts in sorted(by_ts)]
+    gaps = find_candle_gaps(rows, bar_ms)
+    print(f"📚 Loaded {len(rows)} {bar} candles for {symbol} in {len(cursors)} pages.")
+    if gaps:
+        print(f"⚠️ {len(gaps)} gap(s) in candle history, first: {gaps[:3]}")
+    return rows
+
+
+def ensure_markets_loaded(exchange, retries: int = 3, reload: bool = False) -> None:
+    """Load ccxt markets with retries, forcing a fresh reload after the first try.
+
+    Order placement requires ccxt market metadata. Because the ``None``-key sort
+    failure in ``load_markets()`` is driven by transient exchange data, reloading
+    a moment later usually succeeds; we surface the error only if it persists.
+    """
+    last_error = None
+    METRICS.count("markets", source="full")
+    for attempt in range(retries):
+        try:
+            exchange.load_markets(reload=(reload or attempt > 0))
+            return
+        except Exception as e:  # noqa: BLE001
+            last_error = e
+            print(f"⚠️ load_markets attempt {attempt + 1}/{retries} failed: {e}")
+            if attempt < retries - 1:
+                METRICS.count("retry", op="load_markets")
+                sleep(2 ** attempt)
+    raise last_error
+
+
+# ------------------------------------------------------------------------------
+# Slim market metadata
+# ------------------------------------------------------------------------------
+# ``load_markets()`` downloads and sorts every OKX instrument and currency just
+# so one BTC/USDT order can be sized, and that sort is where the None-key crash
+# above lives. OKX's instruments endpoint also answers for a single ``instId``,
+# so only the configured symbols are fetched, kept in a small JSON cache for
+# ``MARKET_CACHE_TTL`` seconds and handed to ccxt through ``set_markets``. Once
+# ``exchange.markets`` is populated, ccxt's implicit ``load_markets()`` calls in
+# ``fetch_ohlcv`` and order placement return straight away.
+MARKET_CACHE_FILE = os.path.join(OHLCV_CACHE_DIR, "markets_okx.json")
+MARKET_CACHE_TTL = float(os.getenv("DCA_MARKET_CACHE_TTL", str(24 * 3600)))
+
+
+def slim_market_query(symbol: str) -> tuple:
+    """``fetch_markets_by_type`` arguments that ask OKX for ``symbol``'s spot instrument alone."""
+    return "spot", {"instId": symbol.replace("/", "-")}
+
+
+def pick_slim_market(found: list, symbol: str, exchange_id: str = "okx") -> dict:
+    """The market structure for ``symbol`` among those an instrument request returned."""
+    for market in found:
+        if market.get("symbol") == symbol:
+            return market
+    raise ValueError(f"{exchange_id} returned no market metadata for {symbol}")
+
+
+def fetch_slim_markets(exchange, symbols) -> dict:
+    """Fetch ccxt market structures for ``symbols`` only, one instrument request each."""
+    return {symbol: pick_slim_market(exchange.fetch_markets_by_type(*slim_market_query(symbol)), symbol, exchange.id)
+            for symbol in symbols}
+
+
+def load_market_cache(symbols, path: str = None, ttl: float = None, now: float = None) -> dict:
+    """Cached metadata for ``symbols``, or ``None`` if missing, incomplete or older than ``ttl``."""
+    ttl = MARKET_CACHE_TTL if ttl is None else ttl
+    try:
+        with open(path or MARKET_CACHE_FILE, "r", encoding="utf-8") as fh:
+            payload = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+    age = (time.time() if now is None else now) - float(payload.get("saved_at", 0))
+    markets = payload.get("markets") or {}
+    if not 0 <= age <= ttl or any(symbol not in markets for symbol in symbols):
+        return None
+    return {symbol: markets[symbol] for symbol in symbols}
+
+
+def save_market_cache(markets: dict, path: str = None) -> str:
+    path = path or MARKET_CACHE_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump({"saved_at": time.time(), "markets": markets}, fh, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def prepare_exchange_markets(exchange, symbols, refresh: bool = False, retries: int = 3):
+    """Give ``exchange`` metadata for ``symbols`` only; return ``"cache"``, ``"slim"`` or ``None``.
+
+    ``None`` means the slim path failed and ccxt will fall back to a full
+    ``load_markets()`` when it next needs metadata.
+    """
+    if not refresh:
+        cached = load_market_cache(symbols)
+        if cached:
+            exchange.set_markets(list(cached.values()))
+            print(f"📦 Market metadata for {', '.join(symbols)} served from {MARKET_CACHE_FILE}.")
+            METRICS.count("markets", source="cache")
+            return "cache"
+    last_error = None
+    for attempt in range(retries):
+        try:
+            markets = fetch_slim_markets(exchange, symbols)
+            exchange.set_markets(list(markets.values()))
+            try:
+                save_market_cache(markets)
+            except OSError as e:
+                print(f"⚠️ Could not write market cache: {e}")
+            print(f"✅ Loaded market metadata for {', '.join(symbols)} only.")
+            METRICS.count("markets", source="slim")
+            return "slim"
+        except Exception as e:  # noqa: BLE001
+            last_error = e
+            print(f"⚠️ Slim market metadata attempt {attempt + 1}/{retries} failed: {e}")
+            if attempt < retries - 1:
+                METRICS.count("retry", op="slim_markets")
+                sleep(2 ** attempt)
+    print(f"⚠️ Slim market metadata unavailable ({last_error}); ccxt will load all markets.")
+    METRICS.count("fallback", kind="full_markets")
+    return None
+
+
+def place_market_buy(exchange, symbol: str, cost: float) -> dict:
+    """Spend ``cost`` quote currency on ``symbol``, retrying once on fresh metadata if rejected.
+
+    A rejection (bad size, precision or symbol) can mean the cached precision
+    or limits went stale, so the metadata is re-fetched before the retry.
+    Network or balance errors are not retried: the order may have gone through.
+    """
+    if not exchange.markets or symbol not in exchange.markets:
+        with METRICS.span("markets"):
+            ensure_markets_loaded(exchange)
+    errors = _load_ccxt()
+    try:
+        with METRICS.span("order"):
+            return exchange.create_market_buy_order_with_cost(symbol, cost)
+    except (errors.InvalidOrder, errors.BadSymbol, errors.BadRequest) as e:
+        print(f"⚠️ Order rejected ({e}); refreshing market metadata and retrying once.")
+        METRICS.count("retry", op="order")
+        with METRICS.span("markets"):
+            if prepare_exchange_markets(exchange, [symbol], refresh=True) is None:
+                ensure_markets_loaded(exchange, reload=True)
+        with METRICS.span("order"):
+            return exchange.create_market_buy_order_with_cost(symbol, cost)
+
+
+# ==============================================================================
+# SECTION 2.6: TRADE LOG STORAGE
+# ==============================================================================
+# The trade log used to be read, concatenated and rewritten as CSV on every run.
+# It now lives in ``trade_log.dat``: a 16-byte header followed by fixed-width
+# little-endian records (day number since 1970-01-01, buy_usd, buy_btc,
+# price_usd), one per date and in date order. Appending today's row is a single
+# write + fsync, a re-run on the same day rewrites that last record in place,
+# and the sorted day column doubles as the date index (binary search). Reads
+# memory-map the file as a NumPy structured array, so the column data never
+# goes through a text parser and ``records["buy_usd"]`` is a view onto the
+# mapped pages rather than a copy. The summary, the portfolio state and the
+# dashboard take those records directly (see ``log_columns``); a DataFrame is
+# only built for the CSV export and for callers that ask for one.
+#
+# A same-day upsert replaces that day's row, so a manual re-dispatch rewrites
+# the day instead of adding to it; ``already_bought`` is what keeps a second
+# run from placing a second order. ``trade_log.csv`` is kept in step as an export.
+LOG_STORE_FILE = "trade_log.dat"
+LOG_RECORD_DTYPE = np.dtype([("day", "<i4"), ("buy_usd", "<f8"), ("buy_btc", "<f8"), ("price_usd", "<f8")])
+_LOG_STORE_MAGIC = b"DCALOG01"
+_LOG_STORE_HEADER = 16
+_EPOCH = dt.date(1970, 1, 1)
+
+
+def _day_number(date_value) -> int:
+    if isinstance(date_value, str):
+        date_value = dt.date.fromisoformat(date_value[:10])
+    if isinstance(date_value, dt.datetime):
+        date_value = date_value.date()
+    return (date_value - _EPOCH).days
+
+
+def _merge_log_rows(old: tuple, new: dict) -> tuple:
+    """Combine two CSV rows for the same day: amounts add up, price is the average fill.
+
+    The old CSV log appended one row per run, and each of those runs placed an
+    order, so importing it must keep both. The store itself never merges.
+    """
+    buy_usd = float(old[1]) + float(new["buy_usd"] or 0.0)
+    buy_btc = float(old[2]) + float(new["buy_btc"] or 0.0)
+    price = buy_usd / buy_btc if buy_btc > 0 else float(new["price_usd"])
+    return int(old[0]), buy_usd, buy_btc, price
+
+
+def _write_log_store(path: str, records: np.ndarray) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_LOG_STORE_MAGIC + LOG_RECORD_DTYPE.itemsize.to_bytes(4, "little") + b"\0" * 4)
+        fh.write(np.ascontiguousarray(records, dtype=LOG_RECORD_DTYPE).tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def _records_from_frame(df: pd.DataFrame) -> np.ndarray:
+    """Convert a CSV-style log frame into sorted, one-row-per-day records."""
+    df = df.dropna(subset=["date"])
+    merged = {}
+    for row in df.itertuples(index=False):
+        entry = {"buy_usd": row.buy_usd, "buy_btc": row.buy_btc, "price_usd": row.price_usd}
+        day = _day_number(str(row.date))
+        if day in merged:
+            merged[day] = _merge_log_rows(merged[day], entry)
+        else:
+            merged[day] = (day, float(row.buy_usd or 0.0), float(row.buy_btc or 0.0), float(row.price_usd))
+    return np.array([merged[d] for d in sorted(merged)], dtype=LOG_RECORD_DTYPE)
+
+
+def _ensure_log_store(path: str, csv_path: str) -> None:
+    """Create the store on first use, importing an existing CSV log if there is one."""
+    if os.path.exists(path):
+        return
+    try:
+        records = _records_from_frame(pd.read_csv(csv_path))
+        print(f"📦 Imported {len(records)} day(s) from {csv_path} into {path}.")
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        records = np.empty(0, dtype=LOG_RECORD_DTYPE)
+    _write_log_store(path, records)
+
+
+def _map_log_store(path: str) -> np.ndarray:
+    with open(path, "rb") as fh:
+        header = fh.read(_LOG_STORE_HEADER)
+        if header[:8] != _LOG_STORE_MAGIC:
+            raise ValueError(f"{path} is not a trade log store")
+        count = (os.fstat(fh.fileno()).st_size - _LOG_STORE_HEADER) // LOG_RECORD_DTYPE.itemsize  # ignore a torn trailing write
+    if count <= 0:
+        return np.empty(0, dtype=LOG_RECORD_DTYPE)  # an empty file cannot be mapped
+    return np.memmap(path, dtype=LOG_RECORD_DTYPE, mode="r", offset=_LOG_STORE_HEADER, shape=(count,))
+
+
+def read_trade_log_records(path: str = None, csv_path: str = None, history: bool = True,
+                           migrate: bool = True) -> np.ndarray:
+    """Return the log as a read-only memory map with ``LOG_RECORD_DTYPE`` fields.
+
+    Field access gives zero-copy column views; pages are read from disk only
+    when a column is actually used. Once periods have been closed (see
+    ``rotate_trade_log``) the full history is their mapped files followed by the
+    open store, joined into one array; ``history=False`` maps the open store alone.
+    A missing store is created from the CSV log, unless ``migrate=False``: then
+    the CSV rows are returned and nothing is written.
+    """
+    path = path or LOG_STORE_FILE
+    if migrate or os.path.exists(path):
+        _ensure_log_store(path, csv_path or LOG_FILE)
+        records = _map_log_store(path)
+    else:
+        try:
+            records = _records_from_frame(pd.read_csv(csv_path or LOG_FILE))
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            records = np.empty(0, dtype=LOG_RECORD_DTYPE)
+    if not history:
+        return records
+    manifest = load_log_manifest(path)
+    if not manifest["partitions"]:
+        return records
+    # Rows of a closed period are still here if a rotation was interrupted after
+    # the manifest was written; the archived copy is the one that counts.
+    keep = _unarchived_periods(records["day"], manifest)
+    if len(keep) < len(records):
+        records = records[keep]
+    archive = _log_archive_dir(path)
+    return np.concatenate([_map_log_store(os.path.join(archive, p["file"])) for p in manifest["partitions"]] + [records])
+
+
+def already_bought(day, path: str = None, csv_path: str = None) -> bool:
+    """True when the log already records a buy for ``day`` (a date or ISO string).
+
+    Lets the cron run and the stream daemon's ``--execute`` trigger share one
+    daily budget: whichever buys first, the other skips. Only reads: a store
+    that does not exist yet is answered from the CSV log it would import.
+    """
+    # Today, if logged, is in the open period.
+    records = read_trade_log_records(path, csv_path, history=False, migrate=False)
+    return bool(len(records)) and int(records["day"][-1]) == _day_number(day) and records["buy_usd"][-1] > 0
+
+
+def log_columns(log) -> dict:
+    """``{"day", "buy_usd", "buy_btc", "price_usd"}`` arrays from log records or a ``LOG_COLUMNS`` frame.
+
+    Records come back as their own field views. A frame is parsed column by
+    column (rows without a date dropped, unparseable numbers as NaN), so old
+    callers holding DataFrames keep working.
+    """
+    if isinstance(log, np.ndarray):
+        return {name: log[name] for name in LOG_RECORD_DTYPE.names}
+    df = log.dropna(subset=["date"])
+    days = pd.to_datetime(df["date"].astype(str).str[:10]).to_numpy().astype("datetime64[D]").astype("int64")
+    columns = {"day": days}
+    for name in ("buy_usd", "buy_btc", "price_usd"):
+        columns[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+    return columns
+
+
+def _log_frame(records: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": records["day"].astype("datetime64[D]").astype(str),
+        "buy_usd": records["buy_usd"],
+        "buy_btc": records["buy_btc"],
+        "price_usd": records["price_usd"],
+    }, columns=LOG_COLUMNS)
+
+
+def read_trade_log(path: str = None, csv_path: str = None, history: bool = True) -> pd.DataFrame:
+    """Columnar read of the log as a ``LOG_COLUMNS`` DataFrame with ISO date strings."""
+    return _log_frame(read_trade_log_records(path, csv_path, history=history))
+
+
+def export_trade_log_csv(path: str = None, csv_path: str = None) -> str:
+    """Rewrite the CSV export of the open store (closed periods keep their own CSV in the archive)."""
+    csv_path = csv_path or LOG_FILE
+    read_trade_log(path, csv_path, history=False).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def upsert_trade_log(entry: dict, path: str = None, csv_path: str = None, partition: str = None) -> tuple:
+    """Durably record ``entry`` (a ``LOG_COLUMNS`` dict).
+
+    Returns ``(action, row)`` where ``row`` is the day's record as now stored
+    and ``action`` is ``"appended"`` for a new latest day (O(1)), ``"replaced"``
+    when the day already exists (its row overwritten in place), or ``"inserted"`` for a
+    backfilled earlier day, which is the one case that rewrites the file.
+    With time partitions (``partition``, default ``DCA_LOG_PARTITION``) the
+    first row of a new period closes the earlier ones, and a day of a closed
+    period is upserted into that period's archive file instead.
+    """
+    path = path or LOG_STORE_FILE
+    csv_path = csv_path or LOG_FILE
+    _ensure_log_store(path, csv_path)
+    day = _day_number(entry["date"])
+    granularity = (partition or LOG_PARTITION).lower()
+    first = np.array(_map_log_store(path)["day"][:1])  # no mapping left open while the file may be replaced
+    if not (len(first) and day >= first[0] and (granularity == "none" or
+                                               _period_keys(first, granularity)[0] == _period_keys([day], granularity)[0])):
+        # A new period or a backfill: the only upserts that need the manifest.
+        rotate_trade_log(path, csv_path, before=entry["date"], granularity=partition)
+        manifest = load_log_manifest(path)
+        if manifest["partitions"] and not len(_unarchived_periods([day], manifest)):
+            return _upsert_closed_partition(entry, path, manifest)
+    size = LOG_RECORD_DTYPE.itemsize
+    new_record = (day, float(entry["buy_usd"] or 0.0), float(entry["buy_btc"] or 0.0), float(entry["price_usd"]))
+
+    with open(path, "r+b") as fh:
+        fh.seek(0, os.SEEK_END)
+        count = (fh.tell() - _LOG_STORE_HEADER) // size
+        fh.truncate(_LOG_STORE_HEADER + count * size)
+        last = None
+        if count:
+            fh.seek(_LOG_STORE_HEADER + (count - 1) * size)
+            last = np.frombuffer(fh.read(size), dtype=LOG_RECORD_DTYPE)[0]
+
+        if last is None or day > int(last["day"]):
+            action, offset, record = "appended", count, new_record
+        elif day == int(last["day"]):
+            action, offset, record = "replaced", count - 1, new_record
+        else:
+            days = np.memmap(path, dtype=LOG_RECORD_DTYPE, mode="r", offset=_LOG_STORE_HEADER, shape=(count,))["day"]
+            pos = int(np.searchsorted(days, day))
+            if pos < count and int(days[pos]) == day:
+                action, offset, record = "replaced", pos, new_record
+            else:
+                action, offset, record = "inserted", None, None
+            del days
+
+        if offset is not None:
+            fh.seek(_LOG_STORE_HEADER + offset * size)
+            fh.write(np.array([record], dtype=LOG_RECORD_DTYPE).tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    if action == "inserted":
+        records = np.array(read_trade_log_records(path, csv_path))  # drop the mapping before the file is replaced
+        pos = int(np.searchsorted(records["day"], day))
+        _write_log_store(path, np.insert(records, pos, np.array(new_record, dtype=LOG_RECORD_DTYPE)))
+
+    if action == "appended" and os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+        row = pd.DataFrame([{**entry, "date": dt.date.fromordinal(_EPOCH.toordinal() + day).isoformat()}], columns=LOG_COLUMNS)
+        with open(csv_path, "a", newline="") as fh:
+            row.to_csv(fh, header=False, index=False)
+    else:
+        export_trade_log_csv(path, csv_path)
+    stored = new_record if record is None else record
+    return action, dict(zip(LOG_COLUMNS, (entry["date"], stored[1], stored[2], stored[3])))
+
+
+# --- Time partitions ---
+# Partitioning is opt-in: by default (``none``) everything stays in the one
+# store and ``trade_log.csv`` remains the full history that outside readers
+# expect. With ``DCA_LOG_PARTITION`` set to ``month`` or ``year``, the store
+# and its CSV export only hold the open period. Writing the first row of
+# a new period closes the earlier ones: their rows move to
+# ``<store>_archive/<period>.dat`` (same record format) with a CSV export next
+# to it, and ``manifest.json`` keeps per-period aggregates (rows, invested
+# days, sum invested, sum BTC, min/max price) plus the portfolio state at the
+# end of each period. Closed files are only rewritten for a backfilled day, so
+# a daily run touches one record and one CSV line however long the history
+# grows, and the portfolio state can be rebuilt from the last closed state and
+# the open period alone. Full-history readers map the closed files in front of
+# the open store. Switching back to ``none`` stops further rotation; periods
+# already closed stay archived.
+LOG_PARTITION = os.getenv("DCA_LOG_PARTITION", "none").lower().strip()
+LOG_PARTITIONS = ("month", "year", "none")
+LOG_MANIFEST_FILE = "manifest.json"
+_LOG_MANIFEST_VERSION = 1
+
+
+def _log_archive_dir(path: str = None) -> str:
+    return os.path.splitext(path or LOG_STORE_FILE)[0] + "_archive"
+
+
+def _period_keys(days, granularity: str) -> np.ndarray:
+    """Month (``datetime64[M]``) or year (``datetime64[Y]``) of each day number."""
+    unit = "datetime64[M]" if granularity == "month" else "datetime64[Y]"
+    return np.asarray(days, dtype="int64").astype("datetime64[D]").astype(unit)
+
+
+def _unarchived_periods(days, manifest: dict) -> np.ndarray:
+    """Indices of ``days`` that fall after the last closed period."""
+    if not manifest["partitions"]:
+        return np.arange(len(days))
+    last = np.datetime64(manifest["partitions"][-1]["period"])
+    return np.nonzero(_period_keys(days, manifest["granularity"]) > last)[0]
+
+
+def load_log_manifest(path: str = None) -> dict:
+    """The partition manifest of the store at ``path``; empty when no period has been closed."""
+    manifest_path = os.path.join(_log_archive_dir(path), LOG_MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        return {"version": _LOG_MANIFEST_VERSION, "granularity": None, "partitions": []}
+    if manifest.get("version") != _LOG_MANIFEST_VERSION:
+        raise ValueError(f"{manifest_path} has unsupported version {manifest.get('version')!r}")
+    return manifest
+
+
+def _save_log_manifest(manifest: dict, path: str = None) -> None:
+    manifest_path = os.path.join(_log_archive_dir(path), LOG_MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, manifest_path)
+
+
+def _log_granularity(manifest: dict, granularity: str = None):
+    """Period size to rotate with: the archive's own once it exists; ``None`` when partitioning is off."""
+    granularity = (granularity or LOG_PARTITION).lower()
+    if granularity not in LOG_PARTITIONS:
+        raise ValueError(f"Unknown log partition {granularity!r}; expected one of {LOG_PARTITIONS}")
+    if granularity == "none":
+        return None
+    return manifest["granularity"] or granularity
+
+
+def _store_log_partition(archive: str, period: str, records: np.ndarray) -> dict:
+    _write_log_store(os.path.join(archive, f"{period}.dat"), records)
+    _log_frame(records).to_csv(os.path.join(archive, f"{period}.csv"), index=False)
+    return {"period": period, "file": f"{period}.dat", "csv": f"{period}.csv"}
+
+
+def _log_partition_summary(records: np.ndarray, state: dict) -> dict:
+    """Aggregates of one closed period and the portfolio state at its end, continuing from ``state``.
+
+    Like the state, the sums and prices only count rows with a positive price.
+    """
+    price = np.asarray(records["price_usd"], dtype=float)
+    usd = np.asarray(records["buy_usd"], dtype=float)
+    btc = np.asarray(records["buy_btc"], dtype=float)
+    valid = np.isfinite(price) & (price > 0)
+    for day, buy_usd, buy_btc, price_usd in zip(records["day"].tolist(), usd.tolist(), btc.tolist(), price.tolist()):
+        state = advance_portfolio_state(state, {"date": str(np.datetime64(day, "D")), "buy_usd": buy_usd,
+                                                "buy_btc": buy_btc, "price_usd": price_usd})
+    return {
+        "first_date": str(np.datetime64(int(records["day"][0]), "D")),
+        "last_date": str(np.datetime64(int(records["day"][-1]), "D")),
+        "rows": int(len(records)),
+        "invest_days": int(((usd > 0) & valid).sum()),
+        "sum_usd": float(np.nan_to_num(usd[valid]).sum()),
+        "sum_btc": float(np.nan_to_num(btc[valid]).sum()),
+        "min_price": float(price[valid].min()) if valid.any() else None,
+        "max_price": float(price[valid].max()) if valid.any() else None,
+        "state": state,
+    }
+
+
+def _restate_log_partitions(manifest: dict, archive: str, start: str = None) -> None:
+    """Recompute the summaries of the partitions from period ``start`` on (all by default), in order."""
+    state = empty_portfolio_state()
+    for partition in manifest["partitions"]:
+        if start is None or partition["period"] >= start:
+            partition.update(_log_partition_summary(_map_log_store(os.path.join(archive, partition["file"])), state))
+        state = partition["state"]
+
+
+def rotate_trade_log(path: str = None, csv_path: str = None, before=None, granularity: str = None) -> list:
+    """Close every period of the open store earlier than the period of ``before`` (default today).
+
+    Returns the periods closed. A period that is already archived (rows left
+    behind by an interrupted rotation) keeps its archived rows.
+    """
+    path = path or LOG_STORE_FILE
+    csv_path = csv_path or LOG_FILE
+    _ensure_log_store(path, csv_path)
+    manifest = load_log_manifest(path)
+    granularity = _log_granularity(manifest, granularity)
+    if granularity is None:
+        return []
+    cutoff = _period_keys([_day_number(before or today())], granularity)[0]
+    mapped = _map_log_store(path)
+    if not len(mapped) or _period_keys(mapped["day"][:1], granularity)[0] >= cutoff:
+        return []
+    records = np.array(mapped)  # drop the mapping before the file is replaced
+    del mapped
+    periods = _period_keys(records["day"], granularity)
+    closing = periods < cutoff
+    archive = _log_archive_dir(path)
+    os.makedirs(archive, exist_ok=True)
+    partitions = {p["period"]: p for p in manifest["partitions"]}
+    closed = [str(period) for period in np.unique(periods[closing])]
+    for period in closed:
+        rows = records[periods == np.datetime64(period)]
+        if period in partitions:
+            archived = np.array(_map_log_store(os.path.join(archive, partitions[period]["file"])))
+            rows = np.concatenate([archived, rows[~np.isin(rows["day"], archived["day"])]])
+            rows = rows[np.argsort(rows["day"], kind="stable")]
+        partitions[period] = _store_log_partition(archive, period, rows)
+    manifest.update(granularity=granularity, partitions=[partitions[key] for key in sorted(partitions)])
+    _restate_log_partitions(manifest, archive, start=closed[0])
+    _save_log_manifest(manifest, path)
+    _write_log_store(path, records[~closing])
+    export_trade_log_csv(path, csv_path)
+    return closed
+
+
+def _upsert_closed_partition(entry: dict, path: str, manifest: dict) -> tuple:
+    """``upsert_trade_log`` for a day of a closed period: rewrite that period and restate the ones after it."""
+    archive = _log_archive_dir(path)
+    day = _day_number(entry["date"])
+    period = str(_period_keys([day], manifest["granularity"])[0])
+    partitions = {p["period"]: p for p in manifest["partitions"]}
+    if period in partitions:
+        records = np.array(_map_log_store(os.path.join(archive, partitions[period]["file"])))
+    else:
+        records = np.empty(0, dtype=LOG_RECORD_DTYPE)
+    pos = int(np.searchsorted(records["day"], day))
+    record = (day, float(entry["buy_usd"] or 0.0), float(entry["buy_btc"] or 0.0), float(entry["price_usd"]))
+    if pos < len(records) and int(records["day"][pos]) == day:
+        action = "replaced"
+        records[pos] = record
+    else:
+        action = "inserted"
+        records = np.insert(records, pos, np.array(record, dtype=LOG_RECORD_DTYPE))
+    partitions[period] = _store_log_partition(archive, period, records)
+    manifest["partitions"] = [partitions[key] for key in sorted(partitions)]
+    _restate_log_partitions(manifest, archive, start=period)
+    _save_log_manifest(manifest, path)
+    return action, dict(zip(LOG_COLUMNS, (entry["date"], record[1], record[2], record[3])))
+
+
+def verify_log_partitions(path: str = None, rtol: float = 1e-9) -> list:
+    """Recompute every closed period from its file; return ``(period, field, stored, rebuilt)`` mismatches."""
+    manifest = load_log_manifest(path)
+    rebuilt = json.loads(json.dumps(manifest))
+    try:
+        _restate_log_partitions(rebuilt, _log_archive_dir(path))
+    except (FileNotFoundError, ValueError) as e:
+        return [("archive", "file", None, str(e))]
+
+    def same(a, b):
+        if isinstance(a, float) and isinstance(b, float):
+            return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=rtol, abs_tol=1e-12)
+        return a == b
+
+    mismatches = []
+    for stored, fresh in zip(manifest["partitions"], rebuilt["partitions"]):
+        for field, value in fresh.items():
+            if field == "state":
+                mismatches += [(stored["period"], f"state.{key}", stored["state"].get(key), value[key])
+                               for key in value if not same(stored["state"].get(key), value[key])]
+            elif not same(stored.get(field), value):
+                mismatches.append((stored["period"], field, stored.get(field), value))
+    return mismatches
+
+
+# ==============================================================================
+# SECTION 2.7: PORTFOLIO STATE SNAPSHOT
+# ==============================================================================
+# Totals for the summary and the dashboard header used to be re-summed from the
+# whole log on every run. ``portfolio_state.json`` keeps them as a running
+# record that each new log row advances in O(1). It also keeps the state as of
+# the previous day, so a same-day re-run that replaces the row (see
+# ``upsert_trade_log``) is replayed from there instead of being counted twice. Only rows with a positive price
+# count, which is the same filter ``main()`` applies before summarising.
+# ``python trade_bot.py verify-state`` rebuilds the record from the full log
+# and checks that the two agree.
+PORTFOLIO_STATE_FILE = "portfolio_state.json"
+_STATE_FIELDS = ("days", "invest_days", "total_invested", "total_btc", "sum_inv_price",
+                 "last_price", "high_water_mark", "drawdown", "max_drawdown")
+
+
+def empty_portfolio_state() -> dict:
+    return {"days": 0, "invest_days": 0, "total_invested": 0.0, "total_btc": 0.0, "sum_inv_price": 0.0,
+            "last_price": float("nan"), "last_date": None, "high_water_mark": 0.0, "drawdown": 0.0,
+            "max_drawdown": 0.0, "avg_cost": 0.0}
+
+
+def advance_portfolio_state(state: dict, entry: dict) -> dict:
+    """Return ``state`` after one more log row (``LOG_COLUMNS`` dict)."""
+    price = float(entry.get("price_usd") or 0.0)
+    if not (math.isfinite(price) and price > 0):
+        return state
+    buy_usd = float(entry.get("buy_usd") or 0.0)
+    buy_btc = float(entry.get("buy_btc") or 0.0)
+    new = dict(state)
+    new["days"] += 1
+    if buy_usd > 0:
+        new["invest_days"] += 1
+        new["sum_inv_price"] += 1.0 / price
+    new["total_invested"] += buy_usd
+    new["total_btc"] += buy_btc
+    new["last_price"] = price
+    new["last_date"] = str(entry.get("date"))[:10]
+    if new["total_invested"] > 0 and new["total_btc"] > 0:
+        # High-water mark and drawdown are tracked on value per invested dollar,
+        # the same measure ``max_drawdown`` uses for backtests.
+        equity = new["total_btc"] * price / new["total_invested"]
+        new["high_water_mark"] = max(new["high_water_mark"], equity)
+        new["drawdown"] = 1.0 - equity / new["high_water_mark"]
+        new["max_drawdown"] = max(new["max_drawdown"], new["drawdown"])
+        new["avg_cost"] = new["total_invested"] / new["total_btc"]
+    return new
+
+
+def portfolio_state_from_log(log_df) -> dict:
+    """Rebuild the state from the full log, as records or a ``LOG_COLUMNS`` frame (the slow, authoritative path)."""
+    state = empty_portfolio_state()
+    if log_df is None:
+        return state
+    cols = log_df if isinstance(log_df, dict) else log_columns(log_df)
+    price = np.asarray(cols["price_usd"], dtype=float)
+    keep = np.isfinite(price) & (price > 0)
+    if not keep.any():
+        return state
+    price = price[keep]
+    usd = np.nan_to_num(np.asarray(cols["buy_usd"], dtype=float)[keep])
+    btc = np.nan_to_num(np.asarray(cols["buy_btc"], dtype=float)[keep])
+    invest_cum = np.cumsum(usd)
+    btc_cum = np.cumsum(btc)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        equity = np.where((invest_cum > 0) & (btc_cum > 0), btc_cum * price / invest_cum, np.nan)
+        peak = np.fmax.accumulate(equity)
+        drawdown = 1.0 - equity / peak
+    valid = np.isfinite(equity)
+    state.update({
+        "days": int(len(price)),
+        "invest_days": int((usd > 0).sum()),
+        "total_invested": float(invest_cum[-1]),
+        "total_btc": float(btc_cum[-1]),
+        "sum_inv_price": float(np.cumsum(np.where(usd > 0, 1.0 / price, 0.0))[-1]),
+        "last_price": float(price[-1]),
+        "last_date": str(np.datetime64(int(cols["day"][keep][-1]), "D")),
+    })
+    if valid.any():
+        last_valid = np.nonzero(valid)[0][-1]
+        state["high_water_mark"] = float(peak[last_valid])
+        state["drawdown"] = float(drawdown[last_valid])
+        state["max_drawdown"] = float(np.nanmax(drawdown))
+        state["avg_cost"] = state["total_invested"] / state["total_btc"]
+    return state
+
+
+def _portfolio_state_snapshot(log_df) -> dict:
+    cols = log_columns(log_df)
+    keep = cols["price_usd"] > 0
+    cols = {name: values[keep] for name, values in cols.items()}
+    return {
+        "state": portfolio_state_from_log(cols),
+        "previous": portfolio_state_from_log({name: values[:-1] for name, values in cols.items()}),
+    }
+
+
+def _partitioned_state_snapshot(log_path: str = None) -> dict:
+    """``_portfolio_state_snapshot`` from the last closed period's state plus the open store.
 
-    last_window=valid_prices.tail(200)
-    if len(last_window) < 200:
+    ``None`` when no period is closed yet or the open store has no priced row,
+    in which case the caller rebuilds from the full log.
+    """
+    manifest = load_log_manifest(log_path)
+    if not manifest["partitions"]:
+        return None
+    records = read_trade_log_records(log_path, history=False)
+    records = records[_unarchived_periods(records["day"], manifest)]
+    price = np.asarray(records["price_usd"], dtype=float)
+    rows = records[np.isfinite(price) & (price > 0)]
+    if not len(rows):
+        return None
+    state = previous = manifest["partitions"][-1]["state"]
+    for row in rows:
+        previous = state
+        state = advance_portfolio_state(state, {"date": str(np.datetime64(int(row["day"]), "D")),
+                                                "buy_usd": float(row["buy_usd"]), "buy_btc": float(row["buy_btc"]),
+                                                "price_usd": float(row["price_usd"])})
+    return {"state": state, "previous": previous}
+
+
+def load_portfolio_state(path: str = None) -> dict:
+    try:
+        with open(path or PORTFOLIO_STATE_FILE, "r", encoding="utf-8") as fh:
+            snapshot = json.load(fh)
+        return snapshot if {"state", "previous"} <= set(snapshot) else None
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_portfolio_state(snapshot: dict, path: str = None) -> None:
+    path = path or PORTFOLIO_STATE_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(snapshot, fh, indent=2, allow_nan=True)
+    os.replace(tmp_path, path)
+
+
+def update_portfolio_state(entry: dict, action: str, stored_entry: dict = None, path: str = None,
+                           log_df=None, log_path: str = None) -> dict:
+    """Advance the persisted state for a log upsert and return the current state.
+
+    ``action`` is the value returned by ``upsert_trade_log``. A replaced day is
+    re-applied to the previous-day state using ``stored_entry`` (the row as it
+    now stands). Anything the running record cannot follow — a backfilled day,
+    a missing or out-of-step file — is rebuilt from ``log_df``, or without it
+    from the store at ``log_path`` (its closed periods' state and open rows).
+    """
+    snapshot = load_portfolio_state(path)
+    day = str(entry["date"])[:10]
+    price_ok = math.isfinite(float(entry.get("price_usd") or 0.0)) and float(entry.get("price_usd") or 0.0) > 0
+    last_date = snapshot["state"].get("last_date") if snapshot else None
+    if snapshot is not None and price_ok and action == "appended" and (last_date is None or last_date < day):
+        snapshot = {"state": advance_portfolio_state(snapshot["state"], entry), "previous": snapshot["state"]}
+    elif snapshot is not None and price_ok and action == "replaced" and last_date == day and stored_entry:
+        snapshot = {"state": advance_portfolio_state(snapshot["previous"], stored_entry), "previous": snapshot["previous"]}
+    else:
+        snapshot = _partitioned_state_snapshot(log_path) if log_df is None else None
+        if snapshot is None:
+            snapshot = _portfolio_state_snapshot(read_trade_log_records(log_path) if log_df is None else log_df)
+    save_portfolio_state(snapshot, path)
+    return snapshot["state"]
+
+
+def verify_portfolio_state(log_df=None, path: str = None, rtol: float = 1e-9) -> list:
+    """Compare the persisted state with a full rebuild; return ``(field, stored, rebuilt)`` mismatches."""
+    snapshot = load_portfolio_state(path)
+    if snapshot is None:
+        return [("state", None, "missing")]
+    rebuilt = portfolio_state_from_log(read_trade_log_records() if log_df is None else log_df)
+    mismatches = []
+    for field in _STATE_FIELDS + ("avg_cost",):
+        stored, expected = snapshot["state"].get(field), rebuilt[field]
+        same = (isinstance(stored, (int, float)) and
+                ((math.isnan(stored) and math.isnan(expected)) or
+                 math.isclose(stored, expected, rel_tol=rtol, abs_tol=1e-12)))
+        if not same:
+            mismatches.append((field, stored, expected))
+    if snapshot["state"].get("last_date") != rebuilt["last_date"]:
+        mismatches.append(("last_date", snapshot["state"].get("last_date"), rebuilt["last_date"]))
+    return mismatches
+
+
+# ==============================================================================
+# SECTION 2.8: DAILY INDICATOR STORE
+# ==============================================================================
+# The 200-day harmonic mean, growth estimate and AHR999 used to be recomputed
+# from raw candles on every run and then thrown away. ``indicators.dat`` keeps
+# one fixed-width record per candle day (price, dca200, growth estimate,
+# AHR999, multiplier, investment and pause flag), laid out like the trade log
+# store. Its 32-byte header also holds the running state of the newest window:
+# the reciprocal sum and count of valid closes among the last 200 rows.
+#
+# A run hands over its fresh candles. The newest stored day was still an open
+# candle when written, so that row is rewritten with its final close, then the
+# new days are appended; each step adds one close to the running sums and
+# removes the one leaving the window (a single record read), exactly as the
+# streaming daemon does. The sums are re-added from the stored tail every
+# ``INDICATOR_RESYNC_ROWS`` rows to shed floating-point drift. Should the
+# stored rows disagree with the exchange, the store is rebuilt from the candles.
+#
+# Historical questions ("how low is today's AHR999 compared with every day on
+# record?", "how long since the last pause?") are answered from a small sorted
+# index in ``.cache`` with a binary search instead of a recomputation.
+INDICATOR_STORE_FILE = "indicators.dat"
+INDICATOR_RECORD_DTYPE = np.dtype([("day", "<i4"), ("price", "<f8"), ("dca200", "<f8"), ("growth_estimate", "<f8"),
+                                   ("ahr999", "<f8"), ("multiplier", "<f8"), ("investment_usd", "<f8"),
+                                   ("paused", "u1")])
+INDICATOR_RESYNC_ROWS = 64
+_INDICATOR_MAGIC = b"DCAIND01"
+_INDICATOR_HEADER = 32
+_INDICATOR_STATE_DTYPE = np.dtype([("recip_sum", "<f8"), ("count", "<i4")])
+
+
+def _indicator_index_path(path: str = None) -> str:
+    """Where the sorted index of the store at ``path`` lives (derived data, so under ``.cache``)."""
+    name = os.path.splitext(os.path.basename(path or INDICATOR_STORE_FILE))[0]
+    return os.path.join(OHLCV_CACHE_DIR, f"{name}_index.npz")
+
+
+def _indicator_header(recip_sum: float, count: int) -> bytes:
+    state = np.array([(recip_sum, count)], dtype=_INDICATOR_STATE_DTYPE).tobytes()
+    header = _INDICATOR_MAGIC + INDICATOR_RECORD_DTYPE.itemsize.to_bytes(4, "little") + state
+    return header.ljust(_INDICATOR_HEADER, b"\0")
+
+
+def _window_state(prices: np.ndarray) -> tuple:
+    """Reciprocal sum and count of the valid closes among the last ``DCA_WINDOW`` of ``prices``."""
+    window = np.asarray(prices, dtype=float)[-DCA_WINDOW:]
+    valid = window[np.isfinite(window) & (window > 0)]
+    return math.fsum((1.0 / valid).tolist()), int(len(valid))
+
+
+def _indicator_records(days: np.ndarray, prices: np.ndarray, dca200: np.ndarray, baseline: float) -> np.ndarray:
+    """Fill growth estimate, AHR999 and the decision for rows whose dca200 is known."""
+    estimate = growth_estimate_array(days - _day_number(GENESIS))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        computable = np.isfinite(dca200) & np.isfinite(prices)
+        ahr999 = np.where(computable, (prices / dca200) * (prices / estimate), np.nan)
+    decision = decision_arrays(ahr999, baseline)
+    records = np.empty(len(days), dtype=INDICATOR_RECORD_DTYPE)
+    records["day"] = days
+    records["price"] = prices
+    records["dca200"] = dca200
+    records["growth_estimate"] = estimate
+    records["ahr999"] = ahr999
+    records["multiplier"] = decision["multiplier"]
+    records["investment_usd"] = decision["investment_usd"]
+    records["paused"] = decision["paused"]
+    return records
+
+
+def _candle_days_and_prices(historical_df: pd.DataFrame) -> tuple:
+    """Day numbers and closes of the candles that have a price (NaN closes are dropped, as in the live window)."""
+    prices = pd.to_numeric(historical_df["price"], errors="coerce").to_numpy(dtype=float)
+    days = _candle_dates(historical_df).astype("int64")
+    keep = ~np.isnan(prices)
+    return days[keep].astype("int32"), prices[keep]
+
+
+def _read_indicator_header(path: str):
+    """``(recip_sum, count, rows)`` from the store header, or ``None`` when missing or foreign."""
+    try:
+        with open(path, "rb") as fh:
+            header = fh.read(_INDICATOR_HEADER)
+            size = fh.seek(0, os.SEEK_END)
+    except FileNotFoundError:
+        return None
+    if len(header) < _INDICATOR_HEADER or header[:8] != _INDICATOR_MAGIC:
+        return None
+    state = np.frombuffer(header[12:12 + _INDICATOR_STATE_DTYPE.itemsize], dtype=_INDICATOR_STATE_DTYPE)[0]
+    return float(state["recip_sum"]), int(state["count"]), (size - _INDICATOR_HEADER) // INDICATOR_RECORD_DTYPE.itemsize
+
+
+def _read_indicator_rows(fh, start: int, stop: int) -> np.ndarray:
+    size = INDICATOR_RECORD_DTYPE.itemsize
+    fh.seek(_INDICATOR_HEADER + start * size)
+    return np.frombuffer(fh.read((stop - start) * size), dtype=INDICATOR_RECORD_DTYPE)
+
+
+def read_indicator_store(path: str = None) -> np.ndarray:
+    """Every stored day as an ``INDICATOR_RECORD_DTYPE`` array (empty when there is no store)."""
+    path = path or INDICATOR_STORE_FILE
+    header = _read_indicator_header(path)
+    if header is None:
+        return np.empty(0, dtype=INDICATOR_RECORD_DTYPE)
+    with open(path, "rb") as fh:
+        return _read_indicator_rows(fh, 0, header[2]).copy()
+
+
+def rebuild_indicator_store(historical_df: pd.DataFrame, baseline: float = None, path: str = None,
+                            keep_history: bool = True) -> np.ndarray:
+    """Recompute every row from ``historical_df`` and rewrite the store.
+
+    With ``keep_history`` stored days older than the first candle are kept and
+    their closes seed the window, so a 250-candle rebuild does not drop years
+    of history.
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    path = path or INDICATOR_STORE_FILE
+    days, prices = _candle_days_and_prices(historical_df)
+    if keep_history and len(days):
+        older = read_indicator_store(path)
+        older = older[older["day"] < days[0]]
+        days = np.concatenate([older["day"], days]).astype("int32")
+        prices = np.concatenate([older["price"], prices])
+    records = _indicator_records(days, prices, _rolling_harmonic_mean(prices), baseline)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_indicator_header(*_window_state(prices)))
+        fh.write(records.tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    _save_indicator_index(_build_indicator_index(records), path)
+    return records
+
+
+def update_indicator_store(historical_df: pd.DataFrame, baseline: float = None, path: str = None) -> tuple:
+    """Bring the store up to the newest candle of ``historical_df``.
+
+    Returns ``(action, newest_record)`` with ``action`` ``"updated"`` (newest
+    row refreshed and any new days appended from the running state) or
+    ``"rebuilt"`` (no usable store, or the candles disagree with it).
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    path = path or INDICATOR_STORE_FILE
+    days, prices = _candle_days_and_prices(historical_df)
+    if not len(days):
+        raise ValueError("No priced candles to store indicators for.")
+    header = _read_indicator_header(path)
+    if header is None or header[2] == 0:
+        return "rebuilt", rebuild_indicator_store(historical_df, baseline, path)[-1]
+    recip_sum, count, rows = header
+    window = DCA_WINDOW
+    last_row = rows - 1
+
+    with open(path, "r+b") as fh:
+        fh.truncate(_INDICATOR_HEADER + rows * INDICATOR_RECORD_DTYPE.itemsize)  # drop a torn trailing write
+        tail = _read_indicator_rows(fh, max(0, last_row - 1), rows)
+        pos = int(np.searchsorted(days, tail["day"][-1]))
+        consistent = pos < len(days) and days[pos] == tail["day"][-1]
+        if consistent and len(tail) == 2:
+            # Only the newest stored close may have moved since it was written.
+            consistent = pos > 0 and days[pos - 1] == tail["day"][0] and \
+                np.isclose(prices[pos - 1], tail["price"][0], rtol=1e-9, atol=0.0, equal_nan=True)
+        if not consistent:
+            reason = "disagrees with" if pos < len(days) and days[pos] == tail["day"][-1] else "has a gap before"
+            print(f"⚠️ {path} {reason} the exchange candles; rebuilding from them.")
+        else:
+            new_days, new_prices = days[pos:], prices[pos:]
+            k = len(new_days)
+            # Closes leaving the window as rows last_row+1 .. last_row+k-1 come in.
+            first_out = last_row + 1 - window
+            start = max(0, first_out)
+            stored_out = _read_indicator_rows(fh, start, max(start, min(last_row, first_out + k - 1)))
+            stored_out_prices = {start + i: float(p) for i, p in enumerate(stored_out["price"])}
+            old_last_price = float(tail["price"][-1])
+
+            def add(price, sign):
+                nonlocal recip_sum, count
+                if math.isfinite(price) and price > 0:
+                    recip_sum += sign / price
+                    count += sign
+
+            add(old_last_price, -1)
+            dca200 = np.full(k, np.nan)
+            for j in range(k):
+                g = last_row + j
+                if j > 0 and g - window >= 0:
+                    out = g - window
+                    add(stored_out_prices[out] if out < last_row else float(new_prices[out - last_row]), -1)
+                add(float(new_prices[j]), +1)
+                if g + 1 >= window and count > 0 and recip_sum > 0:
+                    dca200[j] = count / recip_sum
+
+            records = _indicator_records(new_days, new_prices, dca200, baseline)
+            total = last_row + k
+            if total // INDICATOR_RESYNC_ROWS != rows // INDICATOR_RESYNC_ROWS:
+                stored = _read_indicator_rows(fh, max(0, last_row - window + 1), last_row)["price"]
+                recip_sum, count = _window_state(np.concatenate([stored, new_prices]))
+            fh.seek(_INDICATOR_HEADER + last_row * INDICATOR_RECORD_DTYPE.itemsize)
+            fh.write(records.tobytes())
+            fh.seek(0)
+            fh.write(_indicator_header(recip_sum, count))
+            fh.flush()
+            os.fsync(fh.fileno())
+            _update_indicator_index(tail[-1], records, rows, path)
+            return "updated", records[-1]
+    return "rebuilt", rebuild_indicator_store(historical_df, baseline, path)[-1]
+
+
+def _build_indicator_index(records: np.ndarray) -> dict:
+    ahr999 = records["ahr999"]
+    return {"rows": np.int64(len(records)),
+            "last_day": np.int64(records["day"][-1]) if len(records) else np.int64(-1),
+            "last_ahr999": np.float64(ahr999[-1]) if len(records) else np.float64(np.nan),
+            "sorted_ahr999": np.sort(ahr999[np.isfinite(ahr999)]),
+            "pause_days": records["day"][records["paused"].astype(bool)].astype("int32")}
+
+
+def _save_indicator_index(index: dict, store_path: str = None) -> None:
+    path = _indicator_index_path(store_path)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **index)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not write indicator index: {e}")
+
+
+def _update_indicator_index(replaced: np.void, records: np.ndarray, rows_before: int, store_path: str = None) -> None:
+    """Swap the refreshed newest row and add the appended ones to the sorted index."""
+    index = load_indicator_index(store_path, rebuild=False)
+    if index is None or int(index["rows"]) != rows_before or int(index["last_day"]) != int(replaced["day"]) \
+            or not np.array_equal(index["last_ahr999"], replaced["ahr999"], equal_nan=True):
+        _save_indicator_index(_build_indicator_index(read_indicator_store(store_path)), store_path)
+        return
+    values, pauses = index["sorted_ahr999"], index["pause_days"]
+    if np.isfinite(replaced["ahr999"]):
+        values = np.delete(values, int(np.searchsorted(values, replaced["ahr999"])))
+    if replaced["paused"]:
+        pauses = pauses[:-1]
+    fresh = records["ahr999"][np.isfinite(records["ahr999"])]
+    values = np.insert(values, np.searchsorted(values, np.sort(fresh)), np.sort(fresh))
+    pauses = np.concatenate([pauses, records["day"][records["paused"].astype(bool)].astype("int32")])
+    _save_indicator_index({"rows": np.int64(rows_before - 1 + len(records)), "last_day": np.int64(records["day"][-1]),
+                           "last_ahr999": np.float64(records["ahr999"][-1]), "sorted_ahr999": values,
+                           "pause_days": pauses}, store_path)
+
+
+def load_indicator_index(path: str = None, rebuild: bool = True) -> dict:
+    """Sorted AHR999 values and pause days of the store at ``path``; rebuilt when missing or stale."""
+    index = None
+    with contextlib.suppress(FileNotFoundError, ValueError, OSError, KeyError):
+        with np.load(_indicator_index_path(path)) as archive:
+            index = {key: archive[key] for key in ("rows", "last_day", "last_ahr999", "sorted_ahr999", "pause_days")}
+    if not rebuild:
+        return index
+    header = _read_indicator_header(path or INDICATOR_STORE_FILE)
+    if index is None or int(index["rows"]) != (header[2] if header else 0):
+        index = _build_indicator_index(read_indicator_store(path))
+        _save_indicator_index(index, path)
+    return index
+
+
+def ahr999_percentile_rank(value: float, index: dict = None) -> float:
+    """Share of stored days whose AHR999 was at or below ``value`` (O(log n)); ``nan`` without history."""
+    index = load_indicator_index() if index is None else index
+    values = index["sorted_ahr999"]
+    if not len(values) or not math.isfinite(value):
+        return float("nan")
+    return int(np.searchsorted(values, value, side="right")) / len(values)
+
+
+def days_since_last_pause(day=None, index: dict = None):
+    """Days from the most recent paused day on or before ``day`` (default today), or ``None`` if never paused."""
+    index = load_indicator_index() if index is None else index
+    target = _day_number(day or today())
+    pauses = index["pause_days"]
+    pos = int(np.searchsorted(pauses, target, side="right"))
+    return None if pos == 0 else target - int(pauses[pos - 1])
+
+
+def indicator_history_log(ahr999: float, day=None, path: str = None) -> str:
+    """Issue lines placing today's AHR999 in the stored history."""
+    index = load_indicator_index(path)
+    rank = ahr999_percentile_rank(ahr999, index)
+    since = days_since_last_pause(day, index)
+    rank_text = "N/A" if not math.isfinite(rank) else f"{rank:.1%} of {len(index['sorted_ahr999'])} days"
+    return (f"- **AHR999 Percentile:** `{rank_text}`\n"
+            f"- **Days Since Last Pause:** `{'never paused' if since is None else since}`")
+
+
+def indicator_for_day(day, path: str = None) -> dict:
+    """The stored row for ``day`` found by binary search on the day column, or ``None``."""
+    path = path or INDICATOR_STORE_FILE
+    header = _read_indicator_header(path)
+    if header is None or header[2] == 0:
+        return None
+    stored = np.memmap(path, dtype=INDICATOR_RECORD_DTYPE, mode="r", offset=_INDICATOR_HEADER, shape=(header[2],))
+    target = _day_number(day)
+    pos = int(np.searchsorted(stored["day"], target))
+    if pos == header[2] or int(stored["day"][pos]) != target:
+        return None
+    row = stored[pos]
+    return {"date": str(np.datetime64(int(row["day"]), "D")), **{name: row[name].item() for name in
+                                                                 INDICATOR_RECORD_DTYPE.names[1:]}}
+
+
+# ==============================================================================
+# SECTION 3: CORE LOGIC
+# ==============================================================================
+def index_growth_estimate(age_days: int) -> float:
+    age_days=max(1, age_days); return 10**(5.84*math.log10(age_days)-17.01)
+def calculate_continuous_multiplier(x: float) -> float:
+    if not math.isfinite(x) or x <= 0: return 1.0
+    if x < NEUTRAL_X: return 1.0 + ALPHA * math.log(NEUTRAL_X/x)
+    else: return max(0.0, 1.0 - BETA * math.log1p(x-NEUTRAL_X))
+def _harmonic_mean(values: np.ndarray) -> float:
+    """Return the harmonic mean of positive, finite values.
+
+    The original implementation used ``200/(1/x).sum()`` which worked for
+    strictly-positive data but collapsed to zero or ``nan`` when a zero or
+    invalid value slipped into the window. That behaviour propagated downstream
+    and broke the AHR999 index calculation. We explicitly ignore non-positive or
+    non-finite entries so a single bad tick does not poison the rolling mean.
+    """
+
+    arr=np.asarray(values, dtype=float)
+    mask=np.isfinite(arr) & (arr>0)
+    if not mask.any():
+        return np.nan
+    reciprocal_sum=np.sum(1.0/arr[mask])
+    if reciprocal_sum==0:
+        return np.nan
+    return mask.sum()/reciprocal_sum
+
+
+def today_indicator(historical_df: pd.DataFrame, as_of: dt.date = None) -> dict:
+    """Latest price and AHR999 (``nan`` when the 200-day window is not available), independent of any baseline."""
+    if "price" not in historical_df.columns:
+        print("⚠️ historical_df missing 'price' column.")
+        return {"price_today": np.nan, "ahr999_index": np.nan}
+
+    prices=pd.to_numeric(historical_df["price"], errors="coerce")
+    valid_prices=prices.dropna()
+    if valid_prices.empty:
+        print("⚠️ No valid numeric price data after coercion.")
+        return {"price_today": np.nan, "ahr999_index": np.nan}
+
+    last_window=valid_prices.tail(DCA_WINDOW)
+    if len(last_window) < DCA_WINDOW:
         print(f"⚠️ Insufficient valid numeric price points for 200-day window: {len(last_window)}")
-        return {"investment_usd": np.nan, "price_today": valid_prices.iloc[-1], "ahr999_index": np.nan}
-    dca200=_harmonic_mean(last_window.to_numpy())
-    age_today=(dt.date.today()-GENESIS).days; estimate_today=index_growth_estimate(age_today)
-    price_today=valid_prices.iloc[-1]
-    if not np.isfinite(dca200) or not np.isfinite(price_today): return {"investment_usd": np.nan, "price_today": price_today, "ahr999_index": np.nan}
-    ahr999_today=(price_today/dca200)*(price_today/estimate_today)
-    buy_usd_ahr=baseline
-    if np.isfinite(ahr999_today):
-        if ahr999_today>PAUSE_THRESHOLD: buy_usd_ahr=0.0
+        return {"price_today": valid_prices.iloc[-1], "ahr999_index": np.nan}
+    # Same array path as the backtest; only the last row is read, dated ``as_of`` (default today).
+    day=np.datetime64(as_of or today(), "D")
+    series=ahr999_series(np.full(len(last_window), day), last_window.to_numpy())
+    ahr999_today=float(series["ahr999"][-1])
+    return {"price_today": valid_prices.iloc[-1], "ahr999_index": ahr999_today if np.isfinite(ahr999_today) else np.nan}
+
+
+def get_today_investment_amount(historical_df: pd.DataFrame, baseline: float, as_of: dt.date = None) -> dict:
+    indicator=today_indicator(historical_df, as_of)
+    if not np.isfinite(indicator["ahr999_index"]): return {"investment_usd": np.nan, **indicator}
+    investment=decision_arrays(indicator["ahr999_index"], baseline)["investment_usd"]
+    return {"investment_usd": float(investment), **indicator}
+
+
+def investment_for_index(ahr999: float, baseline: float) -> float:
+    """Pause, multiplier and daily cap applied to one AHR999 value, rounded like the daily decision."""
+    if not np.isfinite(ahr999):
+        return np.nan
+    if ahr999 > PAUSE_THRESHOLD:
+        return 0.0
+    buy_usd = min(baseline * calculate_continuous_multiplier(ahr999), baseline * DAILY_CAP_X)
+    return round(buy_usd, 4) if np.isfinite(buy_usd) else np.nan
+
+# ==============================================================================
+# SECTION 3.5: VECTORIZED BACKTEST
+# ==============================================================================
+# ``get_today_investment_amount`` answers "what do we buy today?" from the last
+# 200 closes. Replaying it day by day over a decade of candles means thousands
+# of pandas round-trips, so the backtest derives every day's window from running
+# sums instead: the harmonic mean over days (i-199..i] is count/sum(1/p), and
+# both terms are differences of cumulative sums. Bad ticks are excluded exactly
+# as ``_harmonic_mean`` excludes them, so each row equals the live decision.
+def _as_days(timestamps) -> np.ndarray:
+    """UTC calendar days (``datetime64[D]``) from epoch-ms numbers, datetimes or date strings."""
+    arr = np.asarray(timestamps)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[D]")
+    if np.issubdtype(arr.dtype, np.number):
+        return (arr.astype("float64").astype("int64") // 86_400_000).astype("datetime64[D]")
+    return pd.to_datetime(arr).to_numpy().astype("datetime64[D]")
+
+
+def _candle_dates(historical_df: pd.DataFrame) -> np.ndarray:
+    """Return the UTC calendar day of every candle as ``datetime64[D]``."""
+    if "timestamp" in historical_df.columns:
+        return _as_days(pd.to_numeric(historical_df["timestamp"], errors="coerce").to_numpy(dtype="float64"))
+    return _as_days(historical_df["date"])
+
+
+def growth_estimate_array(age_days: np.ndarray) -> np.ndarray:
+    """Vectorized ``index_growth_estimate`` (ages below one day count as one)."""
+    age_days = np.maximum(1, np.asarray(age_days, dtype="int64"))
+    return 10 ** (5.84 * np.log10(age_days) - 17.01)
+
+
+def continuous_multiplier_array(x: np.ndarray, alpha: float = None, beta: float = None,
+                                 neutral_x: float = None) -> np.ndarray:
+    """Vectorized ``calculate_continuous_multiplier`` (non-finite/non-positive -> 1.0).
+
+    The constants may be arrays too; everything is broadcast together, so one
+    AHR999 value can be scored against many parameter sets at once.
+    """
+    alpha = ALPHA if alpha is None else alpha
+    beta = BETA if beta is None else beta
+    neutral_x = NEUTRAL_X if neutral_x is None else neutral_x
+    x, alpha, beta, neutral_x = np.broadcast_arrays(np.asarray(x, dtype=float), alpha, beta, neutral_x)
+    out = np.ones(x.shape)
+    ok = np.isfinite(x) & (x > 0)
+    low = ok & (x < neutral_x)
+    high = ok & (x >= neutral_x)
+    out[low] = 1.0 + alpha[low] * np.log(neutral_x[low] / x[low])
+    out[high] = np.maximum(0.0, 1.0 - beta[high] * np.log1p(x[high] - neutral_x[high]))
+    return out
+
+
+def strategy_params(**overrides) -> dict:
+    """Return the strategy constants as a dict, with any keyword overrides applied.
+
+    Keys are the lower-cased global names (``alpha``, ``daily_cap_x``, ...), so
+    sweeps and backtests can vary them without touching the module globals.
+    """
+    params = {
+        "alpha": ALPHA,
+        "beta": BETA,
+        "daily_cap_x": DAILY_CAP_X,
+        "pause_threshold": PAUSE_THRESHOLD,
+        "neutral_x": NEUTRAL_X,
+        "min_trade_usd": MIN_TRADE_USD,
+    }
+    unknown = set(overrides) - set(params)
+    if unknown:
+        raise KeyError(f"Unknown strategy parameter(s): {sorted(unknown)}")
+    params.update(overrides)
+    return params
+
+
+def _rolling_harmonic_mean(values: np.ndarray, window: int = DCA_WINDOW) -> np.ndarray:
+    """Harmonic mean of each trailing ``window`` of ``values`` via running reciprocal sums.
+
+    Mirrors ``_harmonic_mean``: non-positive or non-finite entries occupy a slot
+    in the window but are left out of both the count and the reciprocal sum.
+    Positions with fewer than ``window`` values before them are ``nan``. The
+    cumulative sum is carried in extended precision so the difference of two
+    large prefixes keeps the accuracy of a direct 200-term sum.
+    """
+    arr = np.asarray(values, dtype=float)
+    good = np.isfinite(arr) & (arr > 0)
+    recip = np.zeros(len(arr), dtype=np.longdouble)
+    recip[good] = 1.0 / arr[good]
+    csum = np.concatenate(([0], np.cumsum(recip)))
+    ccount = np.concatenate(([0], np.cumsum(good)))
+    out = np.full(len(arr), np.nan)
+    if len(arr) < window:
+        return out
+    hi = np.arange(window, len(arr) + 1)
+    count = ccount[hi] - ccount[hi - window]
+    rsum = csum[hi] - csum[hi - window]
+    full = count > 0
+    out[window - 1:][full] = (count[full] / rsum[full]).astype(float)
+    return out
+
+
+def ahr999_series(timestamps, closes, baseline: float = None, params: dict = None) -> dict:
+    """Indicator and daily decision for every candle, as aligned NumPy arrays.
+
+    ``timestamps`` are epoch milliseconds (or anything ``datetime64`` accepts)
+    and ``closes`` the matching close prices. Each row equals what
+    ``get_today_investment_amount`` decides when handed the candles up to it on
+    that date: ``dca200``, ``growth_estimate``, ``ahr999``, ``multiplier``,
+    ``paused``, ``capped`` and the rounded, capped ``investment_usd``. Rows
+    without a full 200-close window are ``nan``.
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    prices = pd.to_numeric(pd.Series(closes), errors="coerce").to_numpy(dtype=float)
+    dates = _as_days(timestamps)
+    n = len(prices)
+
+    # The live function first drops NaNs, so "today" is always the latest
+    # non-NaN close and the window is counted in non-NaN rows only.
+    present = ~np.isnan(prices)
+    compact = prices[present]
+    seen = np.cumsum(present)
+    last_idx = seen - 1
+    dca_compact = _rolling_harmonic_mean(compact)
+    has_price = seen > 0
+    price_today = np.full(n, np.nan)
+    price_today[has_price] = compact[last_idx[has_price]]
+    dca200 = np.full(n, np.nan)
+    dca200[has_price] = dca_compact[last_idx[has_price]]
+
+    ages = (dates - np.datetime64(GENESIS, "D")).astype("int64")
+    estimate = growth_estimate_array(ages)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        computable = np.isfinite(dca200) & np.isfinite(price_today)
+        ahr999 = np.where(computable, (price_today / dca200) * (price_today / estimate), np.nan)
+    return {
+        "date": dates,
+        "price": price_today,
+        "dca200": dca200,
+        "growth_estimate": estimate,
+        "ahr999": ahr999,
+        **decision_arrays(ahr999, baseline, params),
+    }
+
+
+def ahr999_history(historical_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-candle price, 200-day harmonic mean, growth estimate and AHR999.
+
+    None of these depend on the strategy constants, so callers that evaluate
+    many parameter sets compute this once and reuse it.
+    """
+    series = ahr999_series(_candle_dates(historical_df), historical_df["price"])
+    return pd.DataFrame({key: series[key] for key in ("date", "price", "dca200", "growth_estimate", "ahr999")})
+
+
+def decision_arrays(ahr999: np.ndarray, baseline: float, params: dict = None) -> dict:
+    """Vectorized ``investment_for_index``: multiplier, pause, cap and rounding per AHR999 value.
+
+    Non-finite AHR999 gives a ``nan`` multiplier and amount, as the scalar path does.
+    """
+    p = strategy_params(**(params or {}))
+    cap_usd = baseline * p["daily_cap_x"]
+    ahr999 = np.asarray(ahr999, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        finite = np.isfinite(ahr999)
+        paused = finite & (ahr999 > p["pause_threshold"])
+        multiplier = np.where(finite, continuous_multiplier_array(ahr999, p["alpha"], p["beta"], p["neutral_x"]), np.nan)
+        raw = baseline * multiplier
+        capped = finite & ~paused & (raw > cap_usd)
+        investment = np.round(np.where(paused, 0.0, np.minimum(raw, cap_usd)), 4)
+    return {"multiplier": multiplier, "paused": paused, "capped": capped, "investment_usd": investment}
+
+
+def simulate_strategy(price: np.ndarray, ahr999: np.ndarray, baseline: float, params: dict = None) -> dict:
+    """Apply multiplier, pause, cap and minimum-trade rules to an AHR999 series.
+
+    Returns a dict of aligned arrays: the live decision per day plus the
+    cumulative portfolio obtained by buying whenever the amount clears
+    ``min_trade_usd``. 2D inputs are treated as one path per row, with days
+    along the last axis.
+
+    A close that is missing, zero or negative is a bad tick, not a price: no
+    buy happens that day and holdings stay marked at the last valid close.
+    """
+    p = strategy_params(**(params or {}))
+    decision = decision_arrays(ahr999, baseline, p)
+    investment = decision["investment_usd"]
+    price = np.asarray(price, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        valid = np.isfinite(price) & (price > 0)
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(price.shape[-1]), 0), axis=-1)
+        mark = np.take_along_axis(np.where(valid, price, 0.0), last_valid, axis=-1)
+        traded = np.isfinite(investment) & (investment > p["min_trade_usd"]) & valid
+        buy_usd = np.where(traded, investment, 0.0)
+        buy_btc = np.where(traded, buy_usd / price, 0.0)
+        invest_cum = np.cumsum(buy_usd, axis=-1)
+        hold_btc_cum = np.cumsum(buy_btc, axis=-1)
+        value_usd = hold_btc_cum * mark
+        roi = np.where(invest_cum > 0, value_usd / invest_cum - 1, 0.0)
+    return {
+        **decision,
+        "traded": traded,
+        "buy_btc": buy_btc,
+        "invest_cum": invest_cum,
+        "hold_btc_cum": hold_btc_cum,
+        "value_usd": value_usd,
+        "roi": roi,
+    }
+
+
+def max_drawdown(roi: np.ndarray) -> float:
+    """Largest peak-to-trough fall of value per invested dollar (``1 + roi``).
+
+    Measuring on ``1 + roi`` rather than raw portfolio value keeps fresh
+    contributions from masking losses.
+    """
+    equity = 1.0 + np.asarray(roi, dtype=float)
+    if equity.size == 0:
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max(1.0 - equity / peak))
+
+
+def backtest_history(historical_df: pd.DataFrame, baseline: float = None, params: dict = None) -> pd.DataFrame:
+    """Evaluate the daily decision for every candle of ``historical_df`` in one pass.
+
+    Row ``i`` holds what ``get_today_investment_amount`` returns when handed rows
+    ``0..i`` on that candle's date: the 200-day harmonic mean, growth estimate,
+    AHR999, multiplier, whether the pause or the daily cap kicked in, and the
+    rounded investment. A simulated portfolio (buying whenever the amount
+    clears ``MIN_TRADE_USD``) is appended so results can be read directly.
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    result = ahr999_history(historical_df)
+    simulated = simulate_strategy(result["price"].to_numpy(), result["ahr999"].to_numpy(), baseline, params)
+    for column, values in simulated.items():
+        result[column] = values
+    return result
+
+
+def verify_backtest(historical_df: pd.DataFrame, result: pd.DataFrame, baseline: float = None, tol: float = 1e-9) -> list:
+    """Replay ``get_today_investment_amount`` day by day and list every mismatching date.
+
+    This is the slow reference path (one live call per day); it exists to prove
+    the vectorized engine, not to be used for analysis.
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    mismatches = []
+    for i, day in enumerate(pd.to_datetime(result["date"]).dt.date):
+        with contextlib.redirect_stdout(io.StringIO()):
+            live = get_today_investment_amount(historical_df.iloc[:i + 1], baseline, as_of=day)
+        for key, column in (("investment_usd", "investment_usd"), ("ahr999_index", "ahr999")):
+            a, b = float(live[key]), float(result[column].iat[i])
+            same = (np.isnan(a) and np.isnan(b)) or abs(a - b) <= tol * max(1.0, abs(a))
+            if not same:
+                mismatches.append((day.isoformat(), key, a, b))
+    return mismatches
+
+
+def _load_ohlcv_csv(path: str) -> pd.DataFrame:
+    """Read candles saved as CSV (``timestamp``/``date`` plus ``close``/``price``)."""
+    df = pd.read_csv(path)
+    if "price" not in df.columns:
+        if "close" not in df.columns:
+            raise ValueError(f"{path} needs a 'close' or 'price' column")
+        df["price"] = df["close"]
+    if "timestamp" not in df.columns and "date" not in df.columns:
+        raise ValueError(f"{path} needs a 'timestamp' or 'date' column")
+    return df
+
+
+def _ohlcv_frame(ohlcv: list) -> pd.DataFrame:
+    historical_df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    historical_df['price'] = historical_df['close']
+    return historical_df
+
+
+def load_history_frame(ohlcv_path: str = None, start=None, limit: int = 300) -> pd.DataFrame:
+    """Candles for offline analysis: a CSV, OKX deep history from ``start``, or the latest ``limit`` bars."""
+    if ohlcv_path:
+        return _load_ohlcv_csv(ohlcv_path)
+    if start:
+        return _ohlcv_frame(load_okx_history(OKX_SYMBOL, start))
+    return _ohlcv_frame(_okx_public_candles(OKX_SYMBOL, limit=limit))
+
+
+def run_backtest(ohlcv_path: str = None, limit: int = 300, baseline: float = None,
+                 output: str = "backtest.csv", verify: bool = False, start=None) -> pd.DataFrame:
+    historical_df = load_history_frame(ohlcv_path, start=start, limit=limit)
+
+    started = time.perf_counter()
+    result = backtest_history(historical_df, baseline)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"✅ Backtested {len(result)} days in {elapsed_ms:.1f} ms")
+
+    last = result.iloc[-1]
+    print(f"   Days traded: {int(result['traded'].sum())}  paused: {int(result['paused'].sum())}  capped: {int(result['capped'].sum())}")
+    print(f"   Invested: ${last['invest_cum']:,.2f}  BTC: {last['hold_btc_cum']:.8f}  ROI: {last['roi'] * 100:+.2f}%"
+          f"  Max drawdown: {max_drawdown(result['roi'].to_numpy()) * 100:.2f}%")
+    if output:
+        result.to_csv(output, index=False)
+        print(f"✅ Backtest written to {output}")
+    if verify:
+        mismatches = verify_backtest(historical_df, result, baseline)
+        if mismatches:
+            print(f"🔴 {len(mismatches)} day(s) differ from the live decision, first: {mismatches[:5]}")
         else:
-            multiplier=calculate_continuous_multiplier(ahr999_today)
-            buy_usd_ahr=baseline*multiplier
-            buy_usd_ahr=min(buy_usd_ahr, baseline*DAILY_CAP_X)
-    else: buy_usd_ahr = np.nan
-    return {"investment_usd": round(buy_usd_ahr, 4) if np.isfinite(buy_usd_ahr) else np.nan, "price_today": price_today, "ahr999_index": ahr999_today}
+            print("✅ Every day matches get_today_investment_amount")
+    return result
+
+
+# ==============================================================================
+# SECTION 3.6: DECISION-ONLY MODE AND STARTUP REPORT
+# ==============================================================================
+def decide_today(offline: bool = False, baseline: float = None) -> dict:
+    """Compute today's decision without ccxt, matplotlib, credentials, orders or log writes.
+
+    Candles come from the local cache topped up through OKX's public REST
+    endpoint, which is all the decision needs. The top-up is saved back to
+    ``.cache/ohlcv_*.npz`` (skipped when ``offline``), so that cache is the one
+    file this touches.
+    """
+    baseline = BASELINE_INVESTMENT if baseline is None else baseline
+    ohlcv = fetch_ohlcv_resilient(None, OKX_SYMBOL, '1d', limit=250, offline=offline)
+    if len(ohlcv) < DCA_WINDOW:
+        raise ValueError(f"Not enough historical data. Got {len(ohlcv)}.")
+    decision = get_today_investment_amount(_ohlcv_frame(ohlcv), baseline)
+    amount = decision["investment_usd"]
+    decision["would_trade"] = bool(amount is not None and math.isfinite(amount) and amount > MIN_TRADE_USD)
+    return decision
+
+
+# Import groups that make up each entry point, cumulatively: ``decide`` is the
+# bare module, ``run`` adds ccxt for order placement, ``charts`` adds plotting.
+STARTUP_TARGETS = {
+    "decide": "import trade_bot",
+    "run": "import trade_bot; trade_bot._load_ccxt()",
+    "charts": "import trade_bot; trade_bot._load_ccxt(); trade_bot._load_plotting()",
+}
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Sum ``-X importtime`` self-times (µs) per top-level package."""
+    per_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line.split(":", 1)[1].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us = int(fields[0])
+        package = fields[2].strip().split(".")[0]
+        per_package[package] = per_package.get(package, 0) + self_us
+    return per_package
+
+
+def startup_report(targets=None, top: int = 12, output: str = None) -> dict:
+    """Measure import cost of each entry point in a fresh interpreter and print a breakdown."""
+    report = {}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for target in targets or STARTUP_TARGETS:
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_TARGETS[target]],
+                              cwd=here, capture_output=True, text=True)
+        wall_ms = (time.perf_counter() - started) * 1000
+        per_package = _parse_importtime(proc.stderr)
+        import_ms = sum(per_package.values()) / 1000
+        report[target] = {"wall_ms": round(wall_ms, 1), "import_ms": round(import_ms, 1),
+                          "packages_ms": {k: round(v / 1000, 1) for k, v in
+                                          sorted(per_package.items(), key=lambda kv: -kv[1])}}
+        print(f"⏱️ {target}: {import_ms:,.0f} ms in imports, {wall_ms:,.0f} ms wall (interpreter included)")
+        for package, ms in list(report[target]["packages_ms"].items())[:top]:
+            print(f"   {package:<24}{ms:>10,.1f} ms")
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"✅ Startup report written to {output}")
+    return report
+
 
-def main():
-    start_time = dt.datetime.now(dt.timezone.utc)
-    create_github_issue(f"🚀 Bot Run Started at {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC", "Starting daily investment process...")
+def order_log_entry(order: dict, investment_amount: float, price_now: float, day: str = None) -> dict:
+    """Turn a filled market buy into a ``LOG_COLUMNS`` row, filling gaps the exchange left empty."""
+    final_cost = order.get('cost', 0) or investment_amount
+    final_filled = order.get('filled', 0)
+    final_average = order.get('average', 0) or price_now
+    if not final_filled and final_cost > 0 and final_average > 0: final_filled = final_cost / final_average
+    return {'date': day or today().isoformat(), 'buy_usd': final_cost, 'buy_btc': final_filled, 'price_usd': final_average}
+
+
+def main(offline: bool = False, charts: bool = True):
+    """Run today's investment.
+
+    ``offline`` replays the decision from the local candle cache only: no
+    credentials are needed, no order is placed, nothing is written (trade
+    log, state, metrics) and neither the dashboard nor the GitHub report is
+    produced.
+    ``charts=False`` skips the dashboard (used by fast multi-day replays).
+    """
+    start_time = utc_now()
+    METRICS.reset()
+    charts = charts and not offline
+    # Before the notifier's and the hedge's threads exist, so the workers can be forked.
+    panel_pool = start_panel_pool() if charts and DASHBOARD_FORMAT != "html" else None
+    notifier = None if offline else GitHubNotifier()
+    if notifier is not None:
+        notifier.publish(f"🚀 Bot Run Started at {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC",
+                         "Starting daily investment process...")
     
     final_issue_title = "❓ Bot Run Status Unknown"
+    run_status = "unknown"
     execution_log = ""
     investment_data = {}
+    indicator_log = ""
     price_now = None
-    log_df = None
+    log_records = None
+    portfolio_state = None
 
     try:
-        api_key=os.getenv("OKX_API_KEY"); secret_key=os.getenv("OKX_SECRET_KEY"); password=os.getenv("OKX_PASSWORD")
-        if not all([api_key, secret_key, password]): raise ValueError("API credentials not found.")
-        exchange=ccxt.okx({'apiKey': api_key, 'secret': secret_key, 'password': password, 'options': {'defaultType': 'spot'}})
+        with METRICS.span("credentials"):
+            api_key=os.getenv("OKX_API_KEY"); secret_key=os.getenv("OKX_SECRET_KEY"); password=os.getenv("OKX_PASSWORD")
+            if offline:
+                exchange=None
+            else:
+                if not all([api_key, secret_key, password]): raise ValueError("API credentials not found.")
+                exchange=_load_ccxt().okx({'apiKey': api_key, 'secret': secret_key, 'password': password, 'options': {'defaultType': 'spot'}})
+        if exchange is not None:
+            with METRICS.span("markets"):
+                prepare_exchange_markets(exchange, [OKX_SYMBOL])
         print("Fetching historical data...")
-        ohlcv=fetch_ohlcv_resilient(exchange, OKX_SYMBOL, '1d', limit=250)
+        with METRICS.span("candle_fetch"):
+            ohlcv=fetch_ohlcv_resilient(exchange, OKX_SYMBOL, '1d', limit=250, offline=offline, hedge_delay=HEDGE_DELAY)
         if not isinstance(ohlcv, list):
             sample=ohlcv if isinstance(ohlcv, (dict, str, bytes, int, float, type(None))) else repr(ohlcv)[:400]
             print(f"⚠️ Unexpected OHLCV payload type from fetch_ohlcv: {type(ohlcv)}")
@@ -741,75 +3600,244 @@ def main():
             print(f"⚠️ Unexpected OHLCV rows sample (first 5): {sample}")
             raise ValueError(f"fetch_ohlcv returned malformed OHLCV rows (first 5): {sample}")
         if len(ohlcv)<200: raise ValueError(f"Not enough historical data. Got {len(ohlcv)}.")
-        historical_df=pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        historical_df['price']=historical_df['close']
-        
-        investment_data=get_today_investment_amount(historical_df, BASELINE_INVESTMENT)
+        with METRICS.span("indicators"):
+            historical_df=_ohlcv_frame(ohlcv)
+            investment_data=get_today_investment_amount(historical_df, BASELINE_INVESTMENT)
         investment_amount=investment_data["investment_usd"]; price_now=investment_data["price_today"]
 
+        if offline:
+            run_status = "offline"
+            final_issue_title = f"📦 Offline Replay: Would invest `{investment_amount}`"
+            execution_log = "### 📈 Trade Execution\n- **Status:** `OFFLINE` (decision only, no order placed)"
+            print(f"Offline mode: would invest ${investment_amount} at price {price_now}.")
+            return
+        try:
+            with METRICS.span("indicator_store"):
+                update_indicator_store(historical_df, BASELINE_INVESTMENT)
+                indicator_log = indicator_history_log(investment_data["ahr999_index"])
+        except Exception as e:  # noqa: BLE001 - history is informational, never blocks the trade
+            print(f"⚠️ Could not update indicator store: {e}")
+        if already_bought(today()):
+            run_status = "skipped"
+            final_issue_title = f"🟡 Trade Skipped: {today().isoformat()} already has a buy"
+            execution_log = "### 📈 Trade Execution\n- **Status:** `SKIPPED` (already bought today, e.g. by the stream trigger)"
+            print(f"{today().isoformat()} already has a buy in the trade log; skipping trade.")
+            return
         if investment_amount is not None and math.isfinite(investment_amount) and investment_amount > MIN_TRADE_USD:
             print(f"Placing market buy order to SPEND ${investment_amount}...")
-            ensure_markets_loaded(exchange)
-            order = exchange.create_market_buy_order_with_cost(OKX_SYMBOL, investment_amount)
-            
-            final_cost = order.get('cost', 0) or investment_amount
-            final_filled = order.get('filled', 0)
-            final_average = order.get('average', 0) or price_now
-            if not final_filled and final_cost > 0 and final_average > 0: final_filled = final_cost / final_average
-            new_log_entry = {'date': dt.date.today().isoformat(), 'buy_usd': final_cost, 'buy_btc': final_filled, 'price_usd': final_average}
+            order = place_market_buy(exchange, OKX_SYMBOL, investment_amount)
+            new_log_entry = order_log_entry(order, investment_amount, price_now)
             
+            run_status = "success"
             final_issue_title = f"✅ Trade Successful: Spent ${new_log_entry['buy_usd']:.2f} on {OKX_SYMBOL}"
             execution_log = f"### 📈 Trade Execution\n- **Status:** `SUCCESS`\n- **Order ID:** `{order.get('id', 'N/A')}`"
         else:
-            new_log_entry = {'date': dt.date.today().isoformat(), 'buy_usd': 0.0, 'buy_btc': 0.0, 'price_usd': price_now}
+            new_log_entry = {'date': today().isoformat(), 'buy_usd': 0.0, 'buy_btc': 0.0, 'price_usd': price_now}
+            run_status = "skipped"
             final_issue_title = f"🟡 Trade Skipped: Amount was `{investment_amount}`"
             execution_log = "### 📈 Trade Execution\n- **Status:** `SKIPPED`"
             print("Investment amount invalid or too small, skipping trade.")
 
-        try:
-            existing = pd.read_csv(LOG_FILE)
-        except (FileNotFoundError, pd.errors.EmptyDataError):
-            existing = pd.DataFrame(columns=LOG_COLUMNS)
-        log_df = pd.concat([existing, pd.DataFrame([new_log_entry])], ignore_index=True)
-        log_df.to_csv(LOG_FILE, index=False)
-        print(f"✅ Appended to {LOG_FILE}: {new_log_entry}")
+        with METRICS.span("log_io"):
+            action, stored_entry = upsert_trade_log(new_log_entry)
+            portfolio_state = update_portfolio_state(new_log_entry, action, stored_entry=stored_entry)
+        print(f"✅ Trade log {action} ({LOG_STORE_FILE}, exported to {LOG_FILE}): {new_log_entry}")
 
     except Exception as e:
         final_issue_title = "🔴 TRADE FAILED"
+        run_status = "failed"
         execution_log = f"### 📈 Trade Execution\n- **Status:** `FAILED`\n\nAn error occurred: \n```\n{e}\n```"
         print(f"🔴🔴🔴 An error occurred: {e} 🔴🔴🔴")
 
     finally:
-        if log_df is None:
-            try:
-                log_df = pd.read_csv(LOG_FILE)
-            except (FileNotFoundError, pd.errors.EmptyDataError):
-                log_df = None
-        final_log_df = None
-        if log_df is not None:
-            final_log_df = log_df.dropna(subset=['date'])
-            final_log_df = final_log_df[final_log_df['price_usd'] > 0].reset_index(drop=True)
-
-        if price_now and math.isfinite(price_now) and final_log_df is not None and len(final_log_df) > 0:
-            portfolio_summary_log = calculate_portfolio_summary(final_log_df, price_now)
+        # The summary only needs the portfolio state; the full history is read for the charts.
+        if log_records is None and (charts or portfolio_state is None):
             try:
-                generate_dashboard_charts(final_log_df, theme_key=os.getenv("DCA_CHART_THEME", DEFAULT_CHART_THEME))
-                print("✅ Dashboard charts generated successfully")
-            except Exception as e:
-                print(f"⚠️ Error generating charts: {e}")
+                with METRICS.span("log_io"):
+                    log_records = read_trade_log_records(migrate=not offline)
+            except Exception as e:  # noqa: BLE001 - reporting must still go out
+                print(f"⚠️ Could not read trade log: {e}")
+                log_records = None
+        final_log = None
+        if log_records is not None:
+            final_log = log_records[log_records['price_usd'] > 0]
+
+        has_log = (final_log is not None and len(final_log) > 0) or bool(portfolio_state and portfolio_state["days"])
+        if price_now and math.isfinite(price_now) and has_log:
+            portfolio_summary_log = calculate_portfolio_summary(portfolio_state or final_log, price_now)
+            if charts and final_log is not None and len(final_log) > 0:
+                try:
+                    theme = os.getenv("DCA_CHART_THEME", DEFAULT_CHART_THEME)
+                    with METRICS.span("charts"):
+                        if DASHBOARD_FORMAT != "html":
+                            generate_dashboard_charts(final_log, theme_key=theme, state=portfolio_state, pool=panel_pool)
+                        if DASHBOARD_FORMAT in ("html", "both"):
+                            generate_dashboard_html(final_log, theme_key=theme, state=portfolio_state)
+                    print("✅ Dashboard charts generated successfully")
+                except Exception as e:
+                    print(f"⚠️ Error generating charts: {e}")
         else:
             portfolio_summary_log = "### 📊 Portfolio Summary\n- Could not fetch current price or no valid data to generate summary."
+        if panel_pool is not None:
+            panel_pool.shutdown(cancel_futures=True)
 
         market_data_log = (f"### Market Data\n- **Timestamp:** `{start_time.strftime('%Y-%m-%d %H:%M:%S')}` UTC\n"
-                           f"- **Price ({OKX_SYMBOL}):** `{price_now}`\n- **AHR999 Index:** `{investment_data.get('ahr999_index', 'N/A')}`")
+                           f"- **Price ({OKX_SYMBOL}):** `{price_now}`\n- **AHR999 Index:** `{investment_data.get('ahr999_index', 'N/A')}`"
+                           + (f"\n{indicator_log}" if indicator_log else ""))
         decision_log = (f"### 🤖 Investment Decision\n- **Calculated Investment:** `{investment_data.get('investment_usd', 'N/A')}`")
 
-        final_issue_body = "\n\n".join(filter(None, [portfolio_summary_log, market_data_log, decision_log, execution_log]))
+        final_issue_body = "\n\n".join(filter(None, [portfolio_summary_log, market_data_log, decision_log, execution_log,
+                                                      METRICS.markdown_table()]))
         
-        end_time = dt.datetime.now(dt.timezone.utc); duration = end_time - start_time
+        end_time = utc_now(); duration = end_time - start_time
         final_issue_body += f"\n\n---\n*Bot run finished. Duration: `{str(duration).split('.')[0]}`.*"
-        create_github_issue(final_issue_title, final_issue_body)
+        if notifier is not None:
+            notifier.publish(final_issue_title, final_issue_body)
+            with METRICS.span("notify_flush"):
+                notifier.close()
+        if not offline:  # a decision-only run leaves no files behind
+            METRICS.export(run_status, title=final_issue_title, symbol=OKX_SYMBOL, offline=offline)
         print(f"\nBot finished at {end_time.isoformat()}")
 
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="AHR999 smart DCA bot for OKX.")
+    sub = parser.add_subparsers(dest="command")
+    run = sub.add_parser("run", help="Run today's investment (default when no command is given).")
+    run.add_argument("--offline", action="store_true",
+                     help="Decide from the local candle cache only; places no order and writes no log.")
+    bt = sub.add_parser("backtest", help="Replay the strategy over a full candle history.")
+    bt.add_argument("--ohlcv", help="CSV of candles; fetched from OKX public API when omitted.")
+    bt.add_argument("--start", help="Fetch OKX deep history from this date (YYYY-MM-DD) when --ohlcv is not given.")
+    bt.add_argument("--limit", type=int, default=300, help="Candles to fetch when neither --ohlcv nor --start is given.")
+    bt.add_argument("--baseline", type=float, default=None, help="Baseline investment (default: BASELINE_INVESTMENT).")
+    bt.add_argument("--output", default="backtest.csv", help="Where to write the per-day results.")
+    bt.add_argument("--verify", action="store_true", help="Cross-check every day against the live decision function.")
+    de = sub.add_parser("decide", help="Print today's decision only (no ccxt, charts, orders or log writes).")
+    de.add_argument("--offline", action="store_true", help="Use the local candle cache only.")
+    de.add_argument("--baseline", type=float, default=None, help="Baseline investment (default: BASELINE_INVESTMENT).")
+    de.add_argument("--json", action="store_true", help="Print the decision as one JSON object.")
+    sr = sub.add_parser("startup-report", help="Break down import time per module for each entry point.")
+    sr.add_argument("--target", action="append", choices=sorted(STARTUP_TARGETS), help="Entry point(s) to measure (default: all).")
+    sr.add_argument("--top", type=int, default=12, help="Packages to list per entry point.")
+    sr.add_argument("--output", help="Also write the report as JSON.")
+    ch = sub.add_parser("chart", help="Render the dashboard from the trade log without trading.")
+    ch.add_argument("--profile", choices=sorted(RENDER_PROFILES), help="Render profile (default: DCA_RENDER_PROFILE or standard).")
+    ch.add_argument("--theme", help="Chart theme (default: DCA_CHART_THEME or professional).")
+    ch.add_argument("--workers", type=int, default=None, help="Panel worker processes (default: one per core, up to 7).")
+    ch.add_argument("--format", choices=("png", "html"), default="png",
+                    help="PNG image or self-contained interactive HTML page (default: png).")
+    ch.add_argument("--output", help=f"File to write (default: {DASHBOARD_OUTPUT} or {DASHBOARD_HTML_OUTPUT}).")
+    ch.add_argument("--no-cache", action="store_true", help="Always render, ignoring the dashboard cache.")
+    vs = sub.add_parser("verify-state", help="Rebuild the portfolio state from the full log and compare.")
+    vs.add_argument("--rebuild", action="store_true", help="Overwrite the stored state with the rebuilt one.")
+    cl = sub.add_parser("compact-log", help="Close finished periods of the trade log into its archive and list them.")
+    cl.add_argument("--granularity", choices=("month", "year"),
+                    help="Period size when no archive exists yet (default: DCA_LOG_PARTITION, or month when that is none).")
+    sub.add_parser("fetch-stats", help="Summarise hedged candle fetches (winner and latency per source).")
+    ind = sub.add_parser("indicators", help="Show the stored daily indicators, or rebuild them from a candle history.")
+    ind.add_argument("--rebuild", action="store_true", help="Recompute the store from --ohlcv / --start candles.")
+    ind.add_argument("--ohlcv", help="CSV of candles for --rebuild; fetched from OKX public API when omitted.")
+    ind.add_argument("--start", help="Fetch OKX deep history from this date (YYYY-MM-DD) for --rebuild.")
+    ind.add_argument("--date", help="Show the stored row for this day (YYYY-MM-DD; default: newest).")
+    hist = sub.add_parser("history", help="Download deep OKX candle history to CSV and the candle cache.")
+    hist.add_argument("--start", required=True, help="First day to download (YYYY-MM-DD).")
+    hist.add_argument("--end", help="Day to stop before (default: now).")
+    hist.add_argument("--bar", default="1Dutc", help="OKX bar size (default: 1Dutc).")
+    hist.add_argument("--workers", type=int, default=4, help="Concurrent page requests.")
+    hist.add_argument("--output", default="ohlcv_history.csv", help="CSV to write.")
+    return parser
+
+
+def download_history(start, end=None, bar: str = "1Dutc", workers: int = 4, output: str = "ohlcv_history.csv") -> list:
+    rows = load_okx_history(OKX_SYMBOL, start, end=end, bar=bar, max_workers=workers)
+    if output:
+        _ohlcv_frame(rows).drop(columns="price").to_csv(output, index=False)
+        print(f"✅ History written to {output}")
+    if bar == "1Dutc" and rows:
+        # Seed the daily cache so backtests and live runs share the deep history;
+        # newer cached candles take precedence over the downloaded ones.
+        merged = {r[0]: r for r in rows}
+        merged.update({r[0]: r for r in load_cached_ohlcv(OKX_SYMBOL, "1d")})
+        save_cached_ohlcv(OKX_SYMBOL, "1d", [merged[ts] for ts in sorted(merged)])
+    return rows
+
+
+def cli(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    if args.command == "backtest":
+        run_backtest(args.ohlcv, limit=args.limit, baseline=args.baseline, output=args.output, verify=args.verify,
+                     start=args.start)
+    elif args.command == "decide":
+        decision = decide_today(offline=args.offline, baseline=args.baseline)
+        if args.json:
+            print(json.dumps({k: (None if isinstance(v, float) and not math.isfinite(v) else v)
+                              for k, v in decision.items()}, default=float))
+        else:
+            print(f"Price: {decision['price_today']}  AHR999: {decision['ahr999_index']}  "
+                  f"Investment: {decision['investment_usd']}  Would trade: {decision['would_trade']}")
+    elif args.command == "startup-report":
+        startup_report(args.target, top=args.top, output=args.output)
+    elif args.command == "chart":
+        records = read_trade_log_records()
+        theme = args.theme or os.getenv("DCA_CHART_THEME", DEFAULT_CHART_THEME)
+        if args.format == "html":
+            generate_dashboard_html(records[records['price_usd'] > 0], theme_key=theme,
+                                    output=args.output or DASHBOARD_HTML_OUTPUT)
+        else:
+            generate_dashboard_charts(records[records['price_usd'] > 0], theme_key=theme,
+                                      profile=args.profile, workers=args.workers, output=args.output or DASHBOARD_OUTPUT,
+                                      use_cache=not args.no_cache)
+    elif args.command == "fetch-stats":
+        summary = fetch_latency_summary()
+        print(f"{summary['fetches']} hedged fetch(es) recorded in {FETCH_STATS_FILE}")
+        for source in ("ccxt", "rest"):
+            info = summary[source]
+            p50 = "n/a" if info["p50"] is None else f"{info['p50']:.2f}s"
+            p90 = "n/a" if info["p90"] is None else f"{info['p90']:.2f}s"
+            print(f"   {source:<6} wins {info['wins']:>4}   p50 {p50:>7}   p90 {p90:>7}   ({info['finished']} finished)")
+    elif args.command == "compact-log":
+        granularity = args.granularity or (LOG_PARTITION if LOG_PARTITION != "none" else "month")
+        closed = rotate_trade_log(granularity=granularity)
+        manifest = load_log_manifest()
+        print(f"✅ Closed {len(closed)} period(s); {len(manifest['partitions'])} archived in {_log_archive_dir()}, "
+              f"{len(read_trade_log_records(history=False))} day(s) open in {LOG_STORE_FILE}.")
+        for p in manifest["partitions"]:
+            prices = "n/a" if p["min_price"] is None else f"${p['min_price']:,.0f} - ${p['max_price']:,.0f}"
+            print(f"   {p['period']:<8}{p['rows']:>5} day(s) {p['invest_days']:>5} buy(s)   ${p['sum_usd']:>12,.2f}   "
+                  f"{p['sum_btc']:>12.6f} BTC   {prices}")
+    elif args.command == "verify-state":
+        partition_mismatches = verify_log_partitions()
+        if partition_mismatches:
+            print(f"🔴 Log archive manifest differs from its files: {partition_mismatches}")
+        mismatches = verify_portfolio_state()
+        if mismatches:
+            print(f"🔴 Portfolio state differs from the log: {mismatches}")
+        else:
+            print("✅ Portfolio state matches a full rebuild from the log.")
+        if args.rebuild:
+            save_portfolio_state(_portfolio_state_snapshot(read_trade_log_records()))
+            print(f"✅ {PORTFOLIO_STATE_FILE} rebuilt from the log.")
+        elif mismatches or partition_mismatches:
+            raise SystemExit(1)
+    elif args.command == "indicators":
+        if args.rebuild:
+            records = rebuild_indicator_store(load_history_frame(args.ohlcv, start=args.start, limit=300))
+            print(f"✅ {INDICATOR_STORE_FILE} rebuilt with {len(records)} day(s).")
+        records = read_indicator_store()
+        if not len(records):
+            raise SystemExit(f"{INDICATOR_STORE_FILE} is empty; run the bot or use --rebuild.")
+        day = args.date or str(np.datetime64(int(records["day"][-1]), "D"))
+        row = indicator_for_day(day)
+        if row is None:
+            raise SystemExit(f"No stored indicators for {day}.")
+        print(" ".join(f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+        print(indicator_history_log(row["ahr999"], day).replace("`", "").replace("**", ""))
+    elif args.command == "history":
+        download_history(args.start, end=args.end, bar=args.bar, workers=args.workers, output=args.output)
+    else:
+        main(offline=getattr(args, "offline", False))
+
+
 if __name__ == "__main__":
-    main()
+    cli()